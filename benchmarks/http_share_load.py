@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""Load test for the browser share.
+
+Starts each server engine in its own process on loopback, shares a set of
+synthetic files and text, and drives it with simulated browsers that poll
+/api/data, reload the index, download files and fetch byte ranges of the
+shared text over keep-alive connections. Every client follows a seeded
+script of a fixed length, so two runs with the same arguments issue the
+same requests in the same per-client order.
+
+    python -m benchmarks.http_share_load --clients 16 --requests 200
+    python -m benchmarks.http_share_load --mode async --json results.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MODES = ('threaded', 'async')
+# Relative weight of each simulated browser action
+ACTION_WEIGHTS = {
+    'poll': 60,
+    'index': 15,
+    'download': 15,
+    'range': 10,
+}
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def peak_rss_kb() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def make_fixtures(directory: Path, file_count: int, file_size: int, text_size: int, seed: int):
+    """Write deterministic files (half text, half random bytes) and return them with the shared text."""
+    rng = random.Random(seed)
+    files = []
+    for i in range(file_count):
+        if i % 2 == 0:
+            path = directory / f"notes_{i}.txt"
+            line = f"line of compressible sample text number {i}\n".encode('ascii')
+            path.write_bytes((line * (file_size // len(line) + 1))[:file_size])
+        else:
+            path = directory / f"blob_{i}.bin"
+            path.write_bytes(rng.randbytes(file_size))
+        files.append(str(path))
+
+    words = ['share', 'browser', 'clara', 'network', 'download', 'text', 'ümlaut', 'file']
+    text = ' '.join(rng.choice(words) for _ in range(text_size // 6))[:text_size]
+    return files, text
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def serve(mode: str, files: List[str], text: str, clients: int):
+    """Child process: run one engine until stdin closes, then report peak RSS on stdout."""
+    # The servers probe upwards from their port, so start from one that is free right now
+    port = free_port()
+    if mode == 'async':
+        from core.http_share_async import AsyncFileShareServer
+        # Every simulated browser comes from 127.0.0.1, so lift the per-IP cap
+        server = AsyncFileShareServer(port=port, max_connections_per_ip=clients + 1)
+    else:
+        from core.http_share import FileShareServer
+        server = FileShareServer(port=port)
+
+    server.share_files(files)
+    server.share_text(text)
+    print(json.dumps({"port": server.port}), flush=True)
+
+    sys.stdin.read()
+    server.stop()
+    print(json.dumps({"peak_rss_kb": peak_rss_kb()}), flush=True)
+
+
+class SimulatedBrowser(threading.Thread):
+    def __init__(self, port: int, client_id: int, requests: int, seed: int,
+                 download_urls: List[str], text_size: int, start_barrier: threading.Barrier):
+        super().__init__(daemon=True)
+        self.port = port
+        self.requests = requests
+        self.rng = random.Random(seed * 1000003 + client_id)
+        self.download_urls = download_urls
+        self.text_size = text_size
+        self.start_barrier = start_barrier
+        self.latencies: Dict[str, List[float]] = {action: [] for action in ACTION_WEIGHTS}
+        self.bytes_received = 0
+        self.errors = 0
+        self.statuses: Dict[int, int] = {}
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _plan(self):
+        actions = list(ACTION_WEIGHTS)
+        weights = [ACTION_WEIGHTS[a] for a in actions]
+        for _ in range(self.requests):
+            action = self.rng.choices(actions, weights)[0]
+            headers = {'Accept-Encoding': 'gzip, deflate'}
+            if action == 'poll':
+                path = '/api/data'
+            elif action == 'index':
+                path = '/'
+            elif action == 'download':
+                path = self.rng.choice(self.download_urls)
+                headers = {}
+            else:
+                # Range support lives on /text, so that is what resumed fetches exercise
+                start = self.rng.randrange(self.text_size)
+                length = self.rng.randint(1, 64 * 1024)
+                path = '/text'
+                headers = {'Range': f'bytes={start}-{start + length - 1}'}
+            yield action, path, headers
+
+    def _request(self, path: str, headers: Dict[str, str]) -> int:
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        self._conn.request('GET', path, headers=headers)
+        response = self._conn.getresponse()
+        received = 0
+        while True:
+            chunk = response.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            received += len(chunk)
+        self.bytes_received += received
+        if response.will_close:
+            self._conn.close()
+            self._conn = None
+        return response.status
+
+    def run(self):
+        plan = list(self._plan())
+        self.start_barrier.wait()
+        for action, path, headers in plan:
+            started = time.perf_counter()
+            try:
+                status = self._request(path, headers)
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                if self._conn:
+                    self._conn.close()
+                    self._conn = None
+                continue
+            self.latencies[action].append(time.perf_counter() - started)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+        if self._conn:
+            self._conn.close()
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(samples, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "max_ms": round((samples[-1] if samples else 0.0) * 1000, 3),
+    }
+
+
+def run_mode(mode: str, args) -> Dict:
+    child = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.http_share_load', '--serve', mode,
+         '--clients', str(args.clients), '--fixture-dir', args.fixture_dir],
+        cwd=str(Path(__file__).resolve().parent.parent),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        port = json.loads(child.stdout.readline())["port"]
+
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        conn.request('GET', '/api/data')
+        data = json.loads(conn.getresponse().read())
+        conn.close()
+        download_urls = [f["url"] for f in data["files"]]
+        text_size = data["text"]["size"]
+
+        barrier = threading.Barrier(args.clients + 1)
+        browsers = [
+            SimulatedBrowser(port, i, args.requests, args.seed, download_urls, text_size, barrier)
+            for i in range(args.clients)
+        ]
+        for browser in browsers:
+            browser.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for browser in browsers:
+            browser.join()
+        elapsed = time.perf_counter() - started
+    finally:
+        child.stdin.close()
+        tail = child.stdout.read().strip().splitlines()
+        child.wait(timeout=30)
+
+    peak = json.loads(tail[-1])["peak_rss_kb"] if tail else None
+    all_latencies = [lat for b in browsers for samples in b.latencies.values() for lat in samples]
+    statuses: Dict[str, int] = {}
+    for browser in browsers:
+        for status, count in browser.statuses.items():
+            statuses[str(status)] = statuses.get(str(status), 0) + count
+    total_bytes = sum(b.bytes_received for b in browsers)
+
+    return {
+        "mode": mode,
+        "elapsed_s": round(elapsed, 3),
+        "requests": len(all_latencies),
+        "errors": sum(b.errors for b in browsers),
+        "statuses": statuses,
+        "requests_per_s": round(len(all_latencies) / elapsed, 1),
+        "mb_per_s": round(total_bytes / elapsed / 1024 ** 2, 2),
+        "bytes_received": total_bytes,
+        "latency": summarize(all_latencies),
+        "latency_by_action": {
+            action: summarize([lat for b in browsers for lat in b.latencies[action]])
+            for action in ACTION_WEIGHTS
+        },
+        "server_peak_rss_kb": peak,
+    }
+
+
+def print_report(results: List[Dict]):
+    print(f"{'mode':<10}{'req/s':>10}{'MB/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'errors':>8}{'peak RSS':>12}")
+    for r in results:
+        lat = r["latency"]
+        rss = f"{r['server_peak_rss_kb'] / 1024:.1f} MB" if r["server_peak_rss_kb"] else "n/a"
+        print(f"{r['mode']:<10}{r['requests_per_s']:>10}{r['mb_per_s']:>9}{lat['p50_ms']:>9}"
+              f"{lat['p90_ms']:>9}{lat['p99_ms']:>9}{r['errors']:>8}{rss:>12}")
+    for r in results:
+        print(f"\n{r['mode']} by action:")
+        for action, lat in r["latency_by_action"].items():
+            print(f"  {action:<10}{lat['count']:>7} req   p50 {lat['p50_ms']:>8} ms   "
+                  f"p90 {lat['p90_ms']:>8} ms   p99 {lat['p99_ms']:>8} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the HTTP share with simulated browsers.")
+    parser.add_argument('--mode', choices=MODES + ('all',), default='all')
+    parser.add_argument('--clients', type=int, default=16, help="concurrent simulated browsers")
+    parser.add_argument('--requests', type=int, default=200, help="requests per browser")
+    parser.add_argument('--files', type=int, default=4, help="number of shared files")
+    parser.add_argument('--file-size', type=int, default=1024 * 1024, help="bytes per shared file")
+    parser.add_argument('--text-size', type=int, default=256 * 1024, help="bytes of shared text")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    parser.add_argument('--serve', choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument('--fixture-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        fixtures = json.loads((Path(args.fixture_dir) / 'fixtures.json').read_text('utf-8'))
+        serve(args.serve, fixtures["files"], fixtures["text"], args.clients)
+        return
+
+    modes = MODES if args.mode == 'all' else (args.mode,)
+    with tempfile.TemporaryDirectory(prefix='clara-share-bench-') as fixture_dir:
+        files, text = make_fixtures(Path(fixture_dir), args.files, args.file_size, args.text_size, args.seed)
+        # Written once so every engine serves byte-identical content with identical mtimes
+        (Path(fixture_dir) / 'fixtures.json').write_text(json.dumps({"files": files, "text": text}), 'utf-8')
+        args.fixture_dir = fixture_dir
+        results = [run_mode(mode, args) for mode in modes]
+
+    print_report(results)
+
+    if args.json:
+        report = {
+            "config": {
+                "clients": args.clients,
+                "requests_per_client": args.requests,
+                "files": args.files,
+                "file_size": args.file_size,
+                "text_size": args.text_size,
+                "seed": args.seed,
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "results": results,
+        }
+        Path(args.json).write_text(json.dumps(report, indent=2), 'utf-8')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""Microbenchmarks for the app launcher and file search.
+
+Generates synthetic .desktop directories and file trees in a temporary
+directory, seeded so two runs with the same arguments work on identical
+corpora, and times:
+
+    parse      parse_desktop_file, per entry
+    cold       list_apps with no app index on disk
+    warm       list_apps in a fresh session with the app index on disk
+    rescan     rescan_apps with the index already loaded
+    build      AppSearchIndex construction over the app list
+    keystroke  AppSearchIndex.rank for every prefix of typed queries, which
+               is what the launcher's filter_apps runs per keystroke
+    find       core.file_search.find over a file tree: the file index, the
+               backend used without it (fd or os.walk) and os.walk on its own
+    index      building the file index for that tree
+
+Results can be written as JSON and used as the baseline for a later run;
+--compare prints both side by side and exits with status 1 when any p50
+got slower than the threshold allows.
+
+    python -m benchmarks.launcher_search --apps 100 2000 --files 10000
+    python -m benchmarks.launcher_search --json baseline.json
+    python -m benchmarks.launcher_search --compare baseline.json --threshold 0.25
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core import app_launcher, file_search  # noqa: E402
+from core.app_launcher import AppSearchIndex, list_apps, parse_desktop_file, rescan_apps  # noqa: E402
+from core.file_index import FileIndex  # noqa: E402
+
+WORDS = [
+    'audio', 'browser', 'calendar', 'chat', 'clock', 'code', 'color', 'disk', 'document', 'draw',
+    'editor', 'file', 'font', 'game', 'image', 'mail', 'manager', 'map', 'media', 'monitor',
+    'music', 'network', 'note', 'office', 'paint', 'photo', 'player', 'print', 'reader', 'record',
+    'scan', 'screen', 'settings', 'share', 'sheet', 'sound', 'studio', 'system', 'terminal', 'text',
+    'tool', 'video', 'viewer', 'web', 'writer', 'zip',
+]
+CATEGORIES = ['AudioVideo', 'Development', 'Education', 'Game', 'Graphics', 'Network', 'Office',
+              'Settings', 'System', 'Utility']
+MIME_TYPES = ['text/plain', 'text/html', 'image/png', 'image/jpeg', 'application/pdf', 'audio/mpeg',
+              'video/mp4', 'application/zip', 'inode/directory']
+LOCALES = ['de', 'es', 'fr', 'it', 'ja', 'pt_BR', 'ru', 'zh_CN']
+FILE_EXTENSIONS = ['.txt', '.py', '.png', '.jpg', '.pdf', '.md', '.json', '.c', '.h', '.mp3', '']
+# Files per directory and subdirectories per directory in the synthetic trees
+TREE_FILES_PER_DIR = 50
+TREE_FANOUT = 8
+
+
+def make_desktop_entries(directory: Path, count: int, seed: int) -> List[str]:
+    """Write `count` .desktop files shaped like real ones and return the app names."""
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    names = []
+    for i in range(count):
+        words = rng.sample(WORDS, rng.randint(1, 3))
+        name = ' '.join(word.capitalize() for word in words) + f" {i}"
+        command = '-'.join(words) + str(i)
+        names.append(name)
+
+        lines = [
+            "[Desktop Entry]",
+            "Type=Application",
+            f"Name={name}",
+            *(f"Name[{locale}]={name} ({locale})" for locale in rng.sample(LOCALES, rng.randint(0, 4))),
+            f"GenericName={rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()}",
+            f"Comment=Synthetic {' '.join(rng.sample(WORDS, 4))} entry",
+            f"Exec=/usr/bin/{command} %U",
+            f"Icon={words[0]}-{rng.randint(0, count // 10)}",
+            f"Categories={';'.join(rng.sample(CATEGORIES, 2))};",
+            f"Keywords={';'.join(rng.sample(WORDS, 3))};",
+            f"MimeType={';'.join(rng.sample(MIME_TYPES, rng.randint(0, 3)))};",
+        ]
+        if rng.random() < 0.05:
+            lines.append("NoDisplay=true")
+        actions = rng.randint(0, 2) if rng.random() < 0.3 else 0
+        if actions:
+            lines.append("Actions=" + ''.join(f"action{a};" for a in range(actions)))
+            for a in range(actions):
+                lines += ["", f"[Desktop Action action{a}]", f"Name={rng.choice(WORDS).capitalize()} Window",
+                          f"Exec=/usr/bin/{command} --action{a}"]
+        (directory / f"org.example.{command}.desktop").write_text('\n'.join(lines) + '\n', 'utf-8')
+    return names
+
+
+def make_file_tree(root: Path, count: int, seed: int) -> List[str]:
+    """Create `count` empty files in a nested tree and return their names."""
+    rng = random.Random(seed)
+    names = []
+    pending = [root]
+    created = 0
+    while created < count:
+        directory = pending.pop(0)
+        directory.mkdir(parents=True, exist_ok=True)
+        for _ in range(min(TREE_FILES_PER_DIR, count - created)):
+            name = '_'.join(rng.sample(WORDS, 2)) + f"_{created}" + rng.choice(FILE_EXTENSIONS)
+            (directory / name).touch()
+            names.append(name)
+            created += 1
+        pending.extend(directory / f"{rng.choice(WORDS)}_{len(pending)}_{i}" for i in range(TREE_FANOUT))
+    return names
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 4),
+        "p90_ms": round(percentile(samples, 0.90) * 1000, 4),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 4),
+        "max_ms": round((samples[-1] if samples else 0.0) * 1000, 4),
+    }
+
+
+def timed(function: Callable, repeat: int, setup: Optional[Callable] = None) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def use_desktop_dir(desktop_dir: Path, index_path: Path):
+    """Point the launcher at the synthetic entries and a private app index, as a new session."""
+    # Module state is swapped rather than the environment, so the user's real index is never touched
+    app_launcher.get_desktop_dirs_linux = lambda: [desktop_dir]
+    app_launcher.APP_INDEX_PATH = index_path
+    app_launcher._app_cache = None
+    app_launcher._app_index = None
+    app_launcher._last_scan = None
+
+
+def remove_index(index_path: Path):
+    for path in index_path.parent.glob(index_path.name + '*'):
+        path.unlink()
+
+
+def typed_queries(names: List[str], count: int, seed: int) -> List[str]:
+    """Queries as people type them: name prefixes, word starts, acronyms and a few misses."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        name = rng.choice(names).lower()
+        words = name.split()
+        kind = rng.random()
+        if kind < 0.4:
+            queries.append(name[:rng.randint(3, len(name))])
+        elif kind < 0.7:
+            queries.append(rng.choice(words)[:rng.randint(2, 6)])
+        elif kind < 0.9:
+            queries.append(''.join(word[0] for word in words))
+        else:
+            queries.append('qx' + rng.choice(WORDS))
+    return queries
+
+
+def bench_apps(count: int, work_dir: Path, args) -> List[Dict]:
+    desktop_dir = work_dir / f"apps_{count}" / "applications"
+    index_path = work_dir / f"apps_{count}" / "app_index.sqlite3"
+    names = make_desktop_entries(desktop_dir, count, args.seed)
+    files = sorted(desktop_dir.iterdir())
+    results = []
+
+    def add(name: str, samples: List[float], per: int = 1):
+        results.append({"name": name, "size": count,
+                        **summarize([sample / per for sample in samples])})
+
+    add("parse", timed(lambda: [parse_desktop_file(path) for path in files], args.repeat), per=count)
+
+    def cold_setup():
+        use_desktop_dir(desktop_dir, index_path)
+        remove_index(index_path)
+    add("cold", timed(list_apps, args.repeat, cold_setup))
+
+    add("warm", timed(list_apps, args.repeat, lambda: use_desktop_dir(desktop_dir, index_path)))
+
+    use_desktop_dir(desktop_dir, index_path)
+    list_apps()
+    add("rescan", timed(rescan_apps, args.repeat))
+
+    apps = sorted(list_apps(), key=lambda app: app.name.lower())
+    rng = random.Random(args.seed)
+    # Some launch history, so ranking also pays for the frecency boosts
+    frecency = {app.name: rng.uniform(0.5, 20) for app in rng.sample(apps, min(len(apps), 50))}
+    add("build", timed(lambda: AppSearchIndex(apps, frecency), args.repeat))
+
+    search_index = AppSearchIndex(apps, frecency)
+    keystrokes = []
+    for query in typed_queries(names, args.queries, args.seed):
+        # The box starts out empty, as when the launcher opens
+        search_index.rank("")
+        for end in range(1, len(query) + 1):
+            started = time.perf_counter()
+            search_index.rank(query[:end])
+            keystrokes.append(time.perf_counter() - started)
+    add("keystroke", keystrokes)
+    return results
+
+
+def bench_files(count: int, work_dir: Path, args) -> List[Dict]:
+    root = work_dir / f"tree_{count}"
+    names = make_file_tree(root, count, args.seed)
+    rng = random.Random(args.seed)
+    # Common word pairs match many files, a full name one, and the last matches nothing
+    patterns = ['_'.join(rng.sample(WORDS, 2)), rng.choice(WORDS), rng.choice(names), 'qxnothing']
+    backend = 'fd' if shutil.which('fd') else 'native'
+    index = FileIndex(str(root), work_dir / f"tree_{count}.idx")
+    results = [{"name": "index", "size": count, **summarize(timed(index.rebuild, args.repeat))}]
+    for label, search in (("find[index]", index.search),
+                          (f"find[{backend}]", lambda p: file_search.find(p, str(root), use_index=False)),
+                          ("find[walk]", lambda p: file_search._find_native(f"*{p}*", str(root)))):
+        samples = []
+        for pattern in patterns:
+            samples += timed(lambda: search(pattern), args.repeat)
+        results.append({"name": label, "size": count, **summarize(samples)})
+    return results
+
+
+def result_key(result: Dict) -> str:
+    return f"{result['name']}@{result['size']}"
+
+
+def print_report(results: List[Dict], baseline: Optional[Dict[str, Dict]] = None,
+                 threshold: float = 0.0) -> List[str]:
+    """Print the results, next to the baseline if given; return the keys that regressed."""
+    regressions = []
+    header = f"{'benchmark':<18}{'size':>9}{'p50 ms':>12}{'p90 ms':>12}{'p99 ms':>12}{'max ms':>12}"
+    if baseline is not None:
+        header += f"{'base p50':>12}{'change':>10}"
+    print(header)
+    for r in results:
+        line = (f"{r['name']:<18}{r['size']:>9}{r['p50_ms']:>12}{r['p90_ms']:>12}"
+                f"{r['p99_ms']:>12}{r['max_ms']:>12}")
+        if baseline is not None:
+            base = baseline.get(result_key(r))
+            if base is None or not base["p50_ms"]:
+                line += f"{'n/a':>12}"
+            else:
+                change = r["p50_ms"] / base["p50_ms"] - 1
+                line += f"{base['p50_ms']:>12}{change:>+10.1%}"
+                if change > threshold:
+                    regressions.append(result_key(r))
+                    line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app listing, launcher filtering and file search.")
+    parser.add_argument('--apps', type=int, nargs='*', default=[100, 2000, 20000],
+                        help="desktop entry counts to generate")
+    parser.add_argument('--files', type=int, nargs='*', default=[10000, 100000],
+                        help="file tree sizes to generate (1000000 works, it just takes a while)")
+    parser.add_argument('--repeat', type=int, default=5, help="runs of each timed operation")
+    parser.add_argument('--queries', type=int, default=50, help="queries typed per app corpus")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    parser.add_argument('--compare', metavar='PATH', help="JSON from an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="p50 slowdown over the baseline that counts as a regression (0.2 = 20%%)")
+    parser.add_argument('--work-dir', help="where to generate the corpora, a temporary directory by default")
+    args = parser.parse_args()
+
+    if platform.system() == "Windows" and args.apps:
+        # Windows lists Start Menu shortcuts, there are no desktop entries to time
+        print("Skipping the app benchmarks, they need the Linux launcher.")
+        args.apps = []
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = {result_key(r): r for r in json.load(f)["results"]}
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='clara-launcher-bench-', dir=args.work_dir) as work_dir:
+        for count in args.apps:
+            results += bench_apps(count, Path(work_dir), args)
+        for count in args.files:
+            results += bench_files(count, Path(work_dir), args)
+
+    regressions = print_report(results, baseline, args.threshold)
+
+    if args.json:
+        report = {
+            "config": {
+                "apps": args.apps,
+                "files": args.files,
+                "repeat": args.repeat,
+                "queries": args.queries,
+                "seed": args.seed,
+            },
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "fd": shutil.which('fd') is not None,
+            },
+            "results": results,
+        }
+        Path(args.json).write_text(json.dumps(report, indent=2), 'utf-8')
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
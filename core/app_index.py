@@ -0,0 +1,292 @@
+import fnmatch
+import json
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+# Bump whenever parsing changes, so entries written by an older parser are re-parsed
+APP_INDEX_VERSION = 3
+
+APP_FIELDS = ('name', 'exec', 'icon', 'hidden', 'generic_name', 'comment', 'command', 'keywords',
+              'mime_types', 'desktop_id')
+
+# Scanning waits on the disk far more than on the CPU (think /usr on NFS), so threads are enough
+SCAN_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+# Files handed to a worker at a time, per-file tasks would cost more than a warm stat
+SCAN_BATCH_SIZE = 64
+
+
+def app_to_record(app) -> list:
+    return [getattr(app, field) for field in APP_FIELDS]
+
+
+def app_from_record(record: list):
+    from core.app_launcher import App
+    return App(**dict(zip(APP_FIELDS, record)))
+
+
+def _decode_apps(apps: Union[str, list]) -> list:
+    if not isinstance(apps, str):
+        return apps
+    decoded = [app_from_record(record) for record in json.loads(apps)]
+    # Actions repeat their parent's keywords, keep one tuple for all of them
+    shared: Dict[tuple, tuple] = {}
+    for app in decoded:
+        app.keywords = shared.setdefault(app.keywords, app.keywords)
+    return decoded
+
+
+class AppIndex:
+    """Parsed launcher entries persisted in SQLite, keyed by file path, mtime and size.
+
+    A directory whose mtime hasn't moved still holds the same files, so its
+    listing is taken from the index instead of the disk; each file is then
+    only re-parsed when its own mtime or size changed. Anything that goes
+    wrong with the database just turns the index into a pass-through.
+
+    Once a file's apps have been decoded, the index keeps the App objects
+    rather than their JSON, so an unchanged file hands back the very same
+    objects on every rescan and the app list, the last scan and the index
+    share one copy.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        # path -> (mtime_ns, size, directory, apps json as stored, or the decoded apps)
+        self._files: Dict[str, Tuple[int, int, str, Union[str, list]]] = {}
+        # directory -> mtime_ns
+        self._dirs: Dict[str, int] = {}
+        self._seen_files = set()
+        self._seen_dirs = set()
+        self._changed: Dict[str, Tuple[int, int, str, list]] = {}
+        self._changed_dirs: Dict[str, int] = {}
+        self._removed = set()
+        self._open()
+
+    def _open(self):
+        try:
+            self._conn = self._connect()
+        except sqlite3.DatabaseError as e:
+            # A corrupt or foreign file, start over rather than failing the launcher
+            print(f"App index unusable ({e}), rebuilding it.")
+            try:
+                self.path.unlink()
+                self._conn = self._connect()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Could not rebuild the app index: {e}")
+                self._conn = None
+                return
+        except sqlite3.Error as e:
+            print(f"Could not open the app index: {e}")
+            self._conn = None
+            return
+
+        for path, mtime_ns, size, directory, apps in self._conn.execute(
+                "SELECT path, mtime_ns, size, dir, apps FROM files"):
+            self._files[path] = (mtime_ns, size, directory, apps)
+        for directory, mtime_ns in self._conn.execute("SELECT path, mtime_ns FROM dirs"):
+            self._dirs[directory] = mtime_ns
+
+    def _connect(self) -> sqlite3.Connection:
+        # Kept open for the life of the app and used from the watcher thread, callers serialise access
+        conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != APP_INDEX_VERSION:
+            conn.executescript("""
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS dirs;
+                CREATE TABLE files (
+                    path TEXT PRIMARY KEY,
+                    dir TEXT NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    apps TEXT NOT NULL
+                );
+                CREATE TABLE dirs (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL
+                );
+            """)
+            conn.execute(f"PRAGMA user_version = {APP_INDEX_VERSION}")
+            conn.commit()
+        return conn
+
+    def _list_dir(self, directory: str, pattern: str, recursive: bool,
+                  force: bool) -> Tuple[List[str], Optional[int]]:
+        """Return the matching files and, when the disk was listed, the mtime to remember."""
+        if recursive:
+            # Only a directory's direct children bump its mtime, so nested trees are always walked
+            found = []
+            for root, _, names in os.walk(directory):
+                found.extend(os.path.join(root, name) for name in names if fnmatch.fnmatch(name, pattern))
+            return sorted(found), None
+
+        mtime_ns = os.stat(directory).st_mtime_ns
+        if not force and self._dirs.get(directory) == mtime_ns:
+            return sorted(path for path, entry in self._files.items() if entry[2] == directory), None
+
+        found = []
+        with os.scandir(directory) as it:
+            for entry in it:
+                if fnmatch.fnmatch(entry.name, pattern):
+                    found.append(entry.path)
+        return sorted(found), mtime_ns
+
+    def _load_batch(self, batch: List[Tuple[str, str]], parse: Callable[[Path], list], force: bool) -> list:
+        """Stat each (path, directory) and parse it if it changed; runs on a worker thread.
+
+        Only reads the index, the caller applies the returned (apps, entry,
+        changed) items; entry is None when the index already holds it as is.
+        """
+        loaded = []
+        for path, directory in batch:
+            try:
+                st = os.stat(path)
+            except OSError:
+                loaded.append(None)
+                continue
+
+            cached = self._files.get(path)
+            if not force and cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                if isinstance(cached[3], str):
+                    apps = _decode_apps(cached[3])
+                    loaded.append((apps, cached[:3] + (apps,), False))
+                else:
+                    loaded.append((cached[3], None, False))
+            else:
+                apps = parse(Path(path))
+                loaded.append((apps, (st.st_mtime_ns, st.st_size, directory, apps), True))
+        return loaded
+
+    def scan_all(self, directories: List[Path], pattern: str, parse: Callable[[Path], list],
+                 recursive: bool = False, force: bool = False) -> List[List[Tuple[Path, list]]]:
+        """Return (file, apps) for every matching file in each directory, parsing only new or changed ones.
+
+        Directories are listed and files statted and parsed on a thread pool,
+        but results come back in the order of `directories` and, within each,
+        sorted by path, so callers can merge them deterministically. `parse`
+        must be safe to call from several threads.
+        """
+        # A directory listed twice (XDG_DATA_DIRS often repeats /usr/share) is only scanned once
+        directory_strs = list(dict.fromkeys(str(directory) for directory in directories))
+        self._seen_dirs.update(directory_strs)
+
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool:
+            def list_one(directory: str):
+                try:
+                    return self._list_dir(directory, pattern, recursive, force)
+                except OSError:
+                    return [], None
+
+            work = []
+            listings = list(pool.map(list_one, directory_strs))
+            for directory, (paths, mtime_ns) in zip(directory_strs, listings):
+                if mtime_ns is not None:
+                    self._changed_dirs[directory] = mtime_ns
+                work.extend((path, directory) for path in paths)
+
+            batches = [work[i:i + SCAN_BATCH_SIZE] for i in range(0, len(work), SCAN_BATCH_SIZE)]
+            loaded = [item for batch in pool.map(lambda b: self._load_batch(b, parse, force), batches)
+                      for item in batch]
+
+        results = {directory: [] for directory in directory_strs}
+        for (path, directory), item in zip(work, loaded):
+            if item is None:
+                continue
+            apps, entry, changed = item
+            self._seen_files.add(path)
+            if entry is not None:
+                self._files[path] = entry
+            if changed:
+                self._changed[path] = entry
+            results[directory].append((Path(path), apps))
+        return [results.pop(str(directory), []) for directory in directories]
+
+    def scan(self, directory: Path, pattern: str, parse: Callable[[Path], list],
+             recursive: bool = False, force: bool = False) -> List[Tuple[Path, list]]:
+        """scan_all() for a single directory."""
+        return self.scan_all([directory], pattern, parse, recursive, force)[0]
+
+    def refresh_file(self, path: Path, directory: Path, parse: Callable[[Path], list]) -> Optional[list]:
+        """Re-read a single file after a change notification, returning None if it is gone.
+
+        The directory's stored mtime is left alone, so the next full scan
+        still lists it once and picks up anything a missed event hid.
+        """
+        path_str = str(path)
+        try:
+            st = os.stat(path_str)
+        except OSError:
+            if self._files.pop(path_str, None) is not None:
+                self._removed.add(path_str)
+            self._changed.pop(path_str, None)
+            return None
+
+        cached = self._files.get(path_str)
+        if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+            apps = _decode_apps(cached[3])
+            self._files[path_str] = cached[:3] + (apps,)
+            return apps
+
+        apps = parse(path)
+        entry = (st.st_mtime_ns, st.st_size, str(directory), apps)
+        self._files[path_str] = entry
+        self._changed[path_str] = entry
+        self._removed.discard(path_str)
+        return apps
+
+    def save(self, prune: bool = True) -> bool:
+        """Write back what changed and return whether anything did.
+
+        After a full scan (prune=True) files and directories that weren't
+        seen are forgotten; after single-file refreshes only the files
+        reported gone are.
+        """
+        if prune:
+            gone_files = [path for path in self._files if path not in self._seen_files]
+            gone_dirs = [directory for directory in self._dirs if directory not in self._seen_dirs]
+        else:
+            gone_files = []
+            gone_dirs = []
+        gone_removed = list(self._removed)
+        changed = bool(self._changed or self._changed_dirs or gone_files or gone_dirs or gone_removed)
+        # Without a database the index lives in memory only, and is still kept current
+        if self._conn is not None:
+            try:
+                with self._conn:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO files (path, mtime_ns, size, dir, apps) VALUES (?, ?, ?, ?, ?)",
+                        [(path, mtime_ns, size, directory, json.dumps([app_to_record(app) for app in apps]))
+                         for path, (mtime_ns, size, directory, apps) in self._changed.items()]
+                    )
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)",
+                        list(self._changed_dirs.items())
+                    )
+                    self._conn.executemany("DELETE FROM files WHERE path = ?",
+                                           [(p,) for p in gone_files + gone_removed])
+                    self._conn.executemany("DELETE FROM dirs WHERE path = ?", [(d,) for d in gone_dirs])
+            except sqlite3.Error as e:
+                print(f"Could not save the app index: {e}")
+                return changed
+
+        for path in gone_files:
+            del self._files[path]
+        for directory in gone_dirs:
+            del self._dirs[directory]
+        self._dirs.update(self._changed_dirs)
+        self._changed.clear()
+        self._changed_dirs.clear()
+        self._removed.clear()
+        if prune:
+            self._seen_files.clear()
+            self._seen_dirs.clear()
+        return changed
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
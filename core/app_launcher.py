@@ -1,39 +1,70 @@
 from pathlib import Path
 import os
-import configparser
-from typing import Optional, List
+import re
+from typing import Dict, Optional, List, Sequence
 import platform
 import subprocess
 import shlex
+import sys
+import threading
+
+from core.app_index import APP_FIELDS, AppIndex
+from core.app_ranking import FrecencyStore, SCORE_MATCH, char_bonuses, frecency_bonus, fuzzy_score
+from core.config import config
+from core.mime_apps import MimeAppIndex, get_mimeapps_paths, guess_mime_type
+from core.shell_link import read_shell_link
 
 if platform.system() == "Windows":
     try:
         from win32com.client import Dispatch  # type: ignore
+        import pythoncom  # type: ignore
         import win32api  # type: ignore
         import win32con  # type: ignore
     except ImportError:
         print("Windows specific functionality requires 'pywin32'. Please run 'pip install pywin32'.")
         Dispatch = None
+        pythoncom = None
         win32api = None
         win32con = None
 
 _app_cache: Optional[list['App']] = None
+# Held while the list is being built, so a dialog opened during the preload waits for it instead of rescanning
+_app_cache_lock = threading.Lock()
+APP_INDEX_PATH = config.config_dir / "app_index.sqlite3"
+_app_index: Optional[AppIndex] = None
+# (desktop dirs, [(file, apps)] per dir) from the last Linux scan, patched in place by change events
+_last_scan: Optional[tuple] = None
+FRECENCY_PATH = config.config_dir / "app_frecency.json"
+_frecency_store: Optional[FrecencyStore] = None
+_mime_index: Optional[MimeAppIndex] = None
+
+def intern_strings(values: Sequence[str]) -> tuple:
+    return tuple(sys.intern(value) for value in values)
 
 class App:
-    def __init__(self, name: str, exec: str, icon: str = "", hidden: bool = False, generic_name: str = "", comment: str = "", command: str = "", keywords: Optional[List[str]] = None):
+    # Every installed app stays in memory for the whole session, so no per-instance __dict__
+    __slots__ = APP_FIELDS
+
+    def __init__(self, name: str, exec: str, icon: str = "", hidden: bool = False, generic_name: str = "", comment: str = "", command: str = "", keywords: Optional[Sequence[str]] = None, mime_types: Optional[Sequence[str]] = None, desktop_id: str = ""):
         self.name = name
         self.exec = exec
-        self.icon = icon
+        # Icons, commands, generic names and keywords repeat across apps and their actions
+        self.icon = sys.intern(icon)
         self.hidden = hidden
-        self.generic_name = generic_name
+        self.generic_name = sys.intern(generic_name)
         self.comment = comment
-        self.command = command if command else os.path.basename(exec.split(' ')[0])
-        self.keywords = keywords if keywords is not None else []
+        self.command = sys.intern(command if command else os.path.basename(exec.split(' ')[0]))
+        # A tuple is taken as already interned, so actions can share their parent's
+        self.keywords = keywords if isinstance(keywords, tuple) else intern_strings(keywords or ())
+        self.mime_types = mime_types if isinstance(mime_types, tuple) else intern_strings(mime_types or ())
+        # The .desktop file name, which is how mimeapps.list refers to the app
+        self.desktop_id = desktop_id
     
     def __str__(self):
-        return f"App(name={self.name}, exec={self.exec}, command={self.command}, icon={self.icon}, hidden={self.hidden}, generic_name={self.generic_name}, comment={self.comment}, keywords={self.keywords})"
+        return f"App(name={self.name}, exec={self.exec}, command={self.command}, icon={self.icon}, hidden={self.hidden}, generic_name={self.generic_name}, comment={self.comment}, keywords={self.keywords}, mime_types={self.mime_types}, desktop_id={self.desktop_id})"
 
-def get_desktop_dirs_linux():
+def get_desktop_dir_candidates_linux() -> List[Path]:
+    """Every directory desktop entries are read from, including ones that don't exist (yet)."""
     dirs = [
         Path.home() / ".local/share/applications",
         Path.home() / ".var/lib/app/flatpak/exports/share/applications",
@@ -47,7 +78,10 @@ def get_desktop_dirs_linux():
         if xdg_dir:
             dirs.append(Path(xdg_dir) / "applications")
     
-    return [d for d in dirs if d.exists()]
+    return dirs
+
+def get_desktop_dirs_linux():
+    return [d for d in get_desktop_dir_candidates_linux() if d.exists()]
 
 def get_start_menu_dirs_windows():
     appdata = os.getenv('APPDATA')
@@ -59,47 +93,119 @@ def get_start_menu_dirs_windows():
         dirs.append(Path(programdata) / "Microsoft/Windows/Start Menu/Programs")
     return [d for d in dirs if d.exists()]
 
+DESKTOP_ENTRY_GROUP = 'Desktop Entry'
+DESKTOP_ACTION_PREFIX = 'Desktop Action '
+_DESKTOP_ESCAPES = {'s': ' ', 'n': '\n', 't': '\t', 'r': '\r', '\\': '\\', ';': ';'}
+_DESKTOP_ESCAPE_RE = re.compile(r'\\(.)')
+_DESKTOP_LIST_SPLIT_RE = re.compile(r'(?<!\\);')
+
+def _unescape_desktop_value(value: str) -> str:
+    if '\\' not in value:
+        return value
+    return _DESKTOP_ESCAPE_RE.sub(lambda m: _DESKTOP_ESCAPES.get(m.group(1), m.group(0)), value)
+
+def _split_desktop_list(value: str) -> List[str]:
+    items = (_unescape_desktop_value(item).strip() for item in _DESKTOP_LIST_SPLIT_RE.split(value))
+    return [item for item in items if item]
+
+def _is_desktop_true(value: Optional[str]) -> bool:
+    return value is not None and value.lower() == 'true'
+
+def read_desktop_groups(file_path: Path) -> Dict[str, Dict[str, str]]:
+    """Read the [Desktop Entry] group and the action groups it lists, nothing else.
+
+    Localized keys (Name[de]) are skipped, the first occurrence of a key
+    wins, and reading stops as soon as the entry turns out to be hidden or
+    every listed action has been seen.
+    """
+    groups: Dict[str, Dict[str, str]] = {}
+    current: Optional[Dict[str, str]] = None
+    # Action groups still to be read, unknown until the main group is complete
+    wanted: Optional[set] = None
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line[0] in '#;':
+                continue
+
+            if line[0] == '[' and line[-1] == ']':
+                main_entry = groups.get(DESKTOP_ENTRY_GROUP)
+                if main_entry is not None and wanted is None and current is main_entry:
+                    if (_is_desktop_true(main_entry.get('Hidden')) or
+                            _is_desktop_true(main_entry.get('NoDisplay')) or
+                            not main_entry.get('Name')):
+                        break
+                    wanted = {f"{DESKTOP_ACTION_PREFIX}{action}"
+                              for action in main_entry.get('Actions', '').split(';') if action}
+                    # Groups that came before the main one count too
+                    wanted.difference_update(groups)
+                elif wanted is not None and current is not None:
+                    wanted.difference_update(name for name, group in groups.items() if group is current)
+                if wanted is not None and not wanted:
+                    break
+
+                name = line[1:-1]
+                if name in groups:
+                    current = None
+                elif name == DESKTOP_ENTRY_GROUP or (
+                        name.startswith(DESKTOP_ACTION_PREFIX) and (wanted is None or name in wanted)):
+                    current = groups[name] = {}
+                else:
+                    current = None
+                continue
+
+            if current is None:
+                continue
+            key, sep, value = line.partition('=')
+            if not sep:
+                continue
+            key = key.strip()
+            if '[' in key or key in current:
+                continue
+            current[key] = value.strip()
+
+    return groups
+
 def parse_desktop_file(file_path: Path) -> list[App]:
-    apps = []
-    config = configparser.ConfigParser(interpolation=None)
-    
     try:
-        config.read(file_path, encoding='utf-8')
-    except Exception:
+        groups = read_desktop_groups(file_path)
+    except (OSError, UnicodeDecodeError):
         return []
 
-    if 'Desktop Entry' not in config:
+    main_entry = groups.get(DESKTOP_ENTRY_GROUP)
+    if main_entry is None:
         return []
 
-    main_entry = config['Desktop Entry']
-    main_name = main_entry.get('Name')
-    
-    is_hidden = main_entry.get('Hidden', 'false').lower() == 'true' or \
-                main_entry.get('NoDisplay', 'false').lower() == 'true'
+    apps = []
+    main_name = _unescape_desktop_value(main_entry.get('Name', ''))
+    is_hidden = _is_desktop_true(main_entry.get('Hidden')) or _is_desktop_true(main_entry.get('NoDisplay'))
 
     if main_name and not is_hidden:
+        # Exec keeps its escapes, launch() applies the Exec quoting rules to the raw value
         main_exec = main_entry.get('Exec')
-        keywords_str = main_entry.get('Keywords', '')
-        keywords = [k.strip() for k in keywords_str.split(';') if k.strip()]
+        icon = _unescape_desktop_value(main_entry.get('Icon', ''))
+        keywords = intern_strings(_split_desktop_list(main_entry.get('Keywords', '')))
 
         if main_exec:
             apps.append(App(
                 name=main_name,
                 exec=main_exec,
-                icon=main_entry.get('Icon', ''),
+                icon=icon,
                 hidden=False,
-                generic_name=main_entry.get('GenericName', ''),
-                comment=main_entry.get('Comment', ''),
-                keywords=keywords
+                generic_name=_unescape_desktop_value(main_entry.get('GenericName', '')),
+                comment=_unescape_desktop_value(main_entry.get('Comment', '')),
+                keywords=keywords,
+                mime_types=intern_strings(_split_desktop_list(main_entry.get('MimeType', ''))),
+                desktop_id=file_path.name
             ))
 
         if 'Actions' in main_entry:
             action_ids = [action for action in main_entry['Actions'].split(';') if action]
             for action_id in action_ids:
-                action_section_name = f'Desktop Action {action_id}'
-                if action_section_name in config:
-                    action_section = config[action_section_name]
-                    action_name = action_section.get('Name')
+                action_section = groups.get(f'{DESKTOP_ACTION_PREFIX}{action_id}')
+                if action_section is not None:
+                    action_name = _unescape_desktop_value(action_section.get('Name', ''))
                     action_exec = action_section.get('Exec')
 
                     if action_name and action_exec:
@@ -107,16 +213,53 @@ def parse_desktop_file(file_path: Path) -> list[App]:
                         apps.append(App(
                             name=combined_name,
                             exec=action_exec,
-                            icon=main_entry.get('Icon', ''),
+                            icon=icon,
                             keywords=keywords
                         ))
     return apps
 
+_com_local = threading.local()
+
+def _get_wscript_shell():
+    # COM objects belong to the thread that made them, so each scanning thread keeps its own
+    shell = getattr(_com_local, "shell", None)
+    if shell is None:
+        pythoncom.CoInitialize()
+        shell = _com_local.shell = Dispatch("WScript.Shell")
+    return shell
+
 def parse_lnk_file(file_path: Path) -> Optional[App]:
-    if not Dispatch:
+    """Read a Start Menu shortcut directly, asking the shell through COM only when that can't.
+
+    Advertised (MSI) shortcuts and ones that only hold an item ID list have
+    no target path in the file, those still go through WScript.Shell.
+    """
+    try:
+        link = read_shell_link(file_path)
+    except (OSError, ValueError):
+        link = None
+    if link is None or link.advertised or not link.target:
+        return _parse_lnk_file_com(file_path)
+
+    if not os.path.exists(link.target):
+        return None
+
+    full_exec = f'"{link.target}"'
+    if link.arguments:
+        full_exec += f' {link.arguments}'
+
+    return App(
+        name=file_path.stem,
+        exec=full_exec,
+        comment=link.description,
+        icon=link.icon_location
+    )
+
+def _parse_lnk_file_com(file_path: Path) -> Optional[App]:
+    if platform.system() != "Windows" or not Dispatch:
         return None
     try:
-        shell = Dispatch("WScript.Shell")
+        shell = _get_wscript_shell()
         shortcut = shell.CreateShortCut(str(file_path))
         
         target = shortcut.TargetPath
@@ -143,12 +286,13 @@ def is_user_dir(path: Path) -> bool:
     user_home = str(Path.home())
     return path_str.startswith(user_home)
 
-def list_apps_linux() -> List[App]:
+def merge_apps_linux(desktop_dirs: List[Path], scanned: list) -> List[App]:
     apps_dict = {}
-    for desktop_dir in get_desktop_dirs_linux():
+    # Merged in directory order, exactly as a sequential scan would
+    for desktop_dir, entries in zip(desktop_dirs, scanned):
         is_user = is_user_dir(desktop_dir)
-        for file_path in desktop_dir.glob("*.desktop"):
-            for app in parse_desktop_file(file_path):
+        for _, apps in entries:
+            for app in apps:
                 if app.hidden or not app.name or not app.exec:
                     continue
                 
@@ -160,60 +304,297 @@ def list_apps_linux() -> List[App]:
                     apps_dict[app.name] = (app, is_user)
     return [app for app, _ in apps_dict.values()]
 
-def list_apps_windows() -> List[App]:
+def list_apps_linux(index: AppIndex, force: bool = False) -> List[App]:
+    global _last_scan
+    desktop_dirs = get_desktop_dirs_linux()
+    scanned = index.scan_all(desktop_dirs, "*.desktop", parse_desktop_file, force=force)
+    _last_scan = (desktop_dirs, scanned)
+    return merge_apps_linux(desktop_dirs, scanned)
+
+def _parse_lnk_entries(file_path: Path) -> list[App]:
+    app = parse_lnk_file(file_path)
+    return [app] if app else []
+
+def list_apps_windows(index: AppIndex, force: bool = False) -> List[App]:
     apps_dict = {}
-    for start_menu_dir in get_start_menu_dirs_windows():
-        for file_path in start_menu_dir.rglob("*.lnk"):
-            app = parse_lnk_file(file_path)
-            if app and app.exec and app.name:
-                if app.exec not in apps_dict or len(app.name) > len(apps_dict[app.exec].name):
-                    apps_dict[app.exec] = app
+    start_menu_dirs = get_start_menu_dirs_windows()
+    scanned = index.scan_all(start_menu_dirs, "*.lnk", _parse_lnk_entries, recursive=True, force=force)
+    for entries in scanned:
+        for _, apps in entries:
+            for app in apps:
+                if app.exec and app.name:
+                    if app.exec not in apps_dict or len(app.name) > len(apps_dict[app.exec].name):
+                        apps_dict[app.exec] = app
     return list(apps_dict.values())
 
 def list_apps(force_reload: bool = False) -> list[App]:
-    global _app_cache
-    
-    if _app_cache is not None and not force_reload:
+    """Return the installed apps, re-parsing only entries that changed since the last run.
+
+    Parsed entries persist in the app index in the config dir, so a warm
+    start costs a stat per file. force_reload re-parses everything.
+    """
+    with _app_cache_lock:
+        if _app_cache is not None and not force_reload:
+            return _app_cache
+        _scan_apps(force_reload)
         return _app_cache
-    
+
+def _scan_apps(force: bool) -> bool:
+    global _app_cache, _app_index
+
+    if _app_index is None:
+        _app_index = AppIndex(APP_INDEX_PATH)
     if platform.system() == "Windows":
-        _app_cache = list_apps_windows()
+        _app_cache = list_apps_windows(_app_index, force)
     else:
-        _app_cache = list_apps_linux()
-        
-    return _app_cache
+        _app_cache = list_apps_linux(_app_index, force)
+    return _app_index.save()
+
+def rescan_apps() -> bool:
+    """Rescan through the app index, re-parsing only what changed; returns whether anything did."""
+    with _app_cache_lock:
+        return _scan_apps(False)
+
+def apply_desktop_file_changes(paths) -> bool:
+    """Re-read just the given .desktop files and re-merge the list from the last scan.
+
+    Paths outside the scanned directories are ignored. Returns whether the
+    list was rebuilt.
+    """
+    global _app_cache
+
+    with _app_cache_lock:
+        if _last_scan is None or _app_index is None:
+            # Nothing listed yet, the first list_apps() will see the files anyway
+            return False
+
+        desktop_dirs, scanned = _last_scan
+        changed = False
+        for path in paths:
+            path = Path(path)
+            if path.suffix != ".desktop" or path.parent not in desktop_dirs:
+                continue
+            entries = scanned[desktop_dirs.index(path.parent)]
+            apps = _app_index.refresh_file(path, path.parent, parse_desktop_file)
+
+            entries[:] = [entry for entry in entries if entry[0] != path]
+            if apps is not None:
+                position = next((i for i, entry in enumerate(entries) if str(entry[0]) > str(path)), len(entries))
+                entries.insert(position, (path, apps))
+            changed = True
+
+        if changed:
+            _app_cache = merge_apps_linux(desktop_dirs, scanned)
+            _app_index.save(prune=False)
+        return changed
 
 def reload_app_cache() -> list[App]:
     return list_apps(force_reload=True)
 
-def launch(app: App):
+def normalize_command(text: str) -> str:
+    return text.lower().replace(' ', '').replace('-', '').replace('_', '')
+
+# Joins an app's searchable fields so one substring test covers them all without matching across fields
+_FIELD_SEPARATOR = '\0'
+
+class AppSearchIndex:
+    """Fuzzy, ranked search over the launcher fields, precomputed once per app list.
+
+    An app matches when the lowercased query is an in-order subsequence of
+    its name, the query with spaces, dashes and underscores removed is one
+    of its command, or the query occurs as-is in its generic name, comment
+    or a keyword. Matches are ranked fzf-style, favouring word starts and
+    runs of consecutive characters, plus a boost for apps launched often
+    and recently, so the app wanted is usually the first result. Only apps
+    containing every character of the query are scored; when the query
+    extends the previous one, only the previous matches are.
+    """
+
+    def __init__(self, apps: List[App], frecency: Optional[Dict[str, float]] = None):
+        self.apps = apps
+        self._names: List[str] = []
+        self._name_bonuses: List[List[int]] = []
+        self._commands: List[str] = []
+        self._command_bonuses: List[List[int]] = []
+        self._haystacks: List[str] = []
+        self._boosts: List[float] = []
+        # character -> ids of the apps that contain it in any field
+        self._char_ids: Dict[str, set] = {}
+        self._last_query: Optional[str] = None
+        self._last_ids: List[int] = []
+
+        frecency = frecency or {}
+        for i, app in enumerate(apps):
+            name = app.name.lower()
+            command = normalize_command(app.command) if app.command else ""
+            fields = [app.generic_name.lower()] if app.generic_name else []
+            if app.comment:
+                fields.append(app.comment.lower())
+            fields.extend(keyword.lower() for keyword in app.keywords)
+            haystack = _FIELD_SEPARATOR.join(fields)
+
+            self._names.append(name)
+            # Bonuses come from the original case, so camelCase humps count as word starts
+            self._name_bonuses.append(char_bonuses(app.name) if len(app.name) == len(name) else char_bonuses(name))
+            self._commands.append(command)
+            self._command_bonuses.append(char_bonuses(command))
+            self._haystacks.append(haystack)
+            self._boosts.append(frecency_bonus(frecency[app.name]) if app.name in frecency else 0.0)
+            for ch in set(name) | set(command) | set(haystack):
+                ids = self._char_ids.get(ch)
+                if ids is None:
+                    self._char_ids[ch] = {i}
+                else:
+                    ids.add(i)
+
+    def _candidates(self, command_text: str) -> List[int]:
+        # Every kind of match needs at least the characters left in the normalized query
+        postings = []
+        for ch in set(command_text):
+            ids = self._char_ids.get(ch)
+            if not ids:
+                return []
+            postings.append(ids)
+        if not postings:
+            return list(range(len(self.apps)))
+        postings.sort(key=len)
+        result = set(postings[0])
+        for ids in postings[1:]:
+            result &= ids
+        return sorted(result)
+
+    def _score(self, i: int, text: str, command_text: str) -> Optional[int]:
+        best = fuzzy_score(text, self._names[i], self._name_bonuses[i])
+        if command_text and self._commands[i]:
+            score = fuzzy_score(command_text, self._commands[i], self._command_bonuses[i])
+            if score is not None and (best is None or score > best):
+                best = score
+        if best is None and text in self._haystacks[i]:
+            # A description or keyword hit, ranked like half a plain name match
+            best = SCORE_MATCH * len(text) // 2
+        return best
+
+    def rank(self, text: str) -> List[int]:
+        """Return the positions of the matching apps, best first; ties keep the original order."""
+        if not text:
+            self._last_query = None
+            # Nothing typed yet, so offer the most used apps first
+            return sorted(range(len(self.apps)), key=lambda i: -self._boosts[i])
+
+        text = text.lower()
+        command_text = normalize_command(text)
+
+        if self._last_query is not None and self._last_query in text:
+            # Anything matching the longer query also matched the shorter one
+            candidates = self._last_ids
+        else:
+            candidates = self._candidates(command_text)
+
+        ids = []
+        ranked = []
+        boosts = self._boosts
+        for i in candidates:
+            score = self._score(i, text, command_text)
+            if score is not None:
+                ids.append(i)
+                ranked.append((-(score + boosts[i]), i))
+        ranked.sort()
+        self._last_query = text
+        self._last_ids = ids
+        return [i for _, i in ranked]
+
+    def search(self, text: str) -> List[App]:
+        """rank(), as the apps themselves."""
+        return [self.apps[i] for i in self.rank(text)]
+
+def get_mime_index() -> MimeAppIndex:
+    """The MIME associations for the current app list, rebuilt only when the list or mimeapps.list changes."""
+    global _mime_index
+    apps = list_apps()
+    if _mime_index is None or not _mime_index.is_current(apps):
+        if platform.system() == "Windows":
+            # Windows keeps associations in the registry, shortcuts carry no MIME types
+            _mime_index = MimeAppIndex(apps, [], [])
+        else:
+            data_dirs = list(dict.fromkeys(directory.parent for directory in get_desktop_dirs_linux()))
+            _mime_index = MimeAppIndex(apps, get_mimeapps_paths(data_dirs), data_dirs)
+    return _mime_index
+
+def apps_for_file(file_path: str) -> List[App]:
+    return get_mime_index().apps_for(guess_mime_type(file_path))
+
+# Exec field codes, %f/%u take one file and %F/%U all of them; %i, %c, %k and deprecated ones are dropped
+_FIELD_CODE_RE = re.compile(r'%(.)')
+
+def expand_exec(exec: str, files: List[str]) -> List[str]:
+    """Split a desktop entry Exec value into arguments, substituting files for its field codes.
+
+    An entry without a file field code gets the files appended.
+    """
+    args = []
+    used_files = False
+
+    def field(match):
+        nonlocal used_files
+        code = match.group(1)
+        if code == '%':
+            return '%'
+        if code in 'fuFU':
+            used_files = True
+            return files[0] if files else ''
+        return ''
+
+    for arg in shlex.split(exec):
+        if arg in ('%F', '%U'):
+            args.extend(files)
+            used_files = True
+        elif arg in ('%f', '%u'):
+            args.extend(files[:1])
+            used_files = True
+        else:
+            expanded = _FIELD_CODE_RE.sub(field, arg)
+            # An argument that was only a dropped code (%i and the like) disappears
+            if expanded or '%' not in arg:
+                args.append(expanded)
+    if not used_files:
+        args.extend(files)
+    return args
+
+def get_frecency_store() -> FrecencyStore:
+    global _frecency_store
+    if _frecency_store is None:
+        _frecency_store = FrecencyStore(FRECENCY_PATH)
+    return _frecency_store
+
+def launch(app: App, files: Optional[List[str]] = None):
+    """Start app, opening files with it when given.
+
+    Failures are raised for the caller to report.
+    """
     if platform.system() == "Windows":
         if not win32api or not win32con:
-            print(f"Failed to launch '{app.name}': pywin32 components are missing.")
-            return
+            raise RuntimeError("pywin32 components are missing")
+
+        command_parts = shlex.split(app.exec, posix=False)
+        target = command_parts[0]
         
-        try:
-            command_parts = shlex.split(app.exec, posix=False)
-            target = command_parts[0]
-            
-            arguments = subprocess.list2cmdline(command_parts[1:])
-
-            win32api.ShellExecute(
-                0,                          # Parent window handle (0 for desktop)
-                "open",                     # Operation
-                target,                     # File to execute or open
-                arguments,                  # Parameters
-                "",                       # Working directory (None for default)
-                win32con.SW_SHOWNORMAL      # How to show the window
-            )
-        except Exception as e:
-            print(f"Failed to launch '{app.name}': {e}")
+        arguments = subprocess.list2cmdline(command_parts[1:] + (files or []))
+
+        win32api.ShellExecute(
+            0,                          # Parent window handle (0 for desktop)
+            "open",                     # Operation
+            target,                     # File to execute or open
+            arguments,                  # Parameters
+            "",                       # Working directory (None for default)
+            win32con.SW_SHOWNORMAL      # How to show the window
+        )
     else:
-        cleaned_exec = app.exec.split(' %')[0]
-        try:
+        if files:
+            subprocess.Popen(expand_exec(app.exec, files))
+        else:
+            cleaned_exec = app.exec.split(' %')[0]
             subprocess.Popen(shlex.split(cleaned_exec))
-        except Exception as e:
-            print(f"Failed to launch '{app.name}': {e}")
+    get_frecency_store().record(app.name)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,166 @@
+import json
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# fzf's scoring scheme: every matched character scores, gaps cost, and matches
+# at word starts or runs of consecutive matches earn bonuses
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_BOUNDARY = SCORE_MATCH // 2
+BONUS_BOUNDARY_WHITE = BONUS_BOUNDARY + 2
+BONUS_CAMEL = BONUS_BOUNDARY + SCORE_GAP_EXTENSION
+BONUS_CONSECUTIVE = -(SCORE_GAP_START + SCORE_GAP_EXTENSION)
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+
+_CLASS_WHITE, _CLASS_DELIMITER, _CLASS_LOWER, _CLASS_UPPER, _CLASS_DIGIT, _CLASS_OTHER = range(6)
+_DELIMITERS = set('/-_.,:;|')
+
+# How long a launch takes to lose half its weight in the frecency score
+FRECENCY_HALF_LIFE = 7 * 24 * 3600
+# Points per doubling of an app's frecency, about four gap penalties per step
+FRECENCY_WEIGHT = 10
+
+
+def _char_class(ch: str) -> int:
+    if ch.isspace():
+        return _CLASS_WHITE
+    if ch in _DELIMITERS:
+        return _CLASS_DELIMITER
+    if ch.islower():
+        return _CLASS_LOWER
+    if ch.isupper():
+        return _CLASS_UPPER
+    if ch.isdigit():
+        return _CLASS_DIGIT
+    return _CLASS_OTHER
+
+
+def char_bonuses(text: str) -> List[int]:
+    """Bonus for a match at each position of text, from the class of it and the character before."""
+    bonuses = []
+    previous = _CLASS_WHITE
+    for ch in text:
+        current = _char_class(ch)
+        if current in (_CLASS_LOWER, _CLASS_UPPER, _CLASS_DIGIT, _CLASS_OTHER):
+            if previous == _CLASS_WHITE:
+                bonus = BONUS_BOUNDARY_WHITE
+            elif previous == _CLASS_DELIMITER:
+                bonus = BONUS_BOUNDARY + 1
+            elif previous == _CLASS_OTHER:
+                bonus = BONUS_BOUNDARY
+            elif (previous == _CLASS_LOWER and current == _CLASS_UPPER) or \
+                    (previous != _CLASS_DIGIT and current == _CLASS_DIGIT):
+                bonus = BONUS_CAMEL
+            else:
+                bonus = 0
+        else:
+            bonus = BONUS_BOUNDARY if current == _CLASS_DELIMITER else 0
+        bonuses.append(bonus)
+        previous = current
+    return bonuses
+
+
+def fuzzy_score(query: str, text: str, bonuses: List[int]) -> Optional[int]:
+    """Score query as an in-order subsequence of text, both lowercased, or None if it isn't one.
+
+    Like fzf's v1 algorithm: find the first complete match, walk back from
+    its end to the shortest window that still holds it, then score that
+    window.
+    """
+    pos = -1
+    for ch in query:
+        pos = text.find(ch, pos + 1)
+        if pos < 0:
+            return None
+    end = pos
+
+    pos = end + 1
+    for ch in reversed(query):
+        pos = text.rfind(ch, 0, pos)
+    start = pos
+
+    score = 0
+    qi = 0
+    last = len(query) - 1
+    consecutive = 0
+    first_bonus = 0
+    in_gap = False
+    for i in range(start, end + 1):
+        if text[i] == query[qi]:
+            bonus = bonuses[i]
+            if consecutive == 0:
+                first_bonus = bonus
+            else:
+                # A run keeps the bonus of the boundary it started at
+                if bonus >= BONUS_BOUNDARY and bonus > first_bonus:
+                    first_bonus = bonus
+                bonus = max(bonus, first_bonus, BONUS_CONSECUTIVE)
+            score += SCORE_MATCH + (bonus * BONUS_FIRST_CHAR_MULTIPLIER if qi == 0 else bonus)
+            consecutive += 1
+            in_gap = False
+            if qi == last:
+                break
+            qi += 1
+        else:
+            score += SCORE_GAP_EXTENSION if in_gap else SCORE_GAP_START
+            in_gap = True
+            consecutive = 0
+            first_bonus = 0
+    return score
+
+
+def frecency_bonus(frecency: float) -> float:
+    return FRECENCY_WEIGHT * math.log2(1 + frecency)
+
+
+class FrecencyStore:
+    """Launch history as one exponentially decaying score per app, persisted as JSON.
+
+    Each launch adds 1 to the app's score, and the score halves every
+    FRECENCY_HALF_LIFE, so both frequent and recent use count.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        # key -> [score, timestamp the score was taken at]
+        self._entries: Dict[str, List[float]] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._entries = {key: [float(v[0]), float(v[1])] for key, v in data.items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, TypeError, IndexError, AttributeError) as e:
+            print(f"Error loading launch history: {e}. Starting fresh.")
+
+    @staticmethod
+    def _decayed(entry: List[float], now: float) -> float:
+        return entry[0] * 0.5 ** (max(0.0, now - entry[1]) / FRECENCY_HALF_LIFE)
+
+    def record(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            score = self._decayed(entry, now) if entry else 0.0
+            self._entries[key] = [score + 1.0, now]
+            self._save()
+
+    def scores(self) -> Dict[str, float]:
+        now = time.time()
+        with self._lock:
+            return {key: self._decayed(entry, now) for key, entry in self._entries.items()}
+
+    def _save(self):
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Error saving launch history: {e}")
@@ -0,0 +1,227 @@
+import ctypes
+import ctypes.util
+import os
+import platform
+import select
+import struct
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from core import app_launcher
+
+# inotify(7) event bits
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_MASK_ADD = 0x20000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+# On the closest existing parent of a desktop-entry directory that doesn't exist yet, to see it appear.
+# Added to whatever mask the parent already has, in case it is watched for its own sake too
+PARENT_WATCH_MASK = IN_CREATE | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_MASK_ADD
+EVENT_HEADER = struct.Struct('iIII')
+
+# Package managers drop many files at once, so events are gathered for this long before re-reading
+DEBOUNCE_SECONDS = 0.5
+# How often the fallback rescans when change notifications aren't available
+POLL_INTERVAL = 30
+
+
+def load_inotify():
+    if platform.system() != "Linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class AppWatcher:
+    """Keeps the app list current by applying changes to launcher entries as they happen.
+
+    On Linux the desktop-entry directories are watched with inotify and only
+    the touched files are re-read. A directory that doesn't exist yet, or is
+    deleted later, is waited for through a watch on its closest existing
+    parent. Elsewhere, or when inotify can't be set up, the index is
+    rescanned every POLL_INTERVAL seconds, which re-parses nothing that
+    didn't change. on_change runs on the watcher thread.
+    """
+
+    def __init__(self, on_change: Optional[Callable[[], None]] = None):
+        self.on_change = on_change
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._libc = None
+        # wd -> desktop-entry directory, and wd -> parent waited on for missing ones
+        self._watches: Dict[int, str] = {}
+        self._parent_watches: Dict[int, str] = {}
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _notify(self, changed: bool):
+        if changed and self.on_change:
+            try:
+                self.on_change()
+            except Exception as e:
+                print(f"App watcher callback failed: {e}")
+
+    def _run(self, stop_event: threading.Event):
+        fd = self._setup_inotify()
+        if fd is None:
+            self._poll(stop_event)
+            return
+        try:
+            self._watch(fd, stop_event)
+        finally:
+            os.close(fd)
+            self._watches = {}
+            self._parent_watches = {}
+
+    def _setup_inotify(self) -> Optional[int]:
+        libc = load_inotify()
+        if libc is None:
+            return None
+
+        fd = libc.inotify_init1(os.O_CLOEXEC)
+        if fd < 0:
+            print(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), polling for app changes.")
+            return None
+
+        self._libc = libc
+        self._sync_watches(fd)
+        if not self._watches and not self._parent_watches:
+            os.close(fd)
+            return None
+        return fd
+
+    def _sync_watches(self, fd: int) -> bool:
+        """Watch every desktop-entry directory that exists, and the parents of those that don't.
+
+        Returns whether a directory got a watch it didn't have, its files then need a rescan.
+        """
+        added = False
+        wanted_parents = set()
+        for directory in app_launcher.get_desktop_dir_candidates_linux():
+            path = str(directory)
+            if path in self._watches.values():
+                continue
+            wd = self._libc.inotify_add_watch(fd, os.fsencode(path), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = path
+                added = True
+                continue
+
+            parent = os.path.dirname(path)
+            while parent != os.path.dirname(parent) and not os.path.isdir(parent):
+                parent = os.path.dirname(parent)
+            wanted_parents.add(parent)
+
+        for wd, parent in list(self._parent_watches.items()):
+            if parent not in wanted_parents:
+                del self._parent_watches[wd]
+                # The same directory can be watched for its own entries, that watch has to stay
+                if wd not in self._watches:
+                    self._libc.inotify_rm_watch(fd, wd)
+        for parent in wanted_parents - set(self._parent_watches.values()):
+            wd = self._libc.inotify_add_watch(fd, os.fsencode(parent), PARENT_WATCH_MASK)
+            if wd >= 0:
+                self._parent_watches[wd] = parent
+        return added
+
+    def _watch(self, fd: int, stop_event: threading.Event):
+        watches = self._watches
+        pending = set()
+        rescan = False
+        resync = False
+        deadline = None
+
+        while not stop_event.is_set():
+            timeout = 1.0 if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([fd], [], [], timeout)
+
+            if readable:
+                data = os.read(fd, 64 * 1024)
+                offset = 0
+                while offset + EVENT_HEADER.size <= len(data):
+                    wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                    offset += EVENT_HEADER.size
+                    name = data[offset:offset + length].rstrip(b'\0')
+                    offset += length
+
+                    if mask & IN_Q_OVERFLOW:
+                        # Events were dropped, only a rescan can tell what changed
+                        rescan = True
+                        resync = True
+                        continue
+                    if mask & IN_IGNORED:
+                        # The directory is gone, or was moved and its watch removed below
+                        watches.pop(wd, None)
+                        self._parent_watches.pop(wd, None)
+                        rescan = True
+                        resync = True
+                        continue
+                    if mask & IN_MOVE_SELF:
+                        # The watch follows the directory to its new place, which isn't read any more
+                        self._libc.inotify_rm_watch(fd, wd)
+                        continue
+                    if mask & IN_DELETE_SELF:
+                        continue
+                    if wd in self._parent_watches and mask & IN_ISDIR:
+                        # Maybe a missing directory or one of its parents appeared
+                        resync = True
+                    if name and wd in watches:
+                        pending.add(os.path.join(watches[wd], os.fsdecode(name)))
+                if deadline is None and (pending or rescan or resync):
+                    deadline = time.monotonic() + DEBOUNCE_SECONDS
+
+            # Checked after every read too, or a steady stream of events would hold the changes back for good
+            if deadline is not None and time.monotonic() >= deadline:
+                try:
+                    # Watches first, so nothing written to a new directory after the rescan is missed
+                    if resync and self._sync_watches(fd):
+                        rescan = True
+                    if rescan:
+                        changed = app_launcher.rescan_apps()
+                    else:
+                        changed = app_launcher.apply_desktop_file_changes(pending)
+                    self._notify(changed)
+                except Exception as e:
+                    print(f"Failed to apply app changes: {e}")
+                pending.clear()
+                rescan = False
+                resync = False
+                deadline = None
+
+    def _poll(self, stop_event: threading.Event):
+        while not stop_event.wait(POLL_INTERVAL):
+            try:
+                self._notify(app_launcher.rescan_apps())
+            except Exception as e:
+                print(f"Failed to rescan apps: {e}")
@@ -9,6 +9,11 @@ class Config:
         "discord_presence": True,
         "auto_update": True,
         "http_share_port": 8080,
+        "http_share_uploads": False,
+        "http_share_engine": "threaded",
+        "http_share_rate_limit": 0,
+        "http_share_client_rate_limit": 0,
+        "http_share_max_connections_per_ip": 6,
         "dukto_udp_port": 4644,
         "dukto_tcp_port": 4644,
         "search_engine": "brave"
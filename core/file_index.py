@@ -0,0 +1,506 @@
+import array
+import bisect
+import fnmatch
+import hashlib
+import mmap
+import os
+import platform
+import re
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from core.config import config
+
+FILE_INDEX_DIR = config.config_dir / "file_index"
+FILE_INDEX_VERSION = 2
+# An index older than this is considered stale, searches go to fd while it is rebuilt
+FILE_INDEX_MAX_AGE = 30 * 60
+# Directories per front-coded block; finding one decodes at most a block
+BLOCK_SIZE = 16
+# Virtual and volatile filesystems, never worth indexing
+PRUNE_PATHS = {'/proc', '/sys', '/dev', '/run', '/tmp', '/var/tmp'} if platform.system() != "Windows" else set()
+
+# magic, version, block size, file count, directory count, root length, build time, then the
+# section offsets: directory blocks, front-coded directories, first file of each directory,
+# name starts, names, lower-case name starts, lower-case names, end of file
+_HEADER = struct.Struct('<8sIIIIId8Q')
+_MAGIC = b'CLARAFIX'
+_FIRST = struct.Struct('<H')
+_FOLLOWING = struct.Struct('<HH')
+# Changes kept in memory on top of the index before they are written into it
+COMPACT_THRESHOLD = 10000
+# Lengths are stored in 16 bits, directories with longer paths are left out
+_MAX_PATH_BYTES = 0xFFFF
+_GLOB_SPLIT_RE = re.compile(r'\[!?\]?[^\]]*\]|[*?]')
+# What os.fsdecode does, without its per-call overhead on large result sets
+_FS_ENCODING = sys.getfilesystemencoding()
+_FS_ERRORS = sys.getfilesystemencodeerrors()
+
+
+def _align(data: bytearray):
+    data.extend(b'\0' * (-len(data) % 8))
+
+
+def dir_key(directory: str) -> str:
+    """A directory as the index keys it, with a trailing separator."""
+    return directory if directory.endswith(os.sep) else directory + os.sep
+
+
+def _walked_path(key: str) -> str:
+    """A directory key back in the form walk_files reports it."""
+    # dirname of "/a/b/" is "/a/b", while "/" and "C:\\" stay as they are
+    return os.path.dirname(key)
+
+
+def is_hidden(name: str) -> bool:
+    """fd's default notion of a hidden entry, which neither it nor the index lists or enters."""
+    return name.startswith('.')
+
+
+def is_glob(pattern: str) -> bool:
+    """Whether a search pattern is a glob rather than a plain substring."""
+    return any(c in pattern for c in '*?[')
+
+
+def is_case_sensitive(pattern: str) -> bool:
+    """fd's smart case: a pattern only matches case-sensitively if it has upper-case letters."""
+    return pattern != pattern.lower()
+
+
+def walk_files(root: str, on_directory: Optional[Callable[[str], None]] = None) -> Dict[str, List[str]]:
+    """Directory -> names of the entries in it, subdirectories included, for everything below root.
+
+    Like fd, hidden entries are skipped and symlinks aren't followed;
+    PRUNE_PATHS aren't entered either. on_directory is called with each
+    directory just before it is listed.
+    """
+    found: Dict[str, List[str]] = {}
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        names = []
+        if on_directory is not None:
+            on_directory(directory)
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if is_hidden(entry.name):
+                        continue
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if not is_dir:
+                        names.append(entry.name)
+                    elif entry.path not in PRUNE_PATHS:
+                        names.append(entry.name)
+                        pending.append(entry.path)
+        except OSError:
+            continue
+        if names:
+            found[directory] = names
+    return found
+
+
+def write_index(path: Path, root: str, files: Dict[str, List[str]]):
+    """Write files, as walk_files returns them, as the index for root; replaces path atomically."""
+    directories = sorted((os.fsencode(d), d) for d in files if len(os.fsencode(d)) <= _MAX_PATH_BYTES)
+
+    blocks = array.array('Q')
+    front_coded = bytearray()
+    dir_starts = array.array('I')
+    name_starts = array.array('I')
+    names = bytearray()
+    lower_starts = array.array('I')
+    lower_names = bytearray()
+    previous = b''
+    for i, (encoded, directory) in enumerate(directories):
+        if i % BLOCK_SIZE == 0:
+            blocks.append(len(front_coded))
+            front_coded += _FIRST.pack(len(encoded))
+            front_coded += encoded
+        else:
+            shared = 0
+            limit = min(len(previous), len(encoded))
+            while shared < limit and previous[shared] == encoded[shared]:
+                shared += 1
+            front_coded += _FOLLOWING.pack(shared, len(encoded) - shared)
+            front_coded += encoded[shared:]
+        previous = encoded
+
+        dir_starts.append(len(name_starts))
+        for name in sorted(files[directory]):
+            name_starts.append(len(names))
+            names += os.fsencode(name)
+            names += b'\0'
+            # Queries are matched against these, so a search is a single mmap.find pass
+            lower_starts.append(len(lower_names))
+            lower_names += os.fsencode(name.lower())
+            lower_names += b'\0'
+    dir_starts.append(len(name_starts))
+    name_starts.append(len(names))
+    lower_starts.append(len(lower_names))
+
+    body = bytearray(os.fsencode(root))
+    offsets = []
+    for section in (blocks.tobytes(), front_coded, dir_starts.tobytes(), name_starts.tobytes(), names,
+                    lower_starts.tobytes(), lower_names):
+        _align(body)
+        offsets.append(_HEADER.size + len(body))
+        body += section
+    offsets.append(_HEADER.size + len(body))
+
+    header = _HEADER.pack(_MAGIC, FILE_INDEX_VERSION, BLOCK_SIZE, len(name_starts) - 1, len(directories),
+                          len(os.fsencode(root)), time.time(), *offsets)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        f.write(body)
+    os.replace(tmp_path, path)
+
+
+class FileIndex:
+    """A locate-style list of every entry below a root, kept on disk and memory-mapped.
+
+    Directory paths are sorted and front-coded in blocks of BLOCK_SIZE;
+    the names in each, files and subdirectories alike, are stored back to
+    back after them, once as they are and once lower-cased. A substring
+    query is one mmap.find pass over the lower-cased names, and each hit
+    costs a couple of bisects plus, the first time its directory comes
+    up, decoding that directory's block.
+    Globs are narrowed the same way by their longest literal part.
+    Matching follows fd: the pattern is looked for in the name, hidden
+    entries aren't listed, and case is ignored unless the pattern has
+    upper-case letters.
+
+    search() returns None while the index is missing or stale, and starts
+    a rebuild in the background so a later search can use it. An index
+    kept current by a FileIndexWatcher is never stale: the watcher feeds
+    changes to apply(), searches see them right away, and compact() folds
+    them into the file once enough have piled up.
+    """
+
+    def __init__(self, root: str, path: Path, max_age: float = FILE_INDEX_MAX_AGE):
+        self.root = root
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._header: Optional[tuple] = None
+        # Views into the map: directory blocks, first file of each directory, name starts, lower-case name starts
+        self._views: tuple = ()
+        self._build_thread: Optional[threading.Thread] = None
+        self._building = False
+        # Set while a watcher applies every change, which keeps the index fresh whatever its age
+        self.watched = False
+        # Changes since the file was written: directory key -> names, and removed directory keys
+        self._added: Dict[str, Set[str]] = {}
+        self._removed: Dict[str, Set[str]] = {}
+        self._removed_dirs: Tuple[str, ...] = ()
+        self.pending_changes = 0
+        # Changes applied while a rebuild walks, replayed onto the new file; None when no walk runs
+        self._applied_during_walk: Optional[List[Tuple[str, str, str]]] = None
+
+    def _close(self):
+        # Views into the map have to go before it can be closed
+        self._views = ()
+        self._header = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self) -> bool:
+        if self._map is not None:
+            return True
+        try:
+            self._file = open(self.path, 'rb')
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            header = _HEADER.unpack_from(self._map)
+            magic, version, block_size, file_count, dir_count, root_length = header[:6]
+            root = os.fsdecode(self._map[_HEADER.size:_HEADER.size + root_length])
+            if magic != _MAGIC or version != FILE_INDEX_VERSION or block_size != BLOCK_SIZE or root != self.root:
+                raise ValueError("not a current file index")
+            blocks, _, dir_starts, name_starts, _, lower_starts, _, end = header[7:]
+            if end != len(self._map):
+                raise ValueError("truncated file index")
+
+            def view(start, typecode, count):
+                size = count * array.array(typecode).itemsize
+                return memoryview(self._map)[start:start + size].cast(typecode)
+
+            self._header = header
+            self._views = (view(blocks, 'Q', (dir_count + BLOCK_SIZE - 1) // BLOCK_SIZE),
+                           view(dir_starts, 'I', dir_count + 1),
+                           view(name_starts, 'I', file_count + 1),
+                           view(lower_starts, 'I', file_count + 1))
+            return True
+        except FileNotFoundError:
+            self._close()
+            return False
+        except (OSError, ValueError, struct.error) as e:
+            print(f"Ignoring file index {self.path}: {e}")
+            self._close()
+            return False
+
+    @property
+    def built_at(self) -> Optional[float]:
+        with self._lock:
+            return self._header[6] if self._open() else None
+
+    def is_fresh(self) -> bool:
+        built_at = self.built_at
+        return built_at is not None and (self.watched or time.time() - built_at < self.max_age)
+
+    def rebuild(self, walk: Callable[[str], Dict[str, List[str]]] = walk_files):
+        """Walk the root and replace the index; searches keep using the old one during the walk.
+
+        The changes applied before the walk go with the old file, the walk
+        already reflects them. Those applied while it runs may be newer than
+        what it saw, so they are replayed on top of the new file.
+        """
+        with self._lock:
+            self._building = True
+            self._applied_during_walk = []
+        try:
+            files = walk(self.root)
+            with self._lock:
+                # Windows can't replace a file that is still mapped
+                self._close()
+                write_index(self.path, self.root, files)
+                self._added = {}
+                self._removed = {}
+                self._removed_dirs = ()
+                self.pending_changes = 0
+                self._record(self._applied_during_walk)
+        finally:
+            with self._lock:
+                self._applied_during_walk = None
+                self._building = False
+
+    def refresh_if_stale(self):
+        if not self.is_fresh():
+            self.rebuild_async()
+
+    def rebuild_async(self):
+        if self._building or (self._build_thread and self._build_thread.is_alive()):
+            return
+        self._build_thread = threading.Thread(target=self._rebuild_logged, daemon=True)
+        self._build_thread.start()
+
+    def _rebuild_logged(self):
+        try:
+            self.rebuild()
+        except Exception as e:
+            print(f"Failed to build the file index for {self.root}: {e}")
+
+    def _decode_block(self, block: int) -> List[str]:
+        """The directories in a block, each ending in a separator so a name can just be appended."""
+        data = self._map
+        dir_count = self._header[4]
+        position = self._header[8] + self._views[0][block]
+        (length,) = _FIRST.unpack_from(data, position)
+        position += _FIRST.size
+        previous = data[position:position + length]
+        position += length
+        decoded = [previous]
+        for _ in range(min(BLOCK_SIZE, dir_count - block * BLOCK_SIZE) - 1):
+            shared, length = _FOLLOWING.unpack_from(data, position)
+            position += _FOLLOWING.size
+            previous = previous[:shared] + data[position:position + length]
+            position += length
+            decoded.append(previous)
+        sep = os.sep
+        return [d if d.endswith(sep) else d + sep for d in (raw.decode(_FS_ENCODING, _FS_ERRORS) for raw in decoded)]
+
+    def _find_directory(self, key: str) -> Optional[int]:
+        """The position of a directory in the index, found by bisecting the first entry of each block."""
+        dir_count = self._header[4]
+        if not dir_count:
+            return None
+        data = self._map
+        paths_offset = self._header[8]
+        blocks = self._views[0]
+        wanted = os.fsencode(_walked_path(key))
+
+        def first(block):
+            position = paths_offset + blocks[block]
+            (length,) = _FIRST.unpack_from(data, position)
+            return data[position + _FIRST.size:position + _FIRST.size + length]
+
+        low, high = 0, len(blocks)
+        while low < high:
+            middle = (low + high) // 2
+            if first(middle) <= wanted:
+                low = middle + 1
+            else:
+                high = middle
+        if low == 0:
+            return None
+        block = low - 1
+        decoded = self._decode_block(block)
+        try:
+            return block * BLOCK_SIZE + decoded.index(key)
+        except ValueError:
+            return None
+
+    def _names_at(self, directory: int) -> List[str]:
+        data = self._map
+        _, dir_starts, name_starts, _ = self._views
+        names_offset = self._header[11]
+        return [data[names_offset + name_starts[i]:names_offset + name_starts[i + 1] - 1].decode(_FS_ENCODING, _FS_ERRORS)
+                for i in range(dir_starts[directory], dir_starts[directory + 1])]
+
+    def _is_removed(self, key: str) -> bool:
+        return bool(self._removed_dirs) and key.startswith(self._removed_dirs)
+
+    def names_in(self, directory: str) -> Set[str]:
+        """The names the index currently has in a directory, changes included."""
+        key = dir_key(directory)
+        with self._lock:
+            names: Set[str] = set()
+            if self._open() and not self._is_removed(key):
+                position = self._find_directory(key)
+                if position is not None:
+                    names.update(self._names_at(position))
+            names -= self._removed.get(key, set())
+            names |= self._added.get(key, set())
+            return names
+
+    def apply(self, changes: Iterable[Tuple[str, str, str]]):
+        """Record changes in order: ('add', directory, name), ('remove', directory, name) or ('remove_dir', directory, '')."""
+        changes = list(changes)
+        with self._lock:
+            if self._applied_during_walk is not None:
+                self._applied_during_walk += changes
+            self._record(changes)
+
+    def _record(self, changes: List[Tuple[str, str, str]]):
+        for kind, directory, name in changes:
+            key = dir_key(directory)
+            if kind == 'add':
+                self._removed.get(key, set()).discard(name)
+                self._added.setdefault(key, set()).add(name)
+            elif kind == 'remove':
+                self._added.get(key, set()).discard(name)
+                self._removed.setdefault(key, set()).add(name)
+            else:
+                # Everything below goes too; what is added there later is tracked again from scratch
+                self._removed_dirs = tuple(d for d in self._removed_dirs if not d.startswith(key)) + (key,)
+                for changed in (self._added, self._removed):
+                    for stale in [d for d in changed if d.startswith(key)]:
+                        del changed[stale]
+            self.pending_changes += 1
+
+    def compact(self):
+        """Write the applied changes into the index file, from the index itself rather than a rescan."""
+        with self._lock:
+            if not self._open():
+                return
+            files: Dict[str, List[str]] = {}
+            for block in range((self._header[4] + BLOCK_SIZE - 1) // BLOCK_SIZE):
+                for offset, key in enumerate(self._decode_block(block)):
+                    if self._is_removed(key):
+                        continue
+                    removed = self._removed.get(key, set())
+                    names = [name for name in self._names_at(block * BLOCK_SIZE + offset) if name not in removed]
+                    if names:
+                        files[key] = names
+            for key, added in self._added.items():
+                files[key] = sorted(set(files.get(key, ())) | added)
+            files = {_walked_path(key): names for key, names in files.items() if names}
+            self._close()
+            write_index(self.path, self.root, files)
+            self._added = {}
+            self._removed = {}
+            self._removed_dirs = ()
+            self.pending_changes = 0
+
+    def _candidates(self, needle: bytes) -> Iterator[int]:
+        file_count = self._header[3]
+        if not needle:
+            yield from range(file_count)
+            return
+        data = self._map
+        starts = self._views[3]
+        lower_offset = self._header[13]
+        end = self._header[14]
+        position = lower_offset
+        while True:
+            hit = data.find(needle, position, end)
+            if hit < 0:
+                return
+            i = bisect.bisect_right(starts, hit - lower_offset) - 1
+            yield i
+            # One hit per name is enough
+            position = lower_offset + starts[i + 1]
+
+    def search(self, pattern: str) -> Optional[List[str]]:
+        """Return the files whose name matches pattern, or None if the index can't answer."""
+        if not self.is_fresh():
+            self.refresh_if_stale()
+            return None
+
+        case_sensitive = is_case_sensitive(pattern)
+        if is_glob(pattern):
+            literal = max(_GLOB_SPLIT_RE.split(pattern), key=len)
+            matcher = re.compile(fnmatch.translate(f"*{pattern}*"), 0 if case_sensitive else re.IGNORECASE).match
+        else:
+            literal = pattern
+            # Lower-case hits are already exact, otherwise the real name is checked
+            matcher = (lambda name: pattern in name) if case_sensitive else None
+        lower_literal = literal.lower()
+
+        results = []
+        with self._lock:
+            if not self._open():
+                return None
+            data = self._map
+            _, dir_starts, name_starts, _ = self._views
+            names_offset = self._header[11]
+            blocks: Dict[int, List[str]] = {}
+            changed = self._added or self._removed or self._removed_dirs
+            for i in self._candidates(os.fsencode(lower_literal)):
+                name = data[names_offset + name_starts[i]:names_offset + name_starts[i + 1] - 1].decode(
+                    _FS_ENCODING, _FS_ERRORS)
+                if matcher is not None and not matcher(name):
+                    continue
+                directory = bisect.bisect_right(dir_starts, i) - 1
+                block = blocks.get(directory // BLOCK_SIZE)
+                if block is None:
+                    block = blocks[directory // BLOCK_SIZE] = self._decode_block(directory // BLOCK_SIZE)
+                key = block[directory % BLOCK_SIZE]
+                # Added names are listed below, so one that is also in the file isn't listed twice
+                if changed and (self._is_removed(key) or name in self._removed.get(key, ())
+                                or name in self._added.get(key, ())):
+                    continue
+                results.append(key + name)
+
+            for key, names in self._added.items():
+                for name in names:
+                    if (matcher(name) if matcher is not None else lower_literal in name.lower()):
+                        results.append(key + name)
+        return results
+
+
+_indexes: Dict[str, FileIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_file_index(root: str) -> FileIndex:
+    """The shared index for root, stored in the config dir under a name derived from the path."""
+    root = os.path.abspath(os.path.expanduser(root))
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            name = hashlib.blake2b(os.fsencode(root), digest_size=8).hexdigest() + ".idx"
+            index = _indexes[root] = FileIndex(root, FILE_INDEX_DIR / name)
+        return index
@@ -1,28 +1,70 @@
 import fnmatch
 import os
+import re
 import shutil
 import subprocess
 
+from core.file_index import PRUNE_PATHS, dir_key, get_file_index, is_case_sensitive, is_glob, is_hidden
+
 
 def _find_native(pattern: str, root: str):
-    """Native Python implementation of file search using os.walk."""
+    """Native Python implementation of file search using os.walk, listing what fd and the index would."""
+    if is_glob(pattern):
+        flags = 0 if is_case_sensitive(pattern) else re.IGNORECASE
+        matches = re.compile(fnmatch.translate(f"*{pattern}*"), flags).match
+    elif is_case_sensitive(pattern):
+        matches = lambda name: pattern in name
+    else:
+        matches = lambda name: pattern in name.lower()
+
     results = []
-    for dirpath, _, filenames in os.walk(root):
-        for filename in fnmatch.filter(filenames, pattern):
-            results.append(os.path.join(dirpath, filename))
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not is_hidden(name)]
+        names = dirnames + [name for name in filenames if not is_hidden(name)]
+        results.extend(os.path.join(dirpath, name) for name in names if matches(name))
+        # Listed like the index does, but not entered
+        dirnames[:] = [name for name in dirnames if os.path.join(dirpath, name) not in PRUNE_PATHS]
     return results
 
 
-def find(pattern: str, root: str = "/"):
+def _fd_command(pattern: str, root: str):
+    """The fd invocation that matches names the way the index does."""
+    # The index doesn't read .gitignore files, so fd mustn't either or results would depend on the backend
+    command = ["fd", "--no-ignore"]
+    command.append("--case-sensitive" if is_case_sensitive(pattern) else "--ignore-case")
+    if is_glob(pattern):
+        # fd globs match the whole name, the index matches them anywhere in it
+        command += ["--glob", f"*{pattern}*"]
+    else:
+        command += ["--fixed-strings", pattern]
+    # The contents of the pruned directories, anchored at the search root like the walk would meet them
+    prefix = dir_key(root)
+    for pruned in sorted(PRUNE_PATHS):
+        if pruned.startswith(prefix):
+            command += ["--exclude", f"/{pruned[len(prefix):]}/*"]
+    command.append(root)
+    return command
+
+
+def find(pattern: str, root: str = "/", use_index: bool = True):
+    """Find files whose name contains pattern (a glob is allowed) below root.
+
+    Answered from the persistent file index when it is fresh; otherwise fd,
+    or os.walk without it, does the search while the index is rebuilt.
+    Matching is case-insensitive unless the pattern has upper-case letters.
+    """
     path = os.path.expanduser(root)
 
+    if use_index:
+        results = get_file_index(path).search(pattern)
+        if results is not None:
+            return results
+
     if shutil.which("fd") is None:
-        return _find_native(f"*{pattern}*", path)
+        return _find_native(pattern, path)
     else:
         try:
-            out = subprocess.check_output(
-                ["fd", pattern, path], text=True, errors="ignore"
-            )
+            out = subprocess.check_output(_fd_command(pattern, path), text=True, errors="ignore")
             return out.splitlines()
         except subprocess.CalledProcessError:
             return []
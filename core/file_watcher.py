@@ -0,0 +1,265 @@
+import ctypes
+import errno
+import os
+import select
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.app_watcher import (EVENT_HEADER, IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_DONT_FOLLOW, IN_IGNORED,
+                              IN_ISDIR, IN_MOVE_SELF, IN_MOVED_FROM, IN_MOVED_TO, IN_ONLYDIR, IN_Q_OVERFLOW,
+                              load_inotify)
+from core.file_index import COMPACT_THRESHOLD, PRUNE_PATHS, FileIndex, dir_key, is_hidden, walk_files
+
+# A filename index only cares about names coming and going, not about writes
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF |
+              IN_ONLYDIR | IN_DONT_FOLLOW)
+# How often directories without a watch are checked for a new mtime, and a stale index without inotify
+POLL_INTERVAL = 30
+# The watch limit is per user and shared with every other program, so only this share of it is used
+WATCH_BUDGET_FRACTION = 0.25
+MAX_USER_WATCHES_PATH = "/proc/sys/fs/inotify/max_user_watches"
+# The kernel's default limit on older systems, assumed when the real one can't be read
+DEFAULT_MAX_USER_WATCHES = 8192
+# Trees that churn constantly and are rarely searched; they are polled rather than watched
+UNWATCHED_NAMES = {'node_modules', '__pycache__', 'site-packages', 'cache', 'Cache', 'CachedData'}
+
+
+def watch_budget() -> int:
+    """How many inotify watches the file index watcher may add."""
+    try:
+        with open(MAX_USER_WATCHES_PATH) as f:
+            limit = int(f.read())
+    except (OSError, ValueError):
+        limit = DEFAULT_MAX_USER_WATCHES
+    return int(limit * WATCH_BUDGET_FRACTION)
+
+
+class FileIndexWatcher:
+    """Keeps a FileIndex current by applying file creations, deletions and renames as they happen.
+
+    On start the root is walked once, adding an inotify watch to each
+    directory just before it is listed, and the index is rewritten from
+    that walk. From then on events go straight into the index, so searches
+    see new files as soon as the event is read. Directories beyond the
+    watch budget, a WATCH_BUDGET_FRACTION of fs.inotify.max_user_watches,
+    are polled instead, and so are UNWATCHED_NAMES such as node_modules
+    (hidden trees aren't indexed at all): every POLL_INTERVAL seconds their mtimes are checked and
+    only those that changed are listed again. Without inotify at all, the
+    index is simply rebuilt whenever it goes stale.
+    """
+
+    def __init__(self, index: FileIndex):
+        self.index = index
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._libc = None
+        self._fd = -1
+        self._watches: Dict[int, str] = {}
+        # directory -> (mtime_ns, subdirectory names) for directories that couldn't be watched
+        self._polled: Dict[str, Tuple[int, Set[str]]] = {}
+        self._budget = 0
+        self._limit_reported = False
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self, stop_event: threading.Event):
+        libc = load_inotify()
+        fd = libc.inotify_init1(os.O_CLOEXEC) if libc is not None else -1
+        if fd < 0:
+            if libc is not None:
+                print(f"inotify unavailable ({os.strerror(ctypes.get_errno())}), rebuilding the file index when stale.")
+            self._rebuild_when_stale(stop_event)
+            return
+
+        self._libc = libc
+        self._fd = fd
+        self._budget = watch_budget()
+        try:
+            self.index.rebuild(walk=self._walk)
+            self.index.watched = True
+            self._watch(stop_event)
+        except Exception as e:
+            print(f"File index watcher stopped: {e}")
+        finally:
+            self.index.watched = False
+            os.close(fd)
+            self._fd = -1
+            self._watches = {}
+            self._polled = {}
+
+    def _walk(self, root: str) -> Dict[str, List[str]]:
+        return walk_files(root, on_directory=self._add_watch)
+
+    def _is_unwatched(self, directory: str) -> bool:
+        relative = directory[len(self.index.root):].split(os.sep)
+        return any(part in UNWATCHED_NAMES for part in relative)
+
+    def _add_watch(self, directory: str):
+        if self._is_unwatched(directory):
+            self._add_polled(directory)
+            return
+        if len(self._watches) >= self._budget:
+            self._report_limit()
+            self._add_polled(directory)
+            return
+
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd >= 0:
+            self._watches[wd] = directory
+            return
+        error = ctypes.get_errno()
+        if error in (errno.ENOSPC, errno.ENOMEM):
+            self._report_limit()
+            self._add_polled(directory)
+        # Anything else (no permission, already gone) means the walk can't list it either
+
+    def _report_limit(self):
+        if not self._limit_reported:
+            print(f"inotify watch budget used up ({len(self._watches)} of fs.inotify.max_user_watches), "
+                  f"checking the remaining folders every {POLL_INTERVAL}s instead.")
+            self._limit_reported = True
+
+    def _add_polled(self, directory: str):
+        try:
+            # The mtime is taken first, so a change made while listing is still noticed next time
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                subdirs = {entry.name for entry in it
+                           if not is_hidden(entry.name) and entry.is_dir(follow_symlinks=False)}
+        except OSError:
+            return
+        self._polled[directory] = (mtime_ns, subdirs)
+
+    def _forget(self, directory: str):
+        """Drop the watches below a directory that moved away, their paths no longer hold."""
+        prefix = dir_key(directory)
+        for wd, path in list(self._watches.items()):
+            if path == directory or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+        for path in [path for path in self._polled if path == directory or path.startswith(prefix)]:
+            del self._polled[path]
+
+    def _added_tree(self, directory: str) -> List[Tuple[str, str, str]]:
+        """The entries below a directory that just appeared, the directory itself not included."""
+        if directory in PRUNE_PATHS:
+            return []
+        return [('add', path, name) for path, names in self._walk(directory).items() for name in names]
+
+    def _read_events(self) -> Tuple[List[Tuple[str, str, str]], bool]:
+        data = os.read(self._fd, 64 * 1024)
+        changes = []
+        overflow = False
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped, only a walk can tell what changed
+                overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            # A directory's own deletion or move is handled through the event on its parent
+            if directory is None or not name or is_hidden(name):
+                continue
+
+            path = os.path.join(directory, name)
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                changes.append(('add', directory, name))
+                if mask & IN_ISDIR:
+                    changes += self._added_tree(path)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                changes.append(('remove', directory, name))
+                if mask & IN_ISDIR:
+                    if mask & IN_MOVED_FROM:
+                        self._forget(path)
+                    # A deleted directory's watch goes away by itself with IN_IGNORED
+                    changes.append(('remove_dir', path, ''))
+        return changes, overflow
+
+    def _poll_changes(self) -> List[Tuple[str, str, str]]:
+        """List again only the polled directories whose mtime moved, and diff them against the index."""
+        changes = []
+        for directory, (mtime_ns, subdirs) in list(self._polled.items()):
+            try:
+                current_mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                # Gone; its parent reports the removal
+                self._polled.pop(directory, None)
+                continue
+            if current_mtime == mtime_ns:
+                continue
+
+            names = set()
+            current_subdirs = set()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if is_hidden(entry.name):
+                            continue
+                        names.add(entry.name)
+                        if entry.is_dir(follow_symlinks=False):
+                            current_subdirs.add(entry.name)
+            except OSError:
+                continue
+            self._polled[directory] = (current_mtime, current_subdirs)
+
+            known = self.index.names_in(directory)
+            changes += [('remove', directory, name) for name in known - names]
+            changes += [('add', directory, name) for name in names - known]
+            for name in subdirs - current_subdirs:
+                path = os.path.join(directory, name)
+                self._forget(path)
+                changes.append(('remove_dir', path, ''))
+            for name in current_subdirs - subdirs:
+                changes += self._added_tree(os.path.join(directory, name))
+        return changes
+
+    def _apply(self, changes: List[Tuple[str, str, str]]):
+        self.index.apply(changes)
+        if self.index.pending_changes > COMPACT_THRESHOLD:
+            self.index.compact()
+
+    def _watch(self, stop_event: threading.Event):
+        poll_deadline = time.monotonic() + POLL_INTERVAL
+        while not stop_event.is_set():
+            readable, _, _ = select.select([self._fd], [], [], 1.0)
+            if readable:
+                changes, overflow = self._read_events()
+                if overflow:
+                    self.index.rebuild(walk=self._walk)
+                elif changes:
+                    self._apply(changes)
+
+            if self._polled and time.monotonic() >= poll_deadline:
+                changes = self._poll_changes()
+                if changes:
+                    self._apply(changes)
+                poll_deadline = time.monotonic() + POLL_INTERVAL
+
+    def _rebuild_when_stale(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            try:
+                if not self.index.is_fresh():
+                    self.index.rebuild()
+            except Exception as e:
+                print(f"Failed to rebuild the file index: {e}")
+            stop_event.wait(POLL_INTERVAL)
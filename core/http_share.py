@@ -1,13 +1,26 @@
 #!/usr/bin/env python3
 
+import os
 import socket
 import threading
 import mimetypes
 from pathlib import Path
-from typing import List, Optional, Callable
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Callable, Tuple
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import html
 import json
+import gzip
+import zlib
+import shutil
+import zipfile
+import re
+import time
+import hashlib
+import itertools
+from urllib.parse import urlsplit, parse_qs, quote, unquote, urlencode
+
+from core.share_metrics import ShareMetrics, endpoint_name
+from core.share_listing import ListingCache, parse_listing_query
 
 def format_size(bytes_val: int) -> str:
     if bytes_val is None: return ""
@@ -21,14 +34,474 @@ def format_size(bytes_val: int) -> str:
         return f"{bytes_val/1024**3:.2f} GB"
 
 
+# Anything but printable ASCII, and the characters that would end the quoted string
+_UNSAFE_FILENAME_RE = re.compile(r'[^\x20-\x7e]|["\\]')
+
+
+def display_name(name: str) -> str:
+    """A file name as it can be shown in a page, undecodable bytes replaced."""
+    return name.encode('utf-8', 'surrogateescape').decode('utf-8', 'replace')
+
+
+def content_disposition(filename: str) -> str:
+    """An attachment header value for any file name, safe to send as Latin-1.
+
+    Old clients get an ASCII approximation, others the exact name per RFC 6266/5987.
+    """
+    fallback = _UNSAFE_FILENAME_RE.sub('_', display_name(filename))
+    encoded = quote(filename.encode('utf-8', 'surrogateescape'), safe='')
+    return f'attachment; filename="{fallback}"; filename*=UTF-8\'\'{encoded}'
+
+
+def get_local_ip() -> str:
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+    except Exception:
+        return "127.0.0.1"
+
+
+# Smallest body worth compressing, anything below fits in a packet anyway
+COMPRESS_MIN_SIZE = 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Name the streaming archive is accounted under in the download metrics
+ZIP_DOWNLOAD_NAME = "all.zip"
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+
+
+def compress_body(body: bytes, encoding: str) -> bytes:
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=6, mtime=0)
+    if encoding == 'deflate':
+        return zlib.compress(body, 6)
+    return body
+
+
+def is_compressible(mime_type: str) -> bool:
+    return mime_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def negotiate_encoding(accept: str) -> Optional[str]:
+    accepted = {}
+    for part in accept.split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token] = q
+
+    for encoding in ('gzip', 'deflate'):
+        q = accepted.get(encoding, accepted.get('*', 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+def select_body_variant(variants: Dict[str, bytes], encoding: Optional[str]):
+    """Pick the cached body for an encoding, compressing it on first use."""
+    body = variants['identity']
+    if not encoding or len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+
+    if encoding not in variants:
+        variants[encoding] = compress_body(body, encoding)
+    return variants[encoding], encoding
+
+
+def variant_etag(etag: str, encoding: Optional[str]) -> str:
+    """The ETag of a body sent with a content encoding, derived from the identity one."""
+    return f'{etag[:-1]}-{encoding}"' if encoding else etag
+
+
+def write_zip_archive(files: List[Path], out, on_file: Optional[Callable[[str], None]] = None):
+    """Stream a ZIP of files into an unseekable file object.
+
+    zipfile falls back to data descriptors when it can't seek, and ZIP64 is
+    picked from the stat size, so neither the archive nor a single member is
+    ever held in memory.
+    """
+    with zipfile.ZipFile(out, 'w') as zf:
+        used_names = set()
+        for path in files:
+            arcname = path.name
+            i = 2
+            while arcname in used_names:
+                arcname = f"{path.stem} ({i}){path.suffix}"
+                i += 1
+            used_names.add(arcname)
+
+            mime_type, _ = mimetypes.guess_type(str(path))
+            zinfo = zipfile.ZipInfo.from_file(path, arcname)
+            if mime_type and is_compressible(mime_type):
+                zinfo.compress_type = zipfile.ZIP_DEFLATED
+            else:
+                zinfo.compress_type = zipfile.ZIP_STORED
+
+            if on_file:
+                on_file(arcname)
+
+            with open(path, 'rb') as src, zf.open(zinfo, 'w') as dest:
+                shutil.copyfileobj(src, dest, DOWNLOAD_CHUNK_SIZE)
+
+
+# Downloads are addressed by content version, so browsers may cache them forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Shared text up to this many bytes is embedded in the page, anything larger is fetched from /text
+INLINE_TEXT_LIMIT = 16 * 1024
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range Range header into an inclusive (start, end).
+
+    Returns None when the header should be ignored and the full body sent
+    (malformed, other units or several ranges), and raises ValueError when
+    the range lies outside the body.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    if not sep:
+        return None
+    try:
+        start = int(first) if first else None
+        end = int(last) if last else None
+    except ValueError:
+        return None
+
+    if start is None:
+        if end is None:
+            return None
+        if end == 0:
+            raise ValueError("Empty suffix range")
+        start, end = max(size - end, 0), size - 1
+    else:
+        if end is not None and end < start:
+            return None
+        end = size - 1 if end is None else min(end, size - 1)
+
+    if start >= size:
+        raise ValueError("Range starts past the end of the body")
+    return start, end
+
+
+class SharedFile:
+    """A shared file pinned to the (path, size, mtime) it had when it was listed."""
+
+    def __init__(self, path: Path, size: int, mtime_ns: int):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        digest = hashlib.blake2b(f"{path}\0{size}\0{mtime_ns}".encode('utf-8', 'surrogateescape'), digest_size=10)
+        self.token = digest.hexdigest()
+
+    @property
+    def url(self) -> str:
+        return f"/download/{self.token}"
+
+    @classmethod
+    def from_path(cls, filepath: str) -> Optional['SharedFile']:
+        try:
+            path = Path(filepath)
+            st = path.stat()
+        except OSError:
+            return None
+        if not path.is_file():
+            return None
+        return cls(path, st.st_size, st.st_mtime_ns)
+
+    def is_current(self) -> bool:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return False
+        return st.st_size == self.size and st.st_mtime_ns == self.mtime_ns
+
+
+class SharedDirectory:
+    """A shared directory, browsed live under /browse/<token>/."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        digest = hashlib.blake2b(f"{path}".encode('utf-8', 'surrogateescape'), digest_size=10, person=b'clara-dir')
+        self.token = digest.hexdigest()
+
+    @property
+    def url(self) -> str:
+        return f"/browse/{self.token}/"
+
+    def url_for(self, relative: str) -> str:
+        # Names that aren't valid UTF-8 keep their raw bytes, resolve() unquotes them the same way
+        return self.url + quote(relative, errors='surrogateescape')
+
+    def resolve(self, relative: str) -> Optional[Path]:
+        """Map a URL path below the share root to a real path, refusing anything that escapes it."""
+        parts = [part for part in relative.split('/') if part]
+        if any(part in ('.', '..') or '\\' in part or '\0' in part for part in parts):
+            return None
+        target = self.path.joinpath(*parts)
+        root = os.path.realpath(self.path)
+        real = os.path.realpath(target)
+        if real != root and not real.startswith(root.rstrip(os.sep) + os.sep):
+            return None
+        return target
+
+
+class CountingWriter:
+    """Wraps the handler's wfile and feeds every written byte into the share metrics."""
+
+    def __init__(self, wfile, metrics: ShareMetrics):
+        self.wfile = wfile
+        self.metrics = metrics
+        self.bytes_written = 0
+
+    def write(self, data) -> int:
+        result = self.wfile.write(data)
+        self.bytes_written += len(data)
+        self.metrics.add_bytes_sent(len(data))
+        return result
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        self.wfile.close()
+
+    @property
+    def closed(self) -> bool:
+        return self.wfile.closed
+
+
+class ChunkedWriter:
+    """Wraps a socket file with HTTP/1.1 chunked transfer encoding.
+
+    Small writes are coalesced so that zipfile/zlib output doesn't turn into
+    a flood of tiny chunks.
+    """
+
+    def __init__(self, wfile, buffer_size: int = DOWNLOAD_CHUNK_SIZE):
+        self.wfile = wfile
+        self.buffer_size = buffer_size
+        self._buffer: List[bytes] = []
+        self._buffered = 0
+
+    def write(self, data) -> int:
+        if data:
+            self._buffer.append(bytes(data))
+            self._buffered += len(data)
+            if self._buffered >= self.buffer_size:
+                self.flush()
+        return len(data)
+
+    def flush(self):
+        if self._buffered:
+            payload = b"".join(self._buffer)
+            self._buffer = []
+            self._buffered = 0
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+
+    def close(self):
+        self.flush()
+        self.wfile.write(b"0\r\n\r\n")
+
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+UPLOAD_MAX_HEADER_SIZE = 16 * 1024
+# How often (in bytes) upload progress is reported
+UPLOAD_PROGRESS_STEP = 1024 * 1024
+
+
+def unique_path(directory: Path, name: str) -> Path:
+    original_path = directory / name
+    dest_path = original_path
+    i = 2
+    while dest_path.exists():
+        dest_path = original_path.with_name(f"{original_path.stem} ({i}){original_path.suffix}")
+        i += 1
+    return dest_path
+
+
+class MultipartUploadReader:
+    """Incremental multipart/form-data parser that streams file parts to disk.
+
+    Only a single chunk plus the boundary is ever held in memory, so the size
+    of an upload is bounded by the disk and not by RAM.
+    """
+
+    def __init__(self, rfile, boundary: bytes, content_length: int, dest_dir: Path,
+                 on_progress: Optional[Callable[[int, int], None]] = None):
+        self.rfile = rfile
+        self.remaining = content_length
+        self.content_length = content_length
+        self.dest_dir = dest_dir
+        self.on_progress = on_progress
+        self.delimiter = b"\r\n--" + boundary
+        self.buffer = b""
+        self._last_progress = 0
+
+    def _fill(self) -> bool:
+        if self.remaining <= 0:
+            return False
+        chunk = self.rfile.read(min(UPLOAD_CHUNK_SIZE, self.remaining))
+        if not chunk:
+            raise ConnectionError("Upload ended before the request body was complete")
+        self.remaining -= len(chunk)
+        self.buffer += chunk
+
+        received = self.content_length - self.remaining
+        if self.on_progress and (received - self._last_progress >= UPLOAD_PROGRESS_STEP or self.remaining == 0):
+            self._last_progress = received
+            self.on_progress(self.content_length, received)
+        return True
+
+    def _read_headers(self) -> Dict[str, str]:
+        while b"\r\n\r\n" not in self.buffer:
+            if len(self.buffer) > UPLOAD_MAX_HEADER_SIZE or not self._fill():
+                raise ValueError("Malformed multipart headers")
+        raw, self.buffer = self.buffer.split(b"\r\n\r\n", 1)
+        headers = {}
+        for line in raw.decode('utf-8', errors='replace').split("\r\n"):
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+        return headers
+
+    def _copy_part(self, out) -> bool:
+        """Copy the current part body to out (or discard it), return True if it was the last part."""
+        keep = len(self.delimiter) + 1
+        while True:
+            index = self.buffer.find(self.delimiter)
+            if index >= 0:
+                if out:
+                    out.write(self.buffer[:index])
+                self.buffer = self.buffer[index + len(self.delimiter):]
+                while len(self.buffer) < 2:
+                    if not self._fill():
+                        raise ValueError("Truncated multipart body")
+                is_last = self.buffer.startswith(b"--")
+                self.buffer = self.buffer[2:]
+                return is_last
+
+            # Everything but a possible partial delimiter at the end is safe to flush
+            if len(self.buffer) > keep:
+                if out:
+                    out.write(self.buffer[:-keep])
+                self.buffer = self.buffer[-keep:]
+            if not self._fill():
+                raise ValueError("Truncated multipart body")
+
+    def _create_unique(self, filename: str):
+        # Several uploads can race for the same name, so the file is created exclusively
+        while True:
+            dest_path = unique_path(self.dest_dir, filename)
+            try:
+                return open(dest_path, 'xb'), dest_path
+            except FileExistsError:
+                continue
+
+    def read_files(self) -> List[str]:
+        # The body starts with the first boundary, which has no leading CRLF
+        self.buffer = b"\r\n"
+        if self._copy_part(None):
+            return []
+
+        received_files = []
+        while True:
+            headers = self._read_headers()
+            match = re.search(r'filename="([^"]*)"', headers.get('content-disposition', ''))
+            filename = Path(match.group(1).replace('\\', '/')).name if match else ""
+
+            if not filename:
+                is_last = self._copy_part(None)
+            else:
+                self.dest_dir.mkdir(parents=True, exist_ok=True)
+                f, dest_path = self._create_unique(filename)
+                try:
+                    with f:
+                        is_last = self._copy_part(f)
+                except Exception:
+                    dest_path.unlink(missing_ok=True)
+                    raise
+                received_files.append(str(dest_path))
+
+            if is_last:
+                break
+
+        # Drain the epilogue so the connection stays in a sane state
+        while self.remaining > 0 and self._fill():
+            self.buffer = b""
+        return received_files
+
+
 class FileShareHandler(BaseHTTPRequestHandler):
+    # Persistent connections, idle ones are dropped after `timeout` seconds
+    protocol_version = "HTTP/1.1"
+    timeout = 30
+    # Headers and body are written separately, Nagle would hold the body back for a delayed ACK
+    disable_nagle_algorithm = True
+
     shared_files: List[str] = []
     shared_text: Optional[str] = None
     on_download: Optional[Callable[[str, str], None]] = None
+    # (upload id, client ip, total, received); one browser can run several uploads at once
+    on_upload_progress: Optional[Callable[[str, str, int, int], None]] = None
+    # (upload id), once an upload is over, whether it completed, failed or was aborted
+    on_upload_finished: Optional[Callable[[str], None]] = None
+    on_upload_complete: Optional[Callable[[List[str], str], None]] = None
+    allow_uploads: bool = False
+    upload_dir: Path = Path.home() / "Received"
     html_template: Optional[str] = None
+
+    # Resolved once by FileShareServer and refreshed in the background
+    hostname: str = ""
+    local_ip: str = "127.0.0.1"
+
+    # Bumped whenever the shared files or text change
+    state_version: int = 0
+    # Tells apart concurrent uploads, even from the same address
+    _upload_ids = itertools.count(1)
+    # name -> (cache key, {content-encoding: body})
+    _body_cache: Dict[str, tuple] = {}
+    # (state version, [SharedFile], {token: SharedFile}, [SharedDirectory], {token: SharedDirectory})
+    _file_index: Optional[tuple] = None
+    _listings = ListingCache()
+    # (shared text, ETag, {content-encoding: body}), reused for as long as the same text object is shared
+    _text_body: Optional[tuple] = None
+
+    metrics = ShareMetrics()
     
     def log_message(self, format, *args):
         pass
+
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile, self.metrics)
+
+    def parse_request(self):
+        self._request_started = time.monotonic()
+        self._first_byte_sent = False
+        return super().parse_request()
+
+    def log_request(self, code='-', size='-'):
+        # Called by send_response for every response, so it doubles as the request counter
+        try:
+            status = int(code)
+        except (TypeError, ValueError):
+            return
+        self.metrics.record_request(endpoint_name(getattr(self, 'path', '')), status)
+
+    def flush_headers(self):
+        if not getattr(self, '_first_byte_sent', True):
+            self._first_byte_sent = True
+            self.metrics.record_ttfb(time.monotonic() - self._request_started)
+        super().flush_headers()
     
     @classmethod
     def load_html_template(cls):
@@ -40,49 +513,185 @@ class FileShareHandler(BaseHTTPRequestHandler):
             except FileNotFoundError:
                 raise RuntimeError(f"HTML template not found at {template_path}")
         return cls.html_template
+
+    @classmethod
+    def invalidate_cache(cls):
+        cls.state_version += 1
+
+    @classmethod
+    def _get_file_index(cls):
+        index = cls._file_index
+        if index is not None and index[0] == cls.state_version:
+            return index
+
+        files = []
+        dirs = []
+        for filepath in cls.shared_files:
+            if os.path.isdir(filepath):
+                dirs.append(SharedDirectory(Path(filepath)))
+                continue
+            shared = SharedFile.from_path(filepath)
+            if shared:
+                files.append(shared)
+        index = (cls.state_version, files, {f.token: f for f in files}, dirs, {d.token: d for d in dirs})
+        cls._file_index = index
+        return index
+
+    @classmethod
+    def get_shared_file_list(cls) -> List[SharedFile]:
+        return cls._get_file_index()[1]
+
+    @classmethod
+    def get_shared_dir_list(cls) -> List[SharedDirectory]:
+        return cls._get_file_index()[3]
+
+    @classmethod
+    def resolve_browse(cls, path: str):
+        """Split a /browse/<token>/<path> URL into its shared directory, relative path and target."""
+        token, _, relative = urlsplit(path).path[len('/browse/'):].partition('/')
+        root = cls._get_file_index()[4].get(token)
+        if root is None:
+            return None
+        relative = unquote(relative, errors='surrogateescape')
+        target = root.resolve(relative)
+        if target is None:
+            return None
+        return root, relative.strip('/'), target
+
+    @classmethod
+    def resolve_download(cls, token: str) -> Optional[SharedFile]:
+        shared = cls._get_file_index()[2].get(token)
+        if shared is None:
+            return None
+        if not shared.is_current():
+            # The file changed on disk, so its token is stale; relist so pages pick up the new one
+            cls.invalidate_cache()
+            return None
+        return shared
     
-    def _generate_shared_text_html(self, text: str) -> str:
+    @classmethod
+    def _generate_shared_text_html(cls, text: str, inline: bool) -> str:
         if not text:
             return ""
         
-        escaped_text = html.escape(text)
+        # Large text is left out of the page and loaded from /text by the script
+        escaped_text = html.escape(text) if inline else ""
         return f'''<h2>Shared Text</h2>
 <p>Select the text below and copy it to your clipboard.</p>
-<textarea class="share-text" readonly="readonly">{escaped_text}</textarea>'''
+<textarea class="share-text" id="share-text" readonly="readonly">{escaped_text}</textarea>
+<p><a href="/text">Open as plain text</a></p>'''
     
-    def _generate_shared_files_html(self, files: List[str]) -> str:
+    @classmethod
+    def _generate_shared_files_html(cls, files: List[SharedFile], dirs: List[SharedDirectory]) -> str:
         """Generate HTML for shared files section."""
-        if not files:
+        if not files and not dirs:
             return ""
         
         rows = ""
-        for i, filepath in enumerate(files):
-            try:
-                path = Path(filepath)
-                if path.exists() and path.is_file():
-                    name = html.escape(path.name)
-                    size = format_size(path.stat().st_size)
-                    rows += f'''<tr>
+        for shared_dir in dirs:
+            name = html.escape(shared_dir.path.name)
+            rows += f'''<tr>
+    <td>{name}/</td>
+    <td>Folder</td>
+    <td><a class="button" href="{shared_dir.url}">Browse</a></td>
+</tr>'''
+        for shared in files:
+            name = html.escape(shared.path.name)
+            size = format_size(shared.size)
+            rows += f'''<tr>
     <td>{name}</td>
     <td>{size}</td>
-    <td><a class="button" href="/download/{i}">Download</a></td>
+    <td><a class="button" href="{shared.url}">Download</a></td>
 </tr>'''
-            except Exception:
-                continue
         
-        if not rows:
-            return ""
+        download_all = ""
+        if len(files) > 1:
+            download_all = '<p><a class="button" href="/download/all.zip">Download all (.zip)</a></p>'
         
         return f'''<h2>Shared Files</h2>
 <p>Click a button to download the corresponding file.</p>
 <table class="file-list" cellpadding="0" cellspacing="0">
     <tr><th>Filename</th><th>Size</th><th>Action</th></tr>
     {rows}
-</table>'''
+</table>
+{download_all}'''
     
-    def _get_base_html(self, hostname: str, url: str, total_size_info: str, 
-                       no_content_display: str, shared_text_html: str, shared_files_html: str) -> str:
-        template = self.load_html_template()
+    @classmethod
+    def _generate_directory_html(cls, root: SharedDirectory, relative: str, query: Dict[str, List[str]]) -> str:
+        """Generate one page of a shared directory listing."""
+        target = root.path.joinpath(*relative.split('/')) if relative else root.path
+        page, sort, reverse = parse_listing_query(query)
+        listing = cls._listings.get(str(target))
+        entries, pages = listing.page(page, sort, reverse)
+        page = min(max(page, 0), pages - 1)
+        base = root.url_for(relative + '/' if relative else '')
+
+        def link(**params) -> str:
+            merged = {'page': page + 1, 'sort': sort, 'order': 'desc' if reverse else 'asc'}
+            merged.update(params)
+            return html.escape(base + '?' + urlencode(merged))
+
+        crumbs = [f'<a href="{html.escape(root.url)}">{html.escape(display_name(root.path.name))}</a>']
+        parts = relative.split('/') if relative else []
+        for i, part in enumerate(parts):
+            crumbs.append(f'<a href="{html.escape(root.url_for("/".join(parts[:i + 1]) + "/"))}">'
+                          f'{html.escape(display_name(part))}</a>')
+
+        headers = ""
+        for key, label in (('name', 'Filename'), ('size', 'Size'), ('mtime', 'Modified')):
+            order = 'desc' if key == sort and not reverse else 'asc'
+            arrow = (' &#9660;' if reverse else ' &#9650;') if key == sort else ''
+            headers += f'<th><a href="{link(sort=key, order=order, page=1)}">{label}</a>{arrow}</th>'
+
+        rows = ""
+        for entry in entries:
+            name = html.escape(display_name(entry.name))
+            entry_url = html.escape(root.url_for(f"{relative}/{entry.name}" if relative else entry.name))
+            modified = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry.mtime)) if entry.mtime else ''
+            if entry.is_dir:
+                rows += f'''<tr>
+    <td><a href="{entry_url}/">{name}/</a></td>
+    <td>Folder</td>
+    <td>{modified}</td>
+</tr>'''
+            else:
+                rows += f'''<tr>
+    <td><a href="{entry_url}">{name}</a></td>
+    <td>{format_size(entry.size)}</td>
+    <td>{modified}</td>
+</tr>'''
+
+        pager = ""
+        if pages > 1:
+            prev_link = f'<a class="button" href="{link(page=page)}">Previous</a> ' if page > 0 else ''
+            next_link = f' <a class="button" href="{link(page=page + 2)}">Next</a>' if page + 1 < pages else ''
+            pager = f'<p>{prev_link}Page {page + 1} of {pages}{next_link}</p>'
+
+        return f'''<h2>{" / ".join(crumbs)}</h2>
+<p>{len(listing)} item(s). <a href="/">Back to share</a></p>
+<table class="file-list" cellpadding="0" cellspacing="0">
+    <tr>{headers}</tr>
+    {rows}
+</table>
+{pager}'''
+
+    @classmethod
+    def render_browse_page(cls, root: SharedDirectory, relative: str, query_string: str, url: str) -> bytes:
+        return cls._get_base_html(
+            hostname=cls.hostname or socket.gethostname(),
+            url=url,
+            total_size_info="",
+            no_content_display='none',
+            shared_text_html="",
+            shared_files_html=cls._generate_directory_html(root, relative, parse_qs(query_string)),
+            is_index=False
+        ).encode('utf-8')
+
+    @classmethod
+    def _get_base_html(cls, hostname: str, url: str, total_size_info: str, 
+                       no_content_display: str, shared_text_html: str, shared_files_html: str,
+                       is_index: bool = True, text_etag: str = "") -> str:
+        template = cls.load_html_template()
         
         replacements = {
             '{{TITLE}}': 'CLARA Share',
@@ -90,6 +699,11 @@ class FileShareHandler(BaseHTTPRequestHandler):
             '{{URL}}': html.escape(url),
             '{{TOTAL_SIZE_INFO}}': total_size_info,
             '{{NO_CONTENT_DISPLAY}}': no_content_display,
+            '{{UPLOAD_DISPLAY}}': 'block' if cls.allow_uploads and is_index else 'none',
+            # Directory pages aren't part of /api/data, so they must not be overwritten by it
+            '{{LIVE_UPDATES}}': 'true' if is_index else 'false',
+            # Goes into a script string, where entities aren't decoded; it is hex in quotes
+            '{{TEXT_ETAG}}': text_etag,
             '{{SHARED_TEXT_HTML}}': shared_text_html,
             '{{SHARED_FILES_HTML}}': shared_files_html
         }
@@ -103,148 +717,491 @@ class FileShareHandler(BaseHTTPRequestHandler):
     def do_GET(self):
         if self.path == '/':
             self.send_combined_index_page()
+        elif self.path == '/download/all.zip':
+            self.handle_download_all()
         elif self.path.startswith('/download/'):
             self.handle_download()
+        elif self.path.startswith('/browse/'):
+            self.handle_browse()
         elif self.path == '/api/data':
             self.send_api_data()
+        elif urlsplit(self.path).path == '/text':
+            self.send_text()
+        elif urlsplit(self.path).path == '/api/metrics':
+            self.send_metrics()
         else:
             self.send_error(404, "Not Found")
 
-    def _get_api_data_dict(self):
-        files_data = []
-        for i, filepath in enumerate(self.shared_files):
-            try:
-                path = Path(filepath)
-                if path.exists() and path.is_file():
-                    files_data.append({
-                        "name": html.escape(path.name),
-                        "size": format_size(path.stat().st_size),
-                        "url": f"/download/{i}"
-                    })
-            except Exception:
-                continue
+    def do_POST(self):
+        if self.path == '/upload':
+            self.handle_upload()
+        else:
+            self.send_error(404, "Not Found")
+
+    @classmethod
+    def _get_api_data_dict(cls):
+        files_data = [
+            {
+                "name": html.escape(shared.path.name),
+                "size": format_size(shared.size),
+                "url": shared.url
+            }
+            for shared in cls.get_shared_file_list()
+        ]
+        dirs_data = [
+            {
+                "name": html.escape(shared_dir.path.name),
+                "url": shared_dir.url
+            }
+            for shared_dir in cls.get_shared_dir_list()
+        ]
+        
+        text = None
+        if cls.shared_text:
+            etag, variants = cls.get_text_body()
+            # Only the version is polled, the text itself comes from /text when it changes
+            text = {"etag": etag, "size": len(variants['identity'])}
         
         return {
-            "text": html.escape(self.shared_text or ""),
-            "files": files_data
+            "text": text,
+            "files": files_data,
+            "dirs": dirs_data
         }
 
-    def send_combined_index_page(self):
-        has_content = bool(self.shared_text or self.shared_files)
+    @classmethod
+    def _render_index_page(cls, url: str) -> bytes:
+        has_content = bool(cls.shared_text or cls.shared_files)
+        files = cls.get_shared_file_list()
         
-        hostname = socket.gethostname()
         total_size_info = ""
-        if self.shared_files:
-            total_size_bytes = 0
-            for filepath in self.shared_files:
-                try:
-                    p = Path(filepath)
-                    if p.is_file():
-                        total_size_bytes += p.stat().st_size
-                except (FileNotFoundError, OSError):
-                    pass
-            if total_size_bytes > 0:
-                total_size_info = format_size(total_size_bytes)
+        total_size_bytes = sum(shared.size for shared in files)
+        if total_size_bytes > 0:
+            total_size_info = format_size(total_size_bytes)
 
-        url = f"http://{self._get_local_ip()}:{self.server.server_address[1]}/" #type: ignore
         no_content_display = 'none' if has_content else 'block'
         
         # Generate HTML server-side
-        shared_text_html = self._generate_shared_text_html(self.shared_text or "")
-        shared_files_html = self._generate_shared_files_html(self.shared_files)
+        text_etag = ""
+        inline_text = False
+        if cls.shared_text:
+            etag, variants = cls.get_text_body()
+            inline_text = len(variants['identity']) <= INLINE_TEXT_LIMIT
+            if inline_text:
+                text_etag = etag
+        shared_text_html = cls._generate_shared_text_html(cls.shared_text or "", inline_text)
+        shared_files_html = cls._generate_shared_files_html(files, cls.get_shared_dir_list())
 
-        html_content = self._get_base_html(
-            hostname=hostname,
+        return cls._get_base_html(
+            hostname=cls.hostname or socket.gethostname(),
             url=url,
             total_size_info=total_size_info,
             no_content_display=no_content_display,
             shared_text_html=shared_text_html,
-            shared_files_html=shared_files_html
+            shared_files_html=shared_files_html,
+            text_etag=text_etag
         ).encode('utf-8')
-        
+
+    def _accepted_encoding(self) -> Optional[str]:
+        return negotiate_encoding(self.headers.get('Accept-Encoding', ''))
+
+    @classmethod
+    def _get_cached_body(cls, name: str, cache_key, render: Callable[[], bytes]) -> Dict[str, bytes]:
+        cached = cls._body_cache.get(name)
+        if cached is not None and cached[0] == cache_key:
+            return cached[1]
+
+        variants = {'identity': render()}
+        cls._body_cache[name] = (cache_key, variants)
+        return variants
+
+    @classmethod
+    def get_index_body(cls, port: int) -> Dict[str, bytes]:
+        url = f"http://{cls.local_ip}:{port}/"
+        # Only re-render when the share state or the network address changed
+        return cls._get_cached_body(
+            'index',
+            (cls.state_version, cls.hostname, url),
+            lambda: cls._render_index_page(url)
+        )
+
+    @classmethod
+    def get_api_data_body(cls) -> Dict[str, bytes]:
+        return cls._get_cached_body(
+            'api_data',
+            cls.state_version,
+            lambda: json.dumps(cls._get_api_data_dict()).encode('utf-8')
+        )
+
+    @classmethod
+    def get_text_body(cls) -> Tuple[str, Dict[str, bytes]]:
+        """Return the ETag and encoded variants of the shared text, encoding it once per change."""
+        text = cls.shared_text or ""
+        cached = cls._text_body
+        if cached is not None and cached[0] is text:
+            return cached[1], cached[2]
+
+        body = text.encode('utf-8')
+        etag = f'"{hashlib.blake2b(body, digest_size=10).hexdigest()}"'
+        variants = {'identity': body}
+        cls._text_body = (text, etag, variants)
+        return etag, variants
+
+    @classmethod
+    def build_text_response(cls, if_none_match: str, range_header: str, if_range: str,
+                            encoding: Optional[str]) -> Tuple[int, Dict[str, str], bytes]:
+        """Answer GET /text with the raw shared text, honouring ETags, a single byte range and compression."""
+        if not cls.shared_text:
+            return 404, {'Content-Type': 'text/plain; charset=utf-8'}, b"No text is being shared"
+
+        etag, variants = cls.get_text_body()
+        # A range is only valid against the version the client already has part of, and is always
+        # taken from the uncompressed text
+        ranged = bool(range_header) and (not if_range or if_range == etag)
+        body, encoding = (variants['identity'], None) if ranged else select_body_variant(variants, encoding)
+        # Each encoding is a different sequence of bytes, so it gets its own strong validator
+        headers = {
+            'Content-Type': 'text/plain; charset=utf-8',
+            'ETag': variant_etag(etag, encoding),
+            'Cache-Control': 'no-cache',
+            'Accept-Ranges': 'bytes',
+            'Vary': 'Accept-Encoding',
+        }
+        if headers['ETag'] in if_none_match:
+            return 304, headers, b""
+
+        if ranged:
+            try:
+                byte_range = parse_byte_range(range_header, len(body))
+            except ValueError:
+                headers['Content-Range'] = f'bytes */{len(body)}'
+                return 416, headers, b""
+            if byte_range:
+                start, end = byte_range
+                headers['Content-Range'] = f'bytes {start}-{end}/{len(body)}'
+                return 206, headers, body[start:end + 1]
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return 200, headers, body
+
+    @classmethod
+    def get_metrics_body(cls, path: str, accept: str):
+        """Render /api/metrics as JSON, or Prometheus text for ?format=prometheus / Accept: text/plain."""
+        query = parse_qs(urlsplit(path).query)
+        fmt = query.get('format', [''])[0]
+        if fmt == 'prometheus' or (not fmt and 'text/plain' in accept and 'json' not in accept):
+            return 'text/plain; version=0.0.4; charset=utf-8', cls.metrics.to_prometheus().encode('utf-8')
+        return 'application/json; charset=utf-8', json.dumps(cls.metrics.snapshot()).encode('utf-8')
+
+    def _send_cached_body(self, variants: Dict[str, bytes], content_type: str):
+        body, encoding = select_body_variant(variants, self._accepted_encoding())
+
         self.send_response(200)
-        self.send_header('Content-Type', 'text/html; charset=utf-8')
-        self.send_header('Content-Length', str(len(html_content)))
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Vary', 'Accept-Encoding')
+        # Pages and API responses change with the share, so always revalidate
+        self.send_header('Cache-Control', 'no-cache')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
         self.end_headers()
-        self.wfile.write(html_content)
+        self.wfile.write(body)
+
+    def send_combined_index_page(self):
+        self._send_cached_body(
+            self.get_index_body(self.server.server_address[1]), #type: ignore
+            'text/html; charset=utf-8'
+        )
 
     def send_api_data(self):
-        data = self._get_api_data_dict()
-        json_response = json.dumps(data).encode('utf-8')
-        
-        self.send_response(200)
-        self.send_header('Content-Type', 'application/json; charset=utf-8')
-        self.send_header('Content-Length', str(len(json_response)))
+        self._send_cached_body(self.get_api_data_body(), 'application/json; charset=utf-8')
+
+    def send_text(self):
+        status, headers, body = self.build_text_response(
+            self.headers.get('If-None-Match', ''),
+            self.headers.get('Range', ''),
+            self.headers.get('If-Range', ''),
+            self._accepted_encoding()
+        )
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
         self.end_headers()
-        self.wfile.write(json_response)
+        self.wfile.write(body)
+
+    def send_metrics(self):
+        content_type, body = self.get_metrics_body(self.path, self.headers.get('Accept', ''))
+        self._send_cached_body({'identity': body}, content_type)
     
-    def _get_local_ip(self) -> str:
+    def _start_streamed_body(self):
+        """Send the framing headers for a body of unknown length and return the writer for it."""
+        if self.request_version == 'HTTP/1.0':
+            # Chunked encoding doesn't exist in 1.0, the body ends when the connection closes
+            self.send_header('Connection', 'close')
+            self.end_headers()
+            return None
+
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        return ChunkedWriter(self.wfile)
+
+    def _send_compressed_stream(self, f, encoding: str, out):
+        if encoding == 'gzip':
+            compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        else:
+            compressor = zlib.compressobj(6)
+
+        while True:
+            chunk = f.read(DOWNLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            data = compressor.compress(chunk)
+            if data:
+                out.write(data)
+        out.write(compressor.flush())
+
+    def handle_download_all(self):
+        files = [Path(f) for f in self.shared_files]
+        files = [p for p in files if p.is_file()]
+        if not files:
+            self.send_error(404, "File not found")
+            return
+
+        client_ip = self.client_address[0]
+
+        # The archive is written straight to the socket, so its size isn't known up front
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Disposition', content_disposition("CLARA Share.zip"))
+        writer = self._start_streamed_body()
+
+        on_file = None
+        if FileShareHandler.on_download:
+            callback = FileShareHandler.on_download
+            on_file = lambda arcname: callback(arcname, client_ip)
+
+        self.metrics.download_started(ZIP_DOWNLOAD_NAME)
+        body_start = self.wfile.bytes_written
+        completed = False
         try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-                s.connect(("8.8.8.8", 80))
-                return s.getsockname()[0]
-        except Exception:
-            return "127.0.0.1"
-    
+            write_zip_archive(files, writer or self.wfile, on_file)
+            if writer:
+                writer.close()
+            completed = True
+        except (ConnectionError, BrokenPipeError):
+            self.close_connection = True
+        except Exception as e:
+            # Leave the body unterminated so the client sees the archive as broken
+            print(f"Error streaming zip archive: {e}")
+            self.close_connection = True
+        finally:
+            self.metrics.download_finished(ZIP_DOWNLOAD_NAME, self.wfile.bytes_written - body_start, completed)
+
+    def handle_upload(self):
+        if not self.allow_uploads:
+            self.send_error(403, "Uploads are disabled")
+            return
+
+        content_type = self.headers.get('Content-Type', '')
+        match = re.search(r'boundary="?([^";]+)"?', content_type)
+        if not content_type.startswith('multipart/form-data') or not match:
+            self.send_error(400, "Expected multipart/form-data")
+            return
+
+        try:
+            content_length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self.send_error(411, "Length Required")
+            return
+
+        existing_dir = self.upload_dir if self.upload_dir.exists() else self.upload_dir.parent
+        try:
+            free_space = shutil.disk_usage(existing_dir).free
+        except OSError:
+            free_space = None
+        if free_space is not None and content_length > free_space:
+            self.send_error(507, "Not enough free space for the upload")
+            return
+
+        client_ip = self.client_address[0]
+        upload_id = f"{client_ip}#{next(FileShareHandler._upload_ids)}"
+        on_progress = None
+        if FileShareHandler.on_upload_progress:
+            callback = FileShareHandler.on_upload_progress
+            on_progress = lambda total, received: callback(upload_id, client_ip, total, received)
+
+        reader = MultipartUploadReader(
+            self.rfile, match.group(1).encode('latin-1'), content_length,
+            self.upload_dir, on_progress
+        )
+        try:
+            received_files = reader.read_files()
+        except (ValueError, ConnectionError) as e:
+            self.close_connection = True
+            if not self.wfile.closed:
+                try:
+                    self.send_error(400, str(e))
+                except OSError:
+                    pass
+            return
+        finally:
+            if FileShareHandler.on_upload_finished:
+                FileShareHandler.on_upload_finished(upload_id)
+
+        if received_files and FileShareHandler.on_upload_complete:
+            FileShareHandler.on_upload_complete(received_files, client_ip)
+
+        body = json.dumps({"files": [Path(f).name for f in received_files]}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
     def handle_download(self):
+        token = urlsplit(self.path).path[len('/download/'):]
+        shared = self.resolve_download(token)
+        if shared:
+            self._send_file(shared, IMMUTABLE_CACHE_CONTROL)
+        else:
+            self.send_error(404, "File not found")
+
+    def handle_browse(self):
+        resolved = self.resolve_browse(self.path)
+        if resolved is None:
+            self.send_error(404, "Not Found")
+            return
+
+        root, relative, target = resolved
+        if target.is_dir():
+            try:
+                body = self.render_browse_page(
+                    root, relative, urlsplit(self.path).query,
+                    f"http://{self.local_ip}:{self.server.server_address[1]}/" #type: ignore
+                )
+            except (OSError, ValueError):
+                self.send_error(404, "Not Found")
+                return
+            self._send_cached_body({'identity': body}, 'text/html; charset=utf-8')
+            return
+
+        shared = SharedFile.from_path(str(target))
+        if shared:
+            # The URL names a path rather than a version, so clients have to revalidate
+            self._send_file(shared, 'no-cache')
+        else:
+            self.send_error(404, "File not found")
+
+    def _send_file(self, shared: SharedFile, cache_control: str):
+        headers_sent = False
+        download_name = None
+        body_start = 0
+        completed = False
         try:
-            index = int(self.path.split('/')[-1])
+            path = shared.path
+            etag = f'"{shared.token}"'
             
-            if 0 <= index < len(self.shared_files):
-                filepath = self.shared_files[index]
-                path = Path(filepath)
-                
-                if not path.exists() or not path.is_file():
-                    self.send_error(404, "File not found")
-                    return
-                
-                client_ip = self.client_address[0]
-                
-                if FileShareHandler.on_download:
-                    FileShareHandler.on_download(path.name, client_ip)
-                
-                mime_type, _ = mimetypes.guess_type(str(path))
-                if mime_type is None:
-                    mime_type = 'application/octet-stream'
-                
-                file_size = path.stat().st_size
-                
+            if etag in self.headers.get('If-None-Match', ''):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', cache_control)
+                self.end_headers()
+                return
+            
+            client_ip = self.client_address[0]
+            
+            if FileShareHandler.on_download:
+                FileShareHandler.on_download(path.name, client_ip)
+            
+            mime_type, _ = mimetypes.guess_type(str(path))
+            if mime_type is None:
+                mime_type = 'application/octet-stream'
+            
+            file_size = shared.size
+            encoding = None
+            if is_compressible(mime_type) and file_size >= COMPRESS_MIN_SIZE:
+                encoding = self._accepted_encoding()
+            
+            with open(path, 'rb') as f:
                 self.send_response(200)
                 self.send_header('Content-Type', mime_type)
-                self.send_header('Content-Length', str(file_size))
-                self.send_header('Content-Disposition', f'attachment; filename="{path.name}"')
-                self.end_headers()
-                
-                with open(path, 'rb') as f:
-                    self.wfile.write(f.read())
+                self.send_header('Vary', 'Accept-Encoding')
+                self.send_header('Content-Disposition', content_disposition(path.name))
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', cache_control)
+                headers_sent = True
 
-            else:
-                self.send_error(404, "File not found")
+                if encoding:
+                    # Compressed on the fly, so the final length isn't known
+                    self.send_header('Content-Encoding', encoding)
+                    writer = self._start_streamed_body()
+                else:
+                    writer = None
+                    self.send_header('Content-Length', str(file_size))
+                    self.end_headers()
+
+                download_name = path.name
+                body_start = self.wfile.bytes_written
+                self.metrics.download_started(download_name)
+
+                if encoding:
+                    self._send_compressed_stream(f, encoding, writer or self.wfile)
+                    if writer:
+                        writer.close()
+                else:
+                    shutil.copyfileobj(f, self.wfile, DOWNLOAD_CHUNK_SIZE)
+                completed = True
                 
+        except (ConnectionError, BrokenPipeError):
+            self.close_connection = True
         except Exception as e:
             print(f"Error handling download: {e}")
-            if not self.wfile.closed:
+            self.close_connection = True
+            if not headers_sent and not self.wfile.closed:
                 self.send_error(500, "Internal Server Error")
+        finally:
+            if download_name:
+                self.metrics.download_finished(download_name, self.wfile.bytes_written - body_start, completed)
 
 
 class FileShareServer:    
+    NETWORK_REFRESH_INTERVAL = 30
+    supports_uploads = True
+
     def __init__(self, port: int = 8080):
         self.port = port
-        self.server: Optional[HTTPServer] = None
+        self.server = None
         self.thread: Optional[threading.Thread] = None
         self.running = False
+        self._stop_event = threading.Event()
         self.shared_files: List[str] = []
         self.shared_text: Optional[str] = None
         
         self.on_download: Optional[Callable[[str, str], None]] = None
+        self.on_upload_progress: Optional[Callable[[str, str, int, int], None]] = None
+        self.on_upload_finished: Optional[Callable[[str], None]] = None
+        self.on_upload_complete: Optional[Callable[[List[str], str], None]] = None
+        self.allow_uploads = False
     
     def get_local_ip(self) -> str:
-        try:
-            with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
-                s.connect(("8.8.8.8", 80))
-                return s.getsockname()[0]
-        except Exception:
-            return "127.0.0.1"
+        if self.running:
+            return FileShareHandler.local_ip
+        return get_local_ip()
+
+    def _refresh_network_info(self):
+        hostname = socket.gethostname()
+        local_ip = get_local_ip()
+        FileShareHandler.hostname = hostname
+        FileShareHandler.local_ip = local_ip
+
+    def _network_refresh_loop(self, stop_event: threading.Event):
+        while not stop_event.wait(self.NETWORK_REFRESH_INTERVAL):
+            try:
+                self._refresh_network_info()
+            except Exception:
+                pass
 
     def _start_server_if_needed(self) -> str:
         if self.running and self.server:
@@ -252,12 +1209,17 @@ class FileShareServer:
             return f"http://{local_ip}:{self.port}"
 
         FileShareHandler.on_download = self.on_download
+        FileShareHandler.on_upload_progress = self.on_upload_progress
+        FileShareHandler.on_upload_finished = self.on_upload_finished
+        FileShareHandler.on_upload_complete = self.on_upload_complete
+        FileShareHandler.allow_uploads = self.allow_uploads and self.supports_uploads
+        FileShareHandler.metrics.reset()
         
         port = self.port
         max_attempts = 10
         for attempt in range(max_attempts):
             try:
-                self.server = HTTPServer(('0.0.0.0', port), FileShareHandler)
+                self._bind(port)
                 break
             except OSError:
                 port += 1
@@ -265,17 +1227,30 @@ class FileShareServer:
                     raise RuntimeError(f"Could not find available port after {max_attempts} attempts")
         
         self.port = port
+        self._refresh_network_info()
         self.running = True
         
         self.thread = threading.Thread(target=self._run_server, daemon=True)
         self.thread.start()
+
+        self._stop_event = threading.Event()
+        threading.Thread(target=self._network_refresh_loop, args=(self._stop_event,), daemon=True).start()
         
         local_ip = self.get_local_ip()
         return f"http://{local_ip}:{self.port}"
 
+    def _bind(self, port: int):
+        # Threaded so that long uploads and downloads don't block each other
+        self.server = ThreadingHTTPServer(('0.0.0.0', port), FileShareHandler)
+
+    def _close_server(self):
+        self.server.shutdown()
+        self.server.server_close()
+
     def share_files(self, files: List[str]) -> str:
         self.shared_files = files
         FileShareHandler.shared_files = self.shared_files
+        FileShareHandler.invalidate_cache()
         return self._start_server_if_needed()
 
     def add_files(self, files: List[str]):
@@ -288,10 +1263,12 @@ class FileShareServer:
                 self.shared_files.append(f)
         
         FileShareHandler.shared_files = self.shared_files
+        FileShareHandler.invalidate_cache()
 
     def share_text(self, text: str) -> str:
         self.shared_text = text
         FileShareHandler.shared_text = self.shared_text
+        FileShareHandler.invalidate_cache()
         return self._start_server_if_needed()
     
     def _run_server(self):
@@ -303,10 +1280,10 @@ class FileShareServer:
         self.running = False
     
     def stop(self):
+        self._stop_event.set()
         if self.server:
             self.running = False
-            self.server.shutdown()
-            self.server.server_close()
+            self._close_server()
             self.server = None
         
         if self.thread and self.thread.is_alive():
@@ -317,7 +1294,11 @@ class FileShareServer:
         self.shared_text = None
         FileShareHandler.shared_files = []
         FileShareHandler.shared_text = None
+        FileShareHandler.invalidate_cache()
     
+    def get_metrics(self) -> Dict:
+        return FileShareHandler.metrics.snapshot()
+
     def is_running(self) -> bool:
         return self.running
     
@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+
+import asyncio
+import mimetypes
+import socket
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+from core.http_share import (
+    IMMUTABLE_CACHE_CONTROL,
+    ZIP_DOWNLOAD_NAME,
+    ChunkedWriter,
+    FileShareHandler,
+    FileShareServer,
+    SharedFile,
+    content_disposition,
+    negotiate_encoding,
+    select_body_variant,
+    write_zip_archive,
+)
+from core.share_metrics import endpoint_name
+
+# Bytes written per token-bucket reservation, small enough to interleave clients fairly
+SHAPING_CHUNK_SIZE = 16 * 1024
+IDLE_TIMEOUT = 30
+MAX_HEADER_SIZE = 64 * 1024
+# Archives are built on their own worker threads, one per download, so this also caps those threads
+MAX_ZIP_DOWNLOADS = 4
+
+STATUS_TEXT = {
+    200: "OK",
+    206: "Partial Content",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    416: "Range Not Satisfiable",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class TokenBucket:
+    """Token bucket where a rate of 0 means unlimited.
+
+    Tokens can go negative: each caller reserves its bytes immediately and then
+    sleeps off the debt, so waiting clients are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, SHAPING_CHUNK_SIZE)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def consume(self, amount: int):
+        if self.rate <= 0:
+            return
+
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        self.tokens -= amount
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class _QueueWriter:
+    """File-like object that hands writes from a worker thread to the event loop.
+
+    Chunks reach the loop's asyncio.Queue through call_soon_threadsafe, so no
+    thread sits blocked waiting for them. At most `maxsize` chunks are in
+    flight: the worker blocks while the client is slow and memory stays
+    constant. Setting `aborted` makes pending writes fail.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int = 8):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.slots = threading.Semaphore(maxsize)
+        self.aborted = threading.Event()
+
+    def put(self, data):
+        while not self.slots.acquire(timeout=0.5):
+            if self.aborted.is_set():
+                raise ConnectionError("Client went away")
+        if self.aborted.is_set():
+            raise ConnectionError("Client went away")
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, data)
+
+    def close(self):
+        """Tell the loop no more data is coming, whether the worker finished or failed."""
+        try:
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+        except RuntimeError:
+            # The loop already shut down
+            pass
+
+    async def get(self):
+        data = await self.queue.get()
+        if data is not None:
+            self.slots.release()
+        return data
+
+    def write(self, data) -> int:
+        self.put(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+
+class AsyncFileShareServer(FileShareServer):
+    """asyncio engine for the browser share with bandwidth shaping.
+
+    Serves the same pages as the threaded engine (index, /api/data, /text,
+    /download/<token>, /download/all.zip and /browse/) from the same
+    FileShareHandler state, but every body goes through a per-client and a
+    global token bucket and the number of connections per IP is capped.
+    Uploads aren't supported.
+    """
+
+    supports_uploads = False
+
+    def __init__(self, port: int = 8080, rate_limit: int = 0, client_rate_limit: int = 0,
+                 max_connections_per_ip: int = 6):
+        super().__init__(port)
+        # Bytes per second, 0 means unlimited
+        self.rate_limit = rate_limit
+        self.client_rate_limit = client_rate_limit
+        self.max_connections_per_ip = max_connections_per_ip
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._shutdown: Optional[asyncio.Event] = None
+        self._global_bucket = TokenBucket(rate_limit)
+        self._client_buckets: Dict[str, TokenBucket] = {}
+        self._connections: Dict[str, int] = defaultdict(int)
+        self._tasks = set()
+        self._zip_executor: Optional[ThreadPoolExecutor] = None
+        self._zip_downloads = 0
+
+    def _bind(self, port: int):
+        self.server = socket.create_server(('0.0.0.0', port))
+
+    def _close_server(self):
+        if self.loop and self._shutdown:
+            self.loop.call_soon_threadsafe(self._shutdown.set)
+        else:
+            self.server.close()
+
+    def _run_server(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._serve())
+        except Exception:
+            pass
+        finally:
+            self.loop.close()
+            self.loop = None
+        self.running = False
+
+    async def _serve(self):
+        self._shutdown = asyncio.Event()
+        self._global_bucket = TokenBucket(self.rate_limit)
+        # Kept apart from the loop's default executor, so stalled zip clients can't starve file reads
+        self._zip_executor = ThreadPoolExecutor(max_workers=MAX_ZIP_DOWNLOADS, thread_name_prefix='share-zip')
+        self._zip_downloads = 0
+        server = await asyncio.start_server(self._track_client, sock=self.server)
+        try:
+            async with server:
+                await self._shutdown.wait()
+                for task in list(self._tasks):
+                    task.cancel()
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            self._zip_executor.shutdown(wait=False)
+
+    async def _track_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        try:
+            await self._handle_client(reader, writer)
+        finally:
+            self._tasks.discard(task)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client_ip = writer.get_extra_info('peername')[0]
+        sock = writer.get_extra_info('socket')
+        if sock is not None:
+            # The head and body go out in separate writes; with Nagle the body would wait for a delayed ACK
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        if self._connections[client_ip] >= self.max_connections_per_ip:
+            ex = _Exchange(writer, client_ip, 'GET', '', 'HTTP/1.1', {})
+            ex.keep_alive = False
+            await self._send_simple(ex, 503, "Too many connections")
+            writer.close()
+            return
+
+        self._connections[client_ip] += 1
+        if client_ip not in self._client_buckets:
+            self._client_buckets[client_ip] = TokenBucket(self.client_rate_limit)
+
+        try:
+            while True:
+                try:
+                    ex = await asyncio.wait_for(self._read_request(reader, writer, client_ip), IDLE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                if ex.method is None:
+                    ex.keep_alive = False
+                    await self._send_simple(ex, 400, "Bad Request")
+                    break
+
+                if not await self._respond(ex) or not ex.keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._connections[client_ip] -= 1
+            if self._connections[client_ip] <= 0:
+                del self._connections[client_ip]
+                self._client_buckets.pop(client_ip, None)
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                            client_ip: str) -> '_Exchange':
+        head = await reader.readuntil(b"\r\n\r\n")
+        bad_request = _Exchange(writer, client_ip, None, '', 'HTTP/1.1', {})
+        if len(head) > MAX_HEADER_SIZE:
+            return bad_request
+
+        lines = head.decode('latin-1').split("\r\n")
+        parts = lines[0].split()
+        if len(parts) != 3:
+            return bad_request
+        method, path, version = parts
+
+        headers = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+
+        ex = _Exchange(writer, client_ip, method, path, version, headers)
+        if headers.get('content-length', '0') not in ('', '0') or 'transfer-encoding' in headers:
+            # No endpoint reads a request body, so the rest of the stream can't be trusted
+            ex.keep_alive = False
+        return ex
+
+    async def _respond(self, ex: '_Exchange') -> bool:
+        if ex.method not in ('GET', 'HEAD'):
+            ex.keep_alive = False
+            await self._send_simple(ex, 405, "Method Not Allowed")
+            return False
+
+        encoding = negotiate_encoding(ex.headers.get('accept-encoding', ''))
+        path = ex.path.split('?', 1)[0]
+
+        if path == '/':
+            variants = FileShareHandler.get_index_body(self.port)
+            return await self._send_cached(ex, variants, 'text/html; charset=utf-8', encoding)
+        if path == '/api/data':
+            variants = FileShareHandler.get_api_data_body()
+            return await self._send_cached(ex, variants, 'application/json; charset=utf-8', encoding)
+        if path == '/text':
+            status, headers, body = FileShareHandler.build_text_response(
+                ex.headers.get('if-none-match', ''),
+                ex.headers.get('range', ''),
+                ex.headers.get('if-range', ''),
+                encoding
+            )
+            if status != 304:
+                headers['Content-Length'] = str(len(body))
+            await self._write_head(ex, status, headers)
+            await self._write_shaped(ex, body)
+            return True
+        if path == '/api/metrics':
+            content_type, body = FileShareHandler.get_metrics_body(ex.path, ex.headers.get('accept', ''))
+            return await self._send_cached(ex, {'identity': body}, content_type, encoding)
+        if path == '/download/all.zip':
+            return await self._send_zip(ex)
+        if path.startswith('/download/'):
+            return await self._send_download(ex)
+        if path.startswith('/browse/'):
+            return await self._send_browse(ex, encoding)
+
+        await self._send_simple(ex, 404, "Not Found")
+        return True
+
+    async def _write_head(self, ex: '_Exchange', status: int, headers: Dict[str, str]):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}"]
+        for key, value in headers.items():
+            lines.append(f"{key}: {value}")
+        lines.append(f"Connection: {'keep-alive' if ex.keep_alive else 'close'}")
+        head = ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+        metrics = FileShareHandler.metrics
+        metrics.record_request(endpoint_name(ex.path), status)
+        metrics.record_ttfb(time.monotonic() - ex.started)
+        metrics.add_bytes_sent(len(head))
+
+        ex.writer.write(head)
+        if ex.method == 'HEAD':
+            await ex.writer.drain()
+
+    async def _write_shaped(self, ex: '_Exchange', data: bytes):
+        if ex.method == 'HEAD':
+            return
+
+        client_bucket = self._client_buckets.get(ex.client_ip) or TokenBucket(0)
+        view = memoryview(data)
+        for offset in range(0, len(view), SHAPING_CHUNK_SIZE):
+            piece = view[offset:offset + SHAPING_CHUNK_SIZE]
+            await client_bucket.consume(len(piece))
+            await self._global_bucket.consume(len(piece))
+            ex.writer.write(piece)
+            await ex.writer.drain()
+            ex.body_sent += len(piece)
+            FileShareHandler.metrics.add_bytes_sent(len(piece))
+
+    async def _send_simple(self, ex: '_Exchange', status: int, message: str):
+        body = message.encode('utf-8')
+        await self._write_head(ex, status, {
+            'Content-Type': 'text/plain; charset=utf-8',
+            'Content-Length': str(len(body)),
+        })
+        await self._write_shaped(ex, body)
+
+    async def _send_cached(self, ex: '_Exchange', variants: Dict[str, bytes], content_type: str,
+                           encoding: Optional[str]) -> bool:
+        body, encoding = select_body_variant(variants, encoding)
+        headers = {
+            'Content-Type': content_type,
+            'Content-Length': str(len(body)),
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': 'no-cache',
+        }
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        await self._write_head(ex, 200, headers)
+        await self._write_shaped(ex, body)
+        return True
+
+    async def _send_download(self, ex: '_Exchange') -> bool:
+        token = ex.path.split('?', 1)[0][len('/download/'):]
+        shared = FileShareHandler.resolve_download(token)
+        if not shared:
+            await self._send_simple(ex, 404, "File not found")
+            return True
+        return await self._send_file(ex, shared, IMMUTABLE_CACHE_CONTROL)
+
+    async def _send_browse(self, ex: '_Exchange', encoding: Optional[str]) -> bool:
+        resolved = FileShareHandler.resolve_browse(ex.path)
+        if resolved is None:
+            await self._send_simple(ex, 404, "Not Found")
+            return True
+
+        root, relative, target = resolved
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, target.is_dir):
+            url = f"http://{FileShareHandler.local_ip}:{self.port}/"
+            query = ex.path.partition('?')[2]
+            try:
+                # Scanning a large directory blocks, keep it off the event loop
+                body = await loop.run_in_executor(
+                    None, FileShareHandler.render_browse_page, root, relative, query, url
+                )
+            except (OSError, ValueError):
+                await self._send_simple(ex, 404, "Not Found")
+                return True
+            return await self._send_cached(ex, {'identity': body}, 'text/html; charset=utf-8', encoding)
+
+        shared = await loop.run_in_executor(None, SharedFile.from_path, str(target))
+        if not shared:
+            await self._send_simple(ex, 404, "File not found")
+            return True
+        # The URL names a path rather than a version, so clients have to revalidate
+        return await self._send_file(ex, shared, 'no-cache')
+
+    async def _send_file(self, ex: '_Exchange', shared: SharedFile, cache_control: str) -> bool:
+        etag = f'"{shared.token}"'
+        if etag in ex.headers.get('if-none-match', ''):
+            await self._write_head(ex, 304, {'ETag': etag, 'Cache-Control': cache_control})
+            return True
+
+        file_path = shared.path
+        mime_type, _ = mimetypes.guess_type(str(file_path))
+        file_size = shared.size
+
+        await self._write_head(ex, 200, {
+            'Content-Type': mime_type or 'application/octet-stream',
+            'Content-Length': str(file_size),
+            'Content-Disposition': content_disposition(file_path.name),
+            'ETag': etag,
+            'Cache-Control': cache_control,
+        })
+        if ex.method == 'HEAD':
+            return True
+
+        if FileShareHandler.on_download:
+            FileShareHandler.on_download(file_path.name, ex.client_ip)
+
+        loop = asyncio.get_running_loop()
+        FileShareHandler.metrics.download_started(file_path.name)
+        try:
+            with open(file_path, 'rb') as f:
+                while ex.body_sent < file_size:
+                    # A file that grew since it was shared is cut at the announced Content-Length
+                    size = min(SHAPING_CHUNK_SIZE * 4, file_size - ex.body_sent)
+                    chunk = await loop.run_in_executor(None, f.read, size)
+                    if not chunk:
+                        break
+                    await self._write_shaped(ex, chunk)
+        finally:
+            FileShareHandler.metrics.download_finished(file_path.name, ex.body_sent, ex.body_sent == file_size)
+
+        # A file that shrank mid-transfer leaves the framing broken, so drop the connection
+        return ex.body_sent == file_size
+
+    async def _send_zip(self, ex: '_Exchange') -> bool:
+        files = [Path(f) for f in FileShareHandler.shared_files]
+        files = [p for p in files if p.is_file()]
+        if not files:
+            await self._send_simple(ex, 404, "File not found")
+            return True
+        if self._zip_downloads >= MAX_ZIP_DOWNLOADS:
+            await self._send_simple(ex, 503, "Too many archive downloads, try again later")
+            return True
+
+        # HTTP/1.0 has no chunked encoding, the body ends when the connection closes
+        chunked = ex.version == 'HTTP/1.1'
+        headers = {
+            'Content-Type': 'application/zip',
+            'Content-Disposition': content_disposition("CLARA Share.zip"),
+        }
+        if chunked:
+            headers['Transfer-Encoding'] = 'chunked'
+        else:
+            ex.keep_alive = False
+        await self._write_head(ex, 200, headers)
+        if ex.method == 'HEAD':
+            return chunked
+
+        loop = asyncio.get_running_loop()
+        out = _QueueWriter(loop)
+
+        on_file = None
+        if FileShareHandler.on_download:
+            callback = FileShareHandler.on_download
+            client_ip = ex.client_ip
+            on_file = lambda arcname: callback(arcname, client_ip)
+
+        def produce():
+            # zipfile is synchronous, so the archive is built on a worker thread
+            try:
+                target = ChunkedWriter(out) if chunked else out
+                write_zip_archive(files, target, on_file)
+                if chunked:
+                    target.close()
+                return True
+            except ConnectionError:
+                return False
+            except Exception as e:
+                print(f"Error streaming zip archive: {e}")
+                return False
+            finally:
+                out.close()
+
+        FileShareHandler.metrics.download_started(ZIP_DOWNLOAD_NAME)
+        completed = False
+        self._zip_downloads += 1
+        producer = loop.run_in_executor(self._zip_executor, produce)
+        try:
+            while True:
+                data = await out.get()
+                if data is None:
+                    break
+                await self._write_shaped(ex, data)
+            completed = await producer
+        finally:
+            out.aborted.set()
+            self._zip_downloads -= 1
+            FileShareHandler.metrics.download_finished(ZIP_DOWNLOAD_NAME, ex.body_sent, completed)
+        return completed and chunked
+
+
+class _Exchange:
+    """One request on a connection and the state of its response."""
+
+    def __init__(self, writer: asyncio.StreamWriter, client_ip: str, method: Optional[str],
+                 path: str, version: str, headers: Dict[str, str]):
+        self.writer = writer
+        self.client_ip = client_ip
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers
+        self.keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        self.started = time.monotonic()
+        self.body_sent = 0
@@ -0,0 +1,183 @@
+import configparser
+import os
+from typing import Dict, List, Optional, Tuple
+
+# Preferred first when a directory holds the same icon in several formats
+ICON_EXTENSIONS = ('.png', '.svg', '.xpm')
+FALLBACK_THEME = 'hicolor'
+
+
+class ThemeDirectory:
+    def __init__(self, section: Dict[str, str]):
+        self.size = int(section.get('Size', '0'))
+        self.scale = int(section.get('Scale', '1'))
+        self.type = section.get('Type', 'Threshold')
+        self.min_size = int(section.get('MinSize', self.size))
+        self.max_size = int(section.get('MaxSize', self.size))
+        self.threshold = int(section.get('Threshold', '2'))
+
+    def matches(self, size: int, scale: int) -> bool:
+        if self.scale != scale:
+            return False
+        if self.type == 'Fixed':
+            return self.size == size
+        if self.type == 'Scalable':
+            return self.min_size <= size <= self.max_size
+        return self.size - self.threshold <= size <= self.size + self.threshold
+
+    def distance(self, size: int, scale: int) -> int:
+        wanted = size * scale
+        if self.type == 'Fixed':
+            return abs(self.size * self.scale - wanted)
+        if self.type == 'Scalable':
+            low, high = self.min_size, self.max_size
+        else:
+            low, high = self.size - self.threshold, self.size + self.threshold
+        if wanted < low * self.scale:
+            return low * self.scale - wanted
+        if wanted > high * self.scale:
+            return wanted - high * self.scale
+        return 0
+
+
+class IconTheme:
+    """One icon theme with every icon file it has, listed once up front.
+
+    The freedesktop lookup would stat a candidate in each size directory
+    for every icon, which is what makes cold-cache lookups slow; listing
+    the directories once turns each lookup into a dict access.
+    """
+
+    def __init__(self, name: str, search_paths: List[str]):
+        self.name = name
+        self.inherits: List[str] = []
+        self.exists = False
+        # icon name -> [(directory, path)] in theme directory order
+        self._icons: Dict[str, List[Tuple[ThemeDirectory, str]]] = {}
+
+        parser = None
+        for base in search_paths:
+            index_path = os.path.join(base, name, 'index.theme')
+            if not os.path.isfile(index_path):
+                continue
+            parser = configparser.RawConfigParser(strict=False, interpolation=None)
+            parser.optionxform = str  # type: ignore
+            try:
+                parser.read(index_path, encoding='utf-8')
+            except (configparser.Error, UnicodeDecodeError) as e:
+                print(f"Skipping icon theme '{name}': {e}")
+                parser = None
+            break
+        if parser is None or not parser.has_section('Icon Theme'):
+            return
+
+        self.exists = True
+        header = parser['Icon Theme']
+        self.inherits = [theme.strip() for theme in header.get('Inherits', '').split(',') if theme.strip()]
+        subdirs = [d.strip() for d in header.get('Directories', '').split(',') if d.strip()]
+        subdirs += [d.strip() for d in header.get('ScaledDirectories', '').split(',')
+                    if d.strip() and d.strip() not in subdirs]
+
+        directories = []
+        for subdir in subdirs:
+            if not parser.has_section(subdir):
+                continue
+            try:
+                directories.append((subdir, ThemeDirectory(dict(parser[subdir]))))
+            except ValueError:
+                continue
+
+        # The index comes from the first base path, but every base path can add files to the theme
+        for base in search_paths:
+            theme_dir = os.path.join(base, name)
+            if not os.path.isdir(theme_dir):
+                continue
+            for subdir, directory in directories:
+                self._add_files(os.path.join(theme_dir, subdir), directory)
+
+    def _add_files(self, path: str, directory: ThemeDirectory):
+        try:
+            names = os.listdir(path)
+        except OSError:
+            return
+        found: Dict[str, str] = {}
+        for file_name in names:
+            stem, ext = os.path.splitext(file_name)
+            if ext not in ICON_EXTENSIONS:
+                continue
+            current = found.get(stem)
+            if current is None or ICON_EXTENSIONS.index(ext) < ICON_EXTENSIONS.index(os.path.splitext(current)[1]):
+                found[stem] = file_name
+        for stem, file_name in found.items():
+            self._icons.setdefault(stem, []).append((directory, os.path.join(path, file_name)))
+
+    def lookup(self, name: str, size: int, scale: int = 1) -> Optional[str]:
+        candidates = self._icons.get(name)
+        if not candidates:
+            return None
+        for directory, path in candidates:
+            if directory.matches(size, scale):
+                return path
+        return min(candidates, key=lambda candidate: candidate[0].distance(size, scale))[1]
+
+
+class IconResolver:
+    """Finds the file for an icon name the way the icon theme spec does, caching themes as it goes.
+
+    Absolute paths are taken as they are. Names are looked up in the theme,
+    the themes it inherits from, hicolor and finally the plain pixmap
+    directories. Not thread-safe, meant for a single worker thread.
+    """
+
+    def __init__(self, theme_name: str, search_paths: List[str], pixmap_dirs: List[str]):
+        self.theme_name = theme_name
+        self.search_paths = search_paths
+        self.pixmap_dirs = pixmap_dirs
+        self._themes: Dict[str, IconTheme] = {}
+        self._chain: Optional[List[IconTheme]] = None
+
+    def _theme(self, name: str) -> IconTheme:
+        theme = self._themes.get(name)
+        if theme is None:
+            theme = self._themes[name] = IconTheme(name, self.search_paths)
+        return theme
+
+    def _theme_chain(self) -> List[IconTheme]:
+        if self._chain is None:
+            chain = []
+            pending = [self.theme_name] if self.theme_name else []
+            seen = set()
+            while pending:
+                name = pending.pop(0)
+                if name in seen:
+                    continue
+                seen.add(name)
+                theme = self._theme(name)
+                if theme.exists:
+                    chain.append(theme)
+                    pending.extend(theme.inherits)
+            if FALLBACK_THEME not in seen and self._theme(FALLBACK_THEME).exists:
+                chain.append(self._theme(FALLBACK_THEME))
+            self._chain = chain
+        return self._chain
+
+    def find(self, name: str, size: int, scale: int = 1) -> Optional[str]:
+        if not name:
+            return None
+        if os.path.isabs(name):
+            return name if os.path.isfile(name) else None
+
+        stem, ext = os.path.splitext(name)
+        # Some entries name the file ("foo.png") rather than the icon
+        if ext not in ICON_EXTENSIONS:
+            stem = name
+        for theme in self._theme_chain():
+            path = theme.lookup(stem, size, scale)
+            if path:
+                return path
+        for directory in self.pixmap_dirs:
+            for extension in ICON_EXTENSIONS:
+                path = os.path.join(directory, stem + extension)
+                if os.path.isfile(path):
+                    return path
+        return None
@@ -0,0 +1,165 @@
+import configparser
+import mimetypes
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_APPLICATIONS = 'Default Applications'
+ADDED_ASSOCIATIONS = 'Added Associations'
+REMOVED_ASSOCIATIONS = 'Removed Associations'
+# Every text type can be opened as plain text, whatever shared-mime-info says
+TEXT_PLAIN = 'text/plain'
+
+
+def guess_mime_type(path: str) -> str:
+    if os.path.isdir(path):
+        return 'inode/directory'
+    return mimetypes.guess_type(path, strict=False)[0] or 'application/octet-stream'
+
+
+def get_mimeapps_paths(data_dirs: Sequence[Path]) -> List[Path]:
+    """The mimeapps.list files that apply, most important first, as the XDG spec orders them."""
+    config_home = Path(os.environ.get('XDG_CONFIG_HOME') or Path.home() / '.config')
+    config_dirs = [Path(d) for d in os.environ.get('XDG_CONFIG_DIRS', '/etc/xdg').split(':') if d]
+    desktops = [d.lower() for d in os.environ.get('XDG_CURRENT_DESKTOP', '').split(':') if d]
+
+    paths = []
+    for directory in [config_home] + config_dirs + [d / 'applications' for d in data_dirs]:
+        paths.extend(directory / f'{desktop}-mimeapps.list' for desktop in desktops)
+        paths.append(directory / 'mimeapps.list')
+    return paths
+
+
+def _read_list(path: Path) -> Optional[configparser.RawConfigParser]:
+    parser = configparser.RawConfigParser(strict=False, interpolation=None, delimiters=('=',))
+    parser.optionxform = str  # type: ignore
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            parser.read_file(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, configparser.Error, UnicodeDecodeError) as e:
+        print(f"Skipping {path}: {e}")
+        return None
+    return parser
+
+
+def _ids(value: str) -> List[str]:
+    return [desktop_id.strip() for desktop_id in value.split(';') if desktop_id.strip()]
+
+
+class MimeAppIndex:
+    """Which apps can open which MIME types, built once from an app list and the mimeapps.list files.
+
+    Candidates come in the order a file manager offers them: the default
+    app, apps the user added, then every app whose entry lists the type,
+    and after those the apps for its parent types (text/x-python falls
+    back to text/plain editors). Removed associations are left out. The
+    index only stats its source files to notice it is stale.
+    """
+
+    def __init__(self, apps: list, mimeapps_paths: Sequence[Path], data_dirs: Sequence[Path]):
+        self.apps = apps
+        self._sources: Dict[Path, Optional[int]] = {}
+        self._by_id = {app.desktop_id: app for app in apps if app.desktop_id}
+        self._declared: Dict[str, list] = {}
+        for app in apps:
+            for mime_type in app.mime_types:
+                self._declared.setdefault(mime_type, []).append(app)
+
+        self._defaults: Dict[str, List[str]] = {}
+        self._added: Dict[str, List[str]] = {}
+        # A removal hides the association from every less important file and from the desktop entries
+        self._removed: Dict[str, set] = {}
+        for path in mimeapps_paths:
+            self._sources[path] = self._mtime(path)
+            parser = _read_list(path)
+            if parser is None:
+                continue
+            removed_here = {}
+            if parser.has_section(REMOVED_ASSOCIATIONS):
+                for mime_type, value in parser.items(REMOVED_ASSOCIATIONS):
+                    removed_here[mime_type] = set(_ids(value))
+            if parser.has_section(ADDED_ASSOCIATIONS):
+                for mime_type, value in parser.items(ADDED_ASSOCIATIONS):
+                    removed = self._removed.get(mime_type, set())
+                    added = self._added.setdefault(mime_type, [])
+                    added.extend(d for d in _ids(value) if d not in removed and d not in added)
+            if parser.has_section(DEFAULT_APPLICATIONS):
+                for mime_type, value in parser.items(DEFAULT_APPLICATIONS):
+                    defaults = self._defaults.setdefault(mime_type, [])
+                    defaults.extend(d for d in _ids(value) if d not in defaults)
+            for mime_type, ids in removed_here.items():
+                self._removed.setdefault(mime_type, set()).update(ids)
+
+        self._parents: Dict[str, List[str]] = {}
+        for data_dir in data_dirs:
+            subclasses = data_dir / 'mime' / 'subclasses'
+            self._sources[subclasses] = self._mtime(subclasses)
+            try:
+                with open(subclasses, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        parts = line.split()
+                        if len(parts) == 2:
+                            parents = self._parents.setdefault(parts[0], [])
+                            if parts[1] not in parents:
+                                parents.append(parts[1])
+            except (OSError, UnicodeDecodeError):
+                continue
+
+        self._cache: Dict[str, list] = {}
+
+    @staticmethod
+    def _mtime(path: Path) -> Optional[int]:
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def is_current(self, apps: list) -> bool:
+        return apps is self.apps and all(self._mtime(path) == mtime for path, mtime in self._sources.items())
+
+    def _direct(self, mime_type: str) -> list:
+        removed = self._removed.get(mime_type, set())
+        found = []
+        seen = set()
+
+        def add(app):
+            if app is not None and id(app) not in seen and app.desktop_id not in removed:
+                seen.add(id(app))
+                found.append(app)
+
+        # Only the first default that is actually installed counts
+        default = next((self._by_id[d] for d in self._defaults.get(mime_type, ()) if d in self._by_id), None)
+        add(default)
+        for desktop_id in self._added.get(mime_type, ()):
+            add(self._by_id.get(desktop_id))
+        for app in self._declared.get(mime_type, ()):
+            add(app)
+        return found
+
+    def apps_for(self, mime_type: str) -> list:
+        """The apps that can open mime_type, best first."""
+        cached = self._cache.get(mime_type)
+        if cached is not None:
+            return cached
+
+        found = []
+        seen = set()
+        pending = [mime_type]
+        visited = set()
+        while pending:
+            current = pending.pop(0)
+            if current in visited:
+                continue
+            visited.add(current)
+            for app in self._direct(current):
+                if id(app) not in seen:
+                    seen.add(id(app))
+                    found.append(app)
+            pending.extend(self._parents.get(current, ()))
+            if current.startswith('text/') and current != TEXT_PLAIN:
+                pending.append(TEXT_PLAIN)
+
+        self._cache[mime_type] = found
+        return found
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+LISTING_PAGE_SIZE = 200
+# Directories whose listings stay in memory, least recently browsed are dropped first
+LISTING_CACHE_SIZE = 32
+SORT_KEYS = ('name', 'size', 'mtime')
+
+
+class ListingEntry:
+    def __init__(self, name: str, is_dir: bool, size: int, mtime: float):
+        self.name = name
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+
+
+class DirectoryListing:
+    """The names in one directory as of a given mtime, with sort orders built on demand.
+
+    Scanning only reads names and entry types, so sorting by name never
+    stats anything; sizes and times are fetched for the whole directory
+    once, the first time someone sorts by them.
+    """
+
+    def __init__(self, path: str, mtime_ns: int):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self._lock = threading.Lock()
+        self._stats: Optional[List[Tuple[int, float]]] = None
+        self._orders: Dict[Tuple[str, bool], List[int]] = {}
+
+        names = []
+        dir_flags = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                names.append(entry.name)
+                dir_flags.append(is_dir)
+        self.names = names
+        self.dir_flags = dir_flags
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _stat(self, name: str) -> Tuple[int, float]:
+        try:
+            st = os.stat(os.path.join(self.path, name))
+        except OSError:
+            return 0, 0.0
+        return st.st_size, st.st_mtime
+
+    def _all_stats(self) -> List[Tuple[int, float]]:
+        if self._stats is None:
+            self._stats = [self._stat(name) for name in self.names]
+        return self._stats
+
+    def _order(self, sort: str, reverse: bool) -> List[int]:
+        key = (sort, reverse)
+        with self._lock:
+            order = self._orders.get(key)
+            if order is not None:
+                return order
+
+            names = self.names
+            if sort == 'name':
+                values = [name.casefold() for name in names]
+            else:
+                column = 0 if sort == 'size' else 1
+                values = [stat[column] for stat in self._all_stats()]
+
+            order = sorted(range(len(names)), key=values.__getitem__, reverse=reverse)
+            # Folders always come first, whichever way the rest is sorted
+            dir_flags = self.dir_flags
+            order = [i for i in order if dir_flags[i]] + [i for i in order if not dir_flags[i]]
+            self._orders[key] = order
+            return order
+
+    def page(self, page: int, sort: str = 'name', reverse: bool = False,
+             page_size: int = LISTING_PAGE_SIZE) -> Tuple[List[ListingEntry], int]:
+        """Return the entries on a 0-based page and the total page count."""
+        order = self._order(sort, reverse)
+        pages = max(1, -(-len(order) // page_size))
+        page = min(max(page, 0), pages - 1)
+
+        entries = []
+        for i in order[page * page_size:(page + 1) * page_size]:
+            # Only the visible rows are statted, so sizes are current even though names are cached
+            size, mtime = self._stat(self.names[i])
+            entries.append(ListingEntry(self.names[i], self.dir_flags[i], size, mtime))
+        return entries, pages
+
+
+class ListingCache:
+    """Listings keyed by directory path, reused until the directory's mtime moves."""
+
+    def __init__(self, max_size: int = LISTING_CACHE_SIZE):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._listings: 'OrderedDict[str, DirectoryListing]' = OrderedDict()
+
+    def get(self, path: str) -> DirectoryListing:
+        mtime_ns = os.stat(path).st_mtime_ns
+        with self._lock:
+            listing = self._listings.get(path)
+            if listing is not None and listing.mtime_ns == mtime_ns:
+                self._listings.move_to_end(path)
+                return listing
+
+        # The mtime is taken before scanning, so a change during the scan triggers a rescan next time
+        listing = DirectoryListing(path, mtime_ns)
+        with self._lock:
+            self._listings[path] = listing
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.max_size:
+                self._listings.popitem(last=False)
+        return listing
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+
+
+def parse_listing_query(query: Dict[str, List[str]]) -> Tuple[int, str, bool]:
+    """Read page (1-based in URLs), sort and order from parsed query parameters."""
+    try:
+        page = int(query.get('page', ['1'])[0]) - 1
+    except ValueError:
+        page = 0
+    sort = query.get('sort', ['name'])[0]
+    if sort not in SORT_KEYS:
+        sort = 'name'
+    reverse = query.get('order', ['asc'])[0] == 'desc'
+    return page, sort, reverse
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+# Upper bounds (seconds) of the time-to-first-byte histogram buckets
+TTFB_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+KNOWN_API_ENDPOINTS = ('/api/data', '/api/metrics')
+# Browsed trees make any file downloadable, past this many names the rest share one entry
+MAX_TRACKED_DOWNLOADS = 200
+OTHER_DOWNLOADS = "(other)"
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.total += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        result = []
+        running = 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            result.append((repr(bound), running))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class ShareMetrics:
+    """Counters and histograms for the HTTP share, safe to update from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.requests: Dict[Tuple[str, int], int] = defaultdict(int)
+            self.bytes_sent = 0
+            self.active_downloads = 0
+            # file name -> [started, completed, bytes sent]
+            self.downloads: Dict[str, List[int]] = defaultdict(lambda: [0, 0, 0])
+            self.ttfb = Histogram(TTFB_BUCKETS)
+
+    def record_request(self, endpoint: str, status: int):
+        with self._lock:
+            self.requests[(endpoint, status)] += 1
+
+    def record_ttfb(self, seconds: float):
+        with self._lock:
+            self.ttfb.observe(seconds)
+
+    def add_bytes_sent(self, count: int):
+        with self._lock:
+            self.bytes_sent += count
+
+    def _download_entry(self, name: str) -> List[int]:
+        if name not in self.downloads and len(self.downloads) >= MAX_TRACKED_DOWNLOADS:
+            name = OTHER_DOWNLOADS
+        return self.downloads[name]
+
+    def download_started(self, name: str):
+        with self._lock:
+            self.active_downloads += 1
+            self._download_entry(name)[0] += 1
+
+    def download_finished(self, name: str, sent: int, completed: bool):
+        with self._lock:
+            self.active_downloads -= 1
+            entry = self._download_entry(name)
+            entry[2] += sent
+            if completed:
+                entry[1] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            requests_total: Dict[str, Dict[str, int]] = defaultdict(dict)
+            for (endpoint, status), count in self.requests.items():
+                requests_total[endpoint][str(status)] = count
+
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 3),
+                "requests_total": dict(requests_total),
+                "bytes_sent_total": self.bytes_sent,
+                "active_downloads": self.active_downloads,
+                "downloads": {
+                    name: {
+                        "started": started,
+                        "completed": completed,
+                        "bytes_sent": sent,
+                        "completion_ratio": round(completed / started, 4) if started else 0.0,
+                    }
+                    for name, (started, completed, sent) in self.downloads.items()
+                },
+                "time_to_first_byte_seconds": {
+                    "buckets": dict(self.ttfb.cumulative()),
+                    "sum": round(self.ttfb.total, 6),
+                    "count": self.ttfb.count,
+                },
+            }
+
+    def to_prometheus(self) -> str:
+        data = self.snapshot()
+        lines = [
+            "# HELP clara_share_requests_total HTTP requests handled by the share.",
+            "# TYPE clara_share_requests_total counter",
+        ]
+        for endpoint, statuses in sorted(data["requests_total"].items()):
+            for status, count in sorted(statuses.items()):
+                lines.append(f'clara_share_requests_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {count}')
+
+        lines += [
+            "# HELP clara_share_bytes_sent_total Bytes written to clients, headers included.",
+            "# TYPE clara_share_bytes_sent_total counter",
+            f"clara_share_bytes_sent_total {data['bytes_sent_total']}",
+            "# HELP clara_share_active_downloads Downloads currently in progress.",
+            "# TYPE clara_share_active_downloads gauge",
+            f"clara_share_active_downloads {data['active_downloads']}",
+        ]
+
+        for metric, key, kind, help_text in (
+            ("clara_share_downloads_started_total", "started", "counter", "Downloads started per file."),
+            ("clara_share_downloads_completed_total", "completed", "counter", "Downloads finished per file."),
+            ("clara_share_download_bytes_sent_total", "bytes_sent", "counter", "Body bytes sent per file."),
+            ("clara_share_download_completion_ratio", "completion_ratio", "gauge", "Completed / started downloads per file."),
+        ):
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for name, stats in sorted(data["downloads"].items()):
+                lines.append(f'{metric}{{file="{_escape(name)}"}} {stats[key]}')
+
+        ttfb = data["time_to_first_byte_seconds"]
+        lines += [
+            "# HELP clara_share_time_to_first_byte_seconds Time from parsed request to the first response byte.",
+            "# TYPE clara_share_time_to_first_byte_seconds histogram",
+        ]
+        for bound, count in ttfb["buckets"].items():
+            lines.append(f'clara_share_time_to_first_byte_seconds_bucket{{le="{bound}"}} {count}')
+        lines.append(f"clara_share_time_to_first_byte_seconds_sum {ttfb['sum']}")
+        lines.append(f"clara_share_time_to_first_byte_seconds_count {ttfb['count']}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def endpoint_name(path: str) -> str:
+    """Collapse a request path into a low-cardinality label."""
+    path = path.split('?', 1)[0]
+    if path == '/':
+        return "index"
+    if path == '/download/all.zip':
+        return "download_all"
+    if path.startswith('/download/'):
+        return "download"
+    if path.startswith('/browse/'):
+        return "browse"
+    if path in KNOWN_API_ENDPOINTS:
+        return path[len('/api/'):]
+    if path == '/upload':
+        return "upload"
+    if path == '/text':
+        return "text"
+    return "other"
@@ -0,0 +1,291 @@
+import ntpath
+import os
+import re
+import struct
+import sys
+from pathlib import Path
+from typing import Tuple
+
+# Reader for Windows shortcut (.lnk) files, following the MS-SHLLINK specification.
+# Only what the launcher needs is decoded: the target, arguments, icon and description.
+
+# ShellLinkHeader: size, CLSID, flags, attributes, three FILETIMEs, file size, icon index,
+# show command, hotkey and three reserved fields
+_HEADER = struct.Struct('<I16sIIQQQIiIHHII')
+_HEADER_SIZE = 0x4C
+# 00021401-0000-0000-C000-000000000046 as stored on disk
+_LINK_CLSID = bytes.fromhex('0114020000000000c000000000000046')
+
+# LinkFlags
+HAS_LINK_TARGET_ID_LIST = 0x00000001
+HAS_LINK_INFO = 0x00000002
+HAS_NAME = 0x00000004
+HAS_RELATIVE_PATH = 0x00000008
+HAS_WORKING_DIR = 0x00000010
+HAS_ARGUMENTS = 0x00000020
+HAS_ICON_LOCATION = 0x00000040
+IS_UNICODE = 0x00000080
+FORCE_NO_LINK_INFO = 0x00000100
+HAS_EXP_STRING = 0x00000200
+HAS_DARWIN_ID = 0x00001000
+HAS_EXP_ICON = 0x00004000
+
+# LinkInfoFlags
+VOLUME_ID_AND_LOCAL_BASE_PATH = 0x1
+COMMON_NETWORK_RELATIVE_LINK_AND_PATH_SUFFIX = 0x2
+
+# Shell item types in a LinkTargetIDList
+_ITEM_ROOT_FOLDER = 0x1F
+_ITEM_VOLUME = 0x20
+_ITEM_FILE_ENTRY = 0x30
+_ITEM_UNICODE_NAME = 0x04
+# 20D04FE0-3AEA-1069-A2D8-08002B30309D, "This PC", as stored on disk
+_MY_COMPUTER_CLSID = bytes.fromhex('e04fd020ea3a6910a2d808002b30309d')
+_FILE_ENTRY_EXTENSION = 0xBEEF0004
+
+# ExtraData block signatures
+ENVIRONMENT_VARIABLE_DATA_BLOCK = 0xA0000001
+DARWIN_DATA_BLOCK = 0xA0000006
+ICON_ENVIRONMENT_DATA_BLOCK = 0xA0000007
+
+# StringData fields, in the order they are stored
+_STRING_FIELDS = (
+    (HAS_NAME, 'description'),
+    (HAS_RELATIVE_PATH, 'relative_path'),
+    (HAS_WORKING_DIR, 'working_dir'),
+    (HAS_ARGUMENTS, 'arguments'),
+    (HAS_ICON_LOCATION, 'icon_location'),
+)
+
+# Non-Unicode strings are in the system code page of whoever made the link
+ANSI_ENCODING = 'mbcs' if sys.platform == 'win32' else 'cp1252'
+_ENV_VAR_RE = re.compile(r'%([^%]+)%')
+
+
+class ShellLink:
+    def __init__(self):
+        self.target = ""
+        self.arguments = ""
+        self.working_dir = ""
+        self.relative_path = ""
+        self.description = ""
+        self.icon_location = ""
+        self.icon_index = 0
+        # Installer-advertised shortcuts (MSI) point at a product code, not a file
+        self.advertised = False
+
+
+def expand_environment(value: str) -> str:
+    """Expand %NAME% references, leaving unknown ones as they are."""
+    return _ENV_VAR_RE.sub(lambda m: os.environ.get(m.group(1), m.group(0)), value)
+
+
+def _u16(data: bytes, offset: int) -> int:
+    if offset + 2 > len(data):
+        raise ValueError("truncated shell link")
+    return struct.unpack_from('<H', data, offset)[0]
+
+
+def _u32(data: bytes, offset: int) -> int:
+    if offset + 4 > len(data):
+        raise ValueError("truncated shell link")
+    return struct.unpack_from('<I', data, offset)[0]
+
+
+def _ansi_z(data: bytes, offset: int) -> str:
+    end = data.find(b'\0', offset)
+    if end < 0:
+        raise ValueError("unterminated string in shell link")
+    return data[offset:end].decode(ANSI_ENCODING, errors='replace')
+
+
+def _unicode_z(data: bytes, offset: int) -> str:
+    for end in range(offset, len(data) - 1, 2):
+        if data[end] == 0 and data[end + 1] == 0:
+            return data[offset:end].decode('utf-16-le', errors='replace')
+    raise ValueError("unterminated string in shell link")
+
+
+def _link_info_path(data: bytes, start: int) -> str:
+    """The target path held in a LinkInfo structure starting at `start`, or "" if it has none."""
+    header_size = _u32(data, start + 4)
+    info_flags = _u32(data, start + 8)
+    local_offset = _u32(data, start + 16)
+    network_offset = _u32(data, start + 20)
+    suffix_offset = _u32(data, start + 24)
+    # Unicode copies only exist in headers of 0x24 bytes or more
+    local_offset_unicode = _u32(data, start + 28) if header_size >= 0x24 else 0
+    suffix_offset_unicode = _u32(data, start + 32) if header_size >= 0x24 else 0
+
+    if suffix_offset_unicode:
+        suffix = _unicode_z(data, start + suffix_offset_unicode)
+    elif suffix_offset:
+        suffix = _ansi_z(data, start + suffix_offset)
+    else:
+        suffix = ""
+
+    if info_flags & VOLUME_ID_AND_LOCAL_BASE_PATH:
+        if local_offset_unicode:
+            return _unicode_z(data, start + local_offset_unicode) + suffix
+        return _ansi_z(data, start + local_offset) + suffix
+
+    if info_flags & COMMON_NETWORK_RELATIVE_LINK_AND_PATH_SUFFIX:
+        link = start + network_offset
+        net_name_offset = _u32(data, link + 8)
+        if net_name_offset > 0x14:
+            net_name = _unicode_z(data, link + _u32(data, link + 20))
+        else:
+            net_name = _ansi_z(data, link + net_name_offset)
+        if suffix and not net_name.endswith('\\'):
+            return net_name + '\\' + suffix
+        return net_name + suffix
+    return ""
+
+
+def _file_entry_name(item: bytes, kind: int) -> str:
+    """The long name of a file entry shell item, or its primary (often 8.3) name if it has none."""
+    # size, type, unknown, file size, modification time and attributes come first
+    pos = 14
+    if kind & _ITEM_UNICODE_NAME:
+        name = _unicode_z(item, pos)
+        pos += (len(name) + 1) * 2
+    else:
+        name = _ansi_z(item, pos)
+        pos += len(name.encode(ANSI_ENCODING, errors='replace')) + 1
+        pos += pos % 2
+
+    if pos + 8 <= len(item) and _u32(item, pos + 4) == _FILE_ENTRY_EXTENSION:
+        version = _u16(item, pos + 2)
+        if version >= 3:
+            # Fixed fields grow with the extension version, the long name follows them
+            long_pos = pos + 20
+            if version >= 7:
+                long_pos += 18
+            if version >= 8:
+                long_pos += 4
+            if version >= 9:
+                long_pos += 4
+            long_name = _unicode_z(item, long_pos)
+            if long_name:
+                return long_name
+    return name
+
+
+def _id_list_path(data: bytes, offset: int, end: int) -> str:
+    """The file system path spelled out by a LinkTargetIDList, or "" for anything else."""
+    parts = []
+    while offset + 2 <= end:
+        size = _u16(data, offset)
+        if size == 0:
+            break
+        item = data[offset:offset + size]
+        offset += size
+        if len(item) < 3:
+            return ""
+        kind = item[2]
+        if kind == _ITEM_ROOT_FOLDER:
+            if item[4:20] != _MY_COMPUTER_CLSID:
+                return ""
+        elif kind & 0x70 == _ITEM_VOLUME:
+            parts.append(item[3:].split(b'\0', 1)[0].decode('ascii', errors='replace'))
+        elif kind & 0x70 == _ITEM_FILE_ENTRY:
+            parts.append(_file_entry_name(item, kind))
+        else:
+            # Control panel items, shell namespaces and the like have no path
+            return ""
+    return ntpath.join(*parts) if parts else ""
+
+
+def _string_data(data: bytes, offset: int, unicode: bool) -> Tuple[str, int]:
+    count = _u16(data, offset)
+    offset += 2
+    size = count * 2 if unicode else count
+    if offset + size > len(data):
+        raise ValueError("truncated shell link")
+    raw = data[offset:offset + size]
+    value = raw.decode('utf-16-le', errors='replace') if unicode else raw.decode(ANSI_ENCODING, errors='replace')
+    return value, offset + size
+
+
+def _block_target(data: bytes, offset: int) -> str:
+    """The path in an environment-style data block, preferring its Unicode copy."""
+    unicode_raw = data[offset + 268:offset + 788]
+    end = next((i for i in range(0, len(unicode_raw) - 1, 2) if unicode_raw[i:i + 2] == b'\0\0'), len(unicode_raw))
+    value = unicode_raw[:end].decode('utf-16-le', errors='replace')
+    if value:
+        return value
+    ansi_raw = data[offset + 8:offset + 268]
+    return ansi_raw.split(b'\0', 1)[0].decode(ANSI_ENCODING, errors='replace')
+
+
+def parse_shell_link(data: bytes) -> ShellLink:
+    """Decode the bytes of a .lnk file, raising ValueError if they aren't a shell link.
+
+    Environment variables are expanded in the target and icon location the
+    way the shell does it. A relative target is left in relative_path for
+    the caller to resolve against the link's own directory.
+    """
+    if len(data) < _HEADER.size:
+        raise ValueError("truncated shell link")
+    header = _HEADER.unpack_from(data)
+    header_size, clsid, flags = header[0], header[1], header[2]
+    if header_size != _HEADER_SIZE or clsid != _LINK_CLSID:
+        raise ValueError("not a shell link")
+
+    link = ShellLink()
+    link.icon_index = header[8]
+    offset = _HEADER.size
+
+    id_list_path = ""
+    if flags & HAS_LINK_TARGET_ID_LIST:
+        id_list_size = _u16(data, offset)
+        try:
+            id_list_path = _id_list_path(data, offset + 2, offset + 2 + id_list_size)
+        except ValueError:
+            # Only a fallback for links without LinkInfo, so an odd item isn't fatal
+            id_list_path = ""
+        offset += 2 + id_list_size
+
+    target = ""
+    if flags & HAS_LINK_INFO:
+        info_size = _u32(data, offset)
+        if not flags & FORCE_NO_LINK_INFO:
+            target = _link_info_path(data, offset)
+        offset += info_size
+
+    unicode = bool(flags & IS_UNICODE)
+    for flag, field in _STRING_FIELDS:
+        if flags & flag:
+            value, offset = _string_data(data, offset, unicode)
+            setattr(link, field, value)
+
+    env_target = ""
+    env_icon = ""
+    while offset + 8 <= len(data):
+        block_size = _u32(data, offset)
+        if block_size < 8 or offset + block_size > len(data):
+            # The terminal block is a lone zero; anything else short is damage we can stop at
+            break
+        signature = _u32(data, offset + 4)
+        if signature == ENVIRONMENT_VARIABLE_DATA_BLOCK and flags & HAS_EXP_STRING:
+            env_target = _block_target(data, offset)
+        elif signature == ICON_ENVIRONMENT_DATA_BLOCK and flags & HAS_EXP_ICON:
+            env_icon = _block_target(data, offset)
+        elif signature == DARWIN_DATA_BLOCK:
+            link.advertised = True
+        offset += block_size
+
+    if flags & HAS_DARWIN_ID:
+        link.advertised = True
+    link.target = expand_environment(env_target or target or id_list_path)
+    link.icon_location = expand_environment(env_icon or link.icon_location)
+    return link
+
+
+def read_shell_link(file_path: Path) -> ShellLink:
+    """Read and decode a .lnk file; needs no COM, so it is safe on any thread and any OS."""
+    with open(file_path, 'rb') as f:
+        link = parse_shell_link(f.read())
+    if not link.target and link.relative_path:
+        link.target = os.path.normpath(os.path.join(os.path.dirname(file_path), link.relative_path))
+    return link
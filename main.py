@@ -7,19 +7,24 @@ from pathlib import Path
 from PySide6 import QtWidgets
 
 from core.app_launcher import list_apps
+from core.app_watcher import AppWatcher
 from core.config import config
 from core.discord_presence import presence
 from core.dukto import DuktoProtocol
+from core.file_index import get_file_index
+from core.file_watcher import FileIndexWatcher
 from core.updater import is_update_available, update_repository
 from windows.main_window import MainWindow
 
 STRINGS_PATH = Path(__file__).parent / "strings" / "personality_en.json"
 
 
-def preload_apps():
+def preload_apps(app_watcher: AppWatcher):
     print("Preloading application list...")
     list_apps()
     print("Application list preloaded.")
+    # Keep the list current from here on, installs and removals show up without a reload
+    app_watcher.start()
 
 
 def main():
@@ -51,8 +56,12 @@ def main():
             update_repository()
 
     # Start preloading apps in the background
-    preload_thread = threading.Thread(target=preload_apps, daemon=True)
+    app_watcher = AppWatcher()
+    preload_thread = threading.Thread(target=preload_apps, args=(app_watcher,), daemon=True)
     preload_thread.start()
+    # File searches start in the home folder, keep its index current from here on
+    file_watcher = FileIndexWatcher(get_file_index("~"))
+    file_watcher.start()
 
     dukto_handler = DuktoProtocol()
     dukto_handler.set_ports(
@@ -67,6 +76,8 @@ def main():
         restart=restart,
         no_quit=no_quit,
     )
+    # on_change runs on the watcher thread, the signal takes it to an open launcher on the GUI thread
+    app_watcher.on_change = pet.apps_changed_signal.emit
 
     if config.get("discord_presence", True):
         presence.start()
@@ -78,6 +89,8 @@ def main():
 
     app.aboutToQuit.connect(presence.end)
     app.aboutToQuit.connect(dukto_handler.shutdown)
+    app.aboutToQuit.connect(app_watcher.stop)
+    app.aboutToQuit.connect(file_watcher.stop)
     sys.exit(app.exec())
 
 
@@ -0,0 +1,101 @@
+"""Regenerate the .lnk fixtures next to this script; needs pylnk3, the tests themselves don't."""
+import struct
+from pathlib import Path
+
+import pylnk3
+
+HERE = Path(__file__).parent
+DARWIN_DATA_BLOCK = 0xA0000006
+# An MSI descriptor: product code, feature name and component code, packed the way Windows Installer stores them
+DARWIN_DESCRIPTOR = "w_1^VX!!!!!!!!!MKKSkEXCELFiles>tW{~$4Q]c@II=l2xaTO5Z"
+
+
+def new_link(name: str):
+    link = pylnk3.create(str(HERE / name))
+    link.link_flags.IsUnicode = True
+    return link
+
+
+def id_list_only():
+    # for_file only writes a LinkTargetIDList, with no LinkInfo
+    pylnk3.for_file(r"C:\Program Files\Mozilla Firefox\firefox.exe", str(HERE / "id_list_only.lnk"),
+                    arguments="-P default", description="Browse the Wéb",
+                    icon_file=r"C:\Program Files\Mozilla Firefox\firefox.exe", icon_index=2)
+
+
+def link_info_local():
+    link = new_link("link_info_local.lnk")
+    info = pylnk3.LinkInfo()
+    info.local = 1
+    info.local_base_path = r"C:\Windows\notepad.exe"
+    info.volume_label = ""
+    info.drive_serial = 1
+    info.drive_type = 'Fixed (Hard disk)'
+    link.link_info = info
+    link.arguments = "notes.txt"
+    link.icon = r"C:\Windows\notepad.exe"
+    link.save()
+
+
+def network():
+    link = new_link("network.lnk")
+    info = pylnk3.LinkInfo()
+    info.remote = 1
+    info.network_share_name = r"\\server\share"
+    info.base_name = r"apps\tool.exe"
+    link.link_info = info
+    link.arguments = "--verbose"
+    link.save()
+
+    # pylnk3 sizes the CommonNetworkRelativeLink as if it held the suffix too, which leaves
+    # CommonPathSuffixOffset past the end of the suffix; put both where Windows would
+    path = HERE / "network.lnk"
+    data = bytearray(path.read_bytes())
+    start = 0x4C
+    network_size = 20 + len(info.network_share_name) + 1
+    struct.pack_into('<I', data, start + 28, network_size)
+    struct.pack_into('<I', data, start + 24, 28 + network_size)
+    path.write_bytes(bytes(data))
+
+
+def environment_target():
+    link = new_link("env_target.lnk")
+    target = pylnk3.ExtraData_EnvironmentVariableDataBlock()
+    target.target_ansi = r"%CLARA_TEST_DIR%\app.exe"
+    target.target_unicode = r"%CLARA_TEST_DIR%\app.exe"
+    icon = pylnk3.ExtraData_IconEnvironmentDataBlock()
+    icon.target_ansi = r"%CLARA_TEST_DIR%\app.ico"
+    icon.target_unicode = r"%CLARA_TEST_DIR%\app.ico"
+    link.extra_data = pylnk3.ExtraData(blocks=[target, icon])
+    link.link_flags.HasExpString = True
+    link.link_flags.HasExpIcon = True
+    link.link_info = None
+    link.save()
+
+
+def advertised():
+    link = new_link("advertised.lnk")
+    ansi = DARWIN_DESCRIPTOR.encode('ascii').ljust(260, b'\0')
+    unicode = DARWIN_DESCRIPTOR.encode('utf-16-le').ljust(520, b'\0')
+    link.extra_data = pylnk3.ExtraData(blocks=[pylnk3.ExtraData_Unparsed(signature=DARWIN_DATA_BLOCK,
+                                                                          data=ansi + unicode)])
+    link.link_flags.HasDarwinID = True
+    link.link_info = None
+    link.description = "Microsoft Excel"
+    link.icon = r"C:\Windows\Installer\{90160000-0011-0000-0000-0000000FF1CE}\xlicons.exe"
+    link.save()
+
+
+def truncated():
+    data = (HERE / "link_info_local.lnk").read_bytes()
+    # Cut inside the LinkInfo structure
+    (HERE / "truncated.lnk").write_bytes(data[:0x60])
+
+
+if __name__ == '__main__':
+    id_list_only()
+    link_info_local()
+    network()
+    environment_target()
+    advertised()
+    truncated()
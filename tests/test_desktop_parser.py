@@ -0,0 +1,296 @@
+import configparser
+from pathlib import Path
+
+import pytest
+
+from core.app_launcher import (DESKTOP_ACTION_PREFIX, DESKTOP_ENTRY_GROUP, App, parse_desktop_file,
+                               read_desktop_groups)
+
+
+def configparser_parse_desktop_file(file_path: Path) -> list[App]:
+    """parse_desktop_file as it was before the dedicated parser, kept as the reference."""
+    apps = []
+    config = configparser.ConfigParser(interpolation=None)
+
+    try:
+        config.read(file_path, encoding='utf-8')
+    except Exception:
+        return []
+
+    if 'Desktop Entry' not in config:
+        return []
+
+    main_entry = config['Desktop Entry']
+    main_name = main_entry.get('Name')
+
+    is_hidden = main_entry.get('Hidden', 'false').lower() == 'true' or \
+                main_entry.get('NoDisplay', 'false').lower() == 'true'
+
+    if main_name and not is_hidden:
+        main_exec = main_entry.get('Exec')
+        keywords_str = main_entry.get('Keywords', '')
+        keywords = [k.strip() for k in keywords_str.split(';') if k.strip()]
+
+        if main_exec:
+            apps.append(App(
+                name=main_name,
+                exec=main_exec,
+                icon=main_entry.get('Icon', ''),
+                hidden=False,
+                generic_name=main_entry.get('GenericName', ''),
+                comment=main_entry.get('Comment', ''),
+                keywords=keywords
+            ))
+
+        if 'Actions' in main_entry:
+            action_ids = [action for action in main_entry['Actions'].split(';') if action]
+            for action_id in action_ids:
+                action_section_name = f'Desktop Action {action_id}'
+                if action_section_name in config:
+                    action_section = config[action_section_name]
+                    action_name = action_section.get('Name')
+                    action_exec = action_section.get('Exec')
+
+                    if action_name and action_exec:
+                        combined_name = f"{main_name} - {action_name}"
+                        apps.append(App(
+                            name=combined_name,
+                            exec=action_exec,
+                            icon=main_entry.get('Icon', ''),
+                            keywords=keywords
+                        ))
+    return apps
+
+
+def configparser_groups(file_path: Path) -> dict:
+    """What read_desktop_groups should return, read with configparser."""
+    config = configparser.RawConfigParser(interpolation=None, delimiters=('=',))
+    config.optionxform = str
+    config.read(file_path, encoding='utf-8')
+    main_entry = {key: value for key, value in config[DESKTOP_ENTRY_GROUP].items() if '[' not in key}
+    if (main_entry.get('Hidden', '').lower() == 'true' or main_entry.get('NoDisplay', '').lower() == 'true'
+            or not main_entry.get('Name')):
+        return {DESKTOP_ENTRY_GROUP: main_entry}
+
+    groups = {DESKTOP_ENTRY_GROUP: main_entry}
+    for action in main_entry.get('Actions', '').split(';'):
+        name = f"{DESKTOP_ACTION_PREFIX}{action}"
+        if action and name in config:
+            groups[name] = {key: value for key, value in config[name].items() if '[' not in key}
+    return groups
+
+
+def fields(apps: list[App]) -> list[tuple]:
+    return [(app.name, app.exec, app.icon, app.hidden, app.generic_name, app.comment, list(app.keywords))
+            for app in apps]
+
+
+def write_entry(tmp_path: Path, content: str) -> Path:
+    path = tmp_path / "test.desktop"
+    path.write_text(content, encoding='utf-8')
+    return path
+
+
+PARITY_CASES = {
+    'actions': """\
+[Desktop Entry]
+Type=Application
+Name=Browser
+GenericName=Web Browser
+Comment=Browse the web
+Exec=browser %u
+Icon=browser
+Keywords=web;internet;
+Actions=new-window;private;missing;
+
+[Desktop Action new-window]
+Name=New Window
+Exec=browser --new-window
+
+[Desktop Action private]
+Name=New Private Window
+Exec=browser --private-window
+""",
+    'action before main group': """\
+[Desktop Action compose]
+Name=Compose
+Exec=mail --compose
+
+[Desktop Entry]
+Name=Mail
+Exec=mail
+Actions=compose;
+""",
+    'action without exec': """\
+[Desktop Entry]
+Name=Editor
+Exec=editor %F
+Actions=broken;
+
+[Desktop Action broken]
+Name=Broken
+""",
+    'hidden': """\
+[Desktop Entry]
+Name=Hidden App
+Exec=hidden
+Hidden=true
+Actions=other;
+
+[Desktop Action other]
+Name=Other
+Exec=hidden --other
+""",
+    'nodisplay': """\
+[Desktop Entry]
+Name=Helper
+Exec=helper
+NoDisplay=True
+""",
+    'no name': """\
+[Desktop Entry]
+Exec=nameless
+""",
+    'no exec': """\
+[Desktop Entry]
+Name=Link
+Type=Link
+URL=https://example.com
+""",
+    'localized keys': """\
+[Desktop Entry]
+Name[de]=Rechner
+Name=Calculator
+Name[fr]=Calculatrice
+Comment[de]=Rechnen
+Comment=Do arithmetic
+Keywords[de]=rechnen;mathe;
+Keywords=math;calc;
+Exec=calc
+Icon=accessories-calculator
+""",
+    'foreign groups': """\
+# A comment
+; Another comment
+[Desktop Entry]
+Name=Terminal
+Exec=terminal
+Actions=tab;
+
+[X-KDE Settings]
+Name=Not the app
+Exec=wrong
+
+[Desktop Action unlisted]
+Name=Unlisted
+Exec=terminal --unlisted
+
+[Desktop Action tab]
+Name=New Tab
+Exec=terminal --tab
+
+[X-Trailing]
+Exec=wrong too
+""",
+    'no main group': """\
+[X-Something]
+Name=Nothing
+Exec=nothing
+""",
+    'blank values and spacing': """\
+[Desktop Entry]
+Name = Spaced
+Exec = spaced --flag
+Icon=
+Keywords=;;one; two ;
+""",
+}
+
+
+@pytest.mark.parametrize('content', PARITY_CASES.values(), ids=PARITY_CASES.keys())
+def test_matches_configparser(tmp_path, content):
+    path = write_entry(tmp_path, content)
+    assert fields(parse_desktop_file(path)) == fields(configparser_parse_desktop_file(path))
+
+
+@pytest.mark.parametrize('content', [c for name, c in PARITY_CASES.items() if name != 'no main group'],
+                         ids=[name for name in PARITY_CASES if name != 'no main group'])
+def test_groups_match_configparser(tmp_path, content):
+    path = write_entry(tmp_path, content)
+    assert read_desktop_groups(path) == configparser_groups(path)
+
+
+def test_bad_encoding(tmp_path):
+    path = tmp_path / "latin1.desktop"
+    path.write_bytes("[Desktop Entry]\nName=Caf\xe9\nExec=cafe\n".encode('latin-1'))
+    assert parse_desktop_file(path) == []
+    assert configparser_parse_desktop_file(path) == []
+
+
+def test_missing_file(tmp_path):
+    assert parse_desktop_file(tmp_path / "missing.desktop") == []
+
+
+def test_escapes(tmp_path):
+    path = write_entry(tmp_path, r"""[Desktop Entry]
+Name=Two\sWords
+GenericName=Back\\slash
+Comment=First line\nSecond\tline
+Icon=icon\sname
+Keywords=semi\;colon;plain;
+Exec=app --title "a\\ b" %f
+Actions=act;
+
+[Desktop Action act]
+Name=Act\sNow
+Exec=app --act
+""")
+    # The raw values are what configparser reads, only the App fields are unescaped
+    assert read_desktop_groups(path) == configparser_groups(path)
+    main, action = parse_desktop_file(path)
+    assert main.name == 'Two Words'
+    assert main.generic_name == 'Back\\slash'
+    assert main.comment == 'First line\nSecond\tline'
+    assert main.icon == 'icon name'
+    assert list(main.keywords) == ['semi;colon', 'plain']
+    # Exec keeps its escapes for launch()
+    assert main.exec == r'app --title "a\\ b" %f'
+    assert action.name == 'Two Words - Act Now'
+    assert action.icon == 'icon name'
+
+
+def test_duplicate_keys(tmp_path):
+    path = write_entry(tmp_path, """\
+[Desktop Entry]
+Name=First
+Name=Second
+Exec=first
+Exec=second
+""")
+    # configparser's strict mode rejected the whole file, the first occurrence wins now
+    assert configparser_parse_desktop_file(path) == []
+    assert fields(parse_desktop_file(path)) == [('First', 'first', '', False, '', '', [])]
+
+
+def test_duplicate_groups(tmp_path):
+    path = write_entry(tmp_path, """\
+[Desktop Entry]
+Name=Original
+Exec=original
+
+[Desktop Entry]
+Name=Repeated
+Exec=repeated
+""")
+    assert configparser_parse_desktop_file(path) == []
+    assert [app.name for app in parse_desktop_file(path)] == ['Original']
+
+
+def test_stray_lines(tmp_path):
+    path = write_entry(tmp_path, """\
+[Desktop Entry]
+Name=Tolerant
+this line has no separator
+Exec=tolerant
+""")
+    assert [app.exec for app in parse_desktop_file(path)] == ['tolerant']
@@ -0,0 +1,75 @@
+from pathlib import Path
+
+import pytest
+
+from core.shell_link import HAS_LINK_INFO, HAS_LINK_TARGET_ID_LIST, parse_shell_link, read_shell_link
+
+# Made with pylnk3 by fixtures/shell_link/make_fixtures.py
+FIXTURES = Path(__file__).parent / "fixtures" / "shell_link"
+
+
+def link_flags(name: str) -> int:
+    return int.from_bytes((FIXTURES / name).read_bytes()[20:24], 'little')
+
+
+def test_id_list_only():
+    assert link_flags("id_list_only.lnk") & (HAS_LINK_TARGET_ID_LIST | HAS_LINK_INFO) == HAS_LINK_TARGET_ID_LIST
+    link = read_shell_link(FIXTURES / "id_list_only.lnk")
+    assert link.target == r"C:\Program Files\Mozilla Firefox\firefox.exe"
+    assert link.arguments == "-P default"
+    assert link.icon_location == r"C:\Program Files\Mozilla Firefox\firefox.exe"
+    assert link.icon_index == 2
+    assert link.description == "Browse the Wéb"
+    assert not link.advertised
+
+
+def test_link_info_local():
+    link = read_shell_link(FIXTURES / "link_info_local.lnk")
+    assert link.target == r"C:\Windows\notepad.exe"
+    assert link.arguments == "notes.txt"
+    assert link.icon_location == r"C:\Windows\notepad.exe"
+    assert not link.advertised
+
+
+def test_network():
+    link = read_shell_link(FIXTURES / "network.lnk")
+    assert link.target == r"\\server\share\apps\tool.exe"
+    assert link.arguments == "--verbose"
+    assert link.icon_location == ""
+    assert not link.advertised
+
+
+def test_environment_target(monkeypatch):
+    monkeypatch.setenv("CLARA_TEST_DIR", r"C:\Apps")
+    link = read_shell_link(FIXTURES / "env_target.lnk")
+    assert link.target == r"C:\Apps\app.exe"
+    assert link.arguments == ""
+    assert link.icon_location == r"C:\Apps\app.ico"
+    assert not link.advertised
+
+
+def test_environment_target_unknown_variable(monkeypatch):
+    monkeypatch.delenv("CLARA_TEST_DIR", raising=False)
+    link = read_shell_link(FIXTURES / "env_target.lnk")
+    assert link.target == r"%CLARA_TEST_DIR%\app.exe"
+
+
+def test_advertised():
+    link = read_shell_link(FIXTURES / "advertised.lnk")
+    assert link.advertised
+    # An MSI shortcut names a product, not a file; the caller asks the shell for the target
+    assert link.target == ""
+    assert link.arguments == ""
+    assert link.icon_location == r"C:\Windows\Installer\{90160000-0011-0000-0000-0000000FF1CE}\xlicons.exe"
+    assert link.description == "Microsoft Excel"
+
+
+def test_truncated():
+    with pytest.raises(ValueError):
+        read_shell_link(FIXTURES / "truncated.lnk")
+
+
+@pytest.mark.parametrize('data', [b"", b"x" * 100, b"L\0\0\0" + b"\0" * 72], ids=['empty', 'garbage', 'no clsid'])
+def test_not_a_shell_link(data):
+    with pytest.raises(ValueError):
+        parse_shell_link(data)
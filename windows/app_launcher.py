@@ -1,6 +1,173 @@
-from PySide6 import QtCore, QtGui, QtWidgets
+from PySide6 import QtCore, QtWidgets
 
-from core.app_launcher import list_apps, launch, reload_app_cache
+from core.app_launcher import AppSearchIndex, get_frecency_store, list_apps, launch, reload_app_cache
+from windows.icon_service import IconService, get_icon_service
+
+class AppListModel(QtCore.QAbstractListModel):
+    """Every app in the launcher, with tooltips and icons built only when a view asks for them.
+
+    Icons come from the icon service, so a row first shows without one and
+    is updated when it arrives.
+    """
+
+    def __init__(self, icon_service: IconService, parent=None):
+        super().__init__(parent)
+        self.apps = []
+        self.icon_service = icon_service
+        self._tooltips = {}
+        # icon name -> rows using it
+        self._icon_rows = {}
+        icon_service.icon_ready.connect(self._icon_ready)
+        self._connected = True
+
+    def detach(self):
+        """Stop listening to the icon service, which outlives every model."""
+        if self._connected:
+            self.icon_service.icon_ready.disconnect(self._icon_ready)
+            self._connected = False
+
+    def set_apps(self, apps):
+        self.beginResetModel()
+        self.apps = apps
+        self._tooltips = {}
+        self._icon_rows = {}
+        for row, app in enumerate(apps):
+            if app.icon:
+                self._icon_rows.setdefault(app.icon, []).append(row)
+        self.icon_service.set_capacity(len(self._icon_rows))
+        self.endResetModel()
+
+    def _icon_ready(self, name):
+        rows = self._icon_rows.get(name)
+        if rows:
+            # One signal for the whole span, a common icon can be shared by hundreds of rows
+            self.dataChanged.emit(self.index(rows[0], 0), self.index(rows[-1], 0),
+                                  [QtCore.Qt.DecorationRole]) #type: ignore
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.apps)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole): #type: ignore
+        if not index.isValid():
+            return None
+        app = self.apps[index.row()]
+
+        if role == QtCore.Qt.DisplayRole: #type: ignore
+            return app.name
+        if role == QtCore.Qt.UserRole: #type: ignore
+            return app
+        if role == QtCore.Qt.ToolTipRole: #type: ignore
+            tooltip = self._tooltips.get(index.row())
+            if tooltip is None:
+                # GenericName, Comment, and Command
+                tooltip_parts = []
+                if app.generic_name:
+                    tooltip_parts.append(app.generic_name)
+                if app.comment:
+                    tooltip_parts.append(app.comment)
+                if app.command and app.command.lower() != app.name.lower():
+                    tooltip_parts.append(f"Command: {app.command}")
+                tooltip = "\n".join(tooltip_parts)
+                self._tooltips[index.row()] = tooltip
+            return tooltip or None
+        if role == QtCore.Qt.DecorationRole and app.icon: #type: ignore
+            return self.icon_service.icon(app.icon)
+        return None
+
+class AppFilterProxyModel(QtCore.QAbstractProxyModel):
+    """Shows the source rows picked by the search, in ranked order.
+
+    A new result only emits the rows that changed: whatever it shares with
+    the previous one at the start and end stays in place, so views keep
+    their items and only repaint what moved.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        self._positions = None
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        super().setSourceModel(model)
+        self._rows = []
+        self._positions = None
+        model.modelAboutToBeReset.connect(self.beginResetModel)
+        model.modelReset.connect(self._source_reset)
+        model.dataChanged.connect(self._source_data_changed)
+        self.endResetModel()
+
+    def _source_reset(self):
+        self._rows = []
+        self._positions = None
+        self.endResetModel()
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        positions = self._source_positions()
+        rows = [positions[source_row] for source_row in range(top_left.row(), bottom_right.row() + 1)
+                if source_row in positions]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), 0), roles)
+
+    def _source_positions(self):
+        if self._positions is None:
+            self._positions = {source_row: row for row, source_row in enumerate(self._rows)}
+        return self._positions
+
+    def set_rows(self, rows):
+        old = self._rows
+        if rows == old:
+            return
+
+        start = 0
+        limit = min(len(old), len(rows))
+        while start < limit and old[start] == rows[start]:
+            start += 1
+        old_end = len(old)
+        new_end = len(rows)
+        while old_end > start and new_end > start and old[old_end - 1] == rows[new_end - 1]:
+            old_end -= 1
+            new_end -= 1
+
+        if old_end > start:
+            self.beginRemoveRows(QtCore.QModelIndex(), start, old_end - 1)
+            self._rows = old[:start] + old[old_end:]
+            self._positions = None
+            self.endRemoveRows()
+        if new_end > start:
+            self.beginInsertRows(QtCore.QModelIndex(), start, new_end - 1)
+            self._rows = rows
+            self._positions = None
+            self.endInsertRows()
+        self._rows = rows
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if parent.isValid() or column != 0 or not 0 <= row < len(self._rows):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=None):
+        if index is None:
+            # QObject.parent()
+            return super().parent()
+        return QtCore.QModelIndex()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else 1
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid() or self.sourceModel() is None:
+            return QtCore.QModelIndex()
+        return self.sourceModel().index(self._rows[proxy_index.row()], 0)
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QtCore.QModelIndex()
+        row = self._source_positions().get(source_index.row())
+        return QtCore.QModelIndex() if row is None else self.createIndex(row, 0)
 
 class AppLauncherDialog(QtWidgets.QDialog):
     def __init__(self, strings, parent=None):
@@ -8,6 +175,8 @@ class AppLauncherDialog(QtWidgets.QDialog):
         self.strings = strings["app_launcher"]
         self.setWindowTitle(self.strings["title"])
         self.setMinimumSize(600, 400)
+        # A new dialog is made each time the launcher opens, so closed ones mustn't pile up
+        self.setAttribute(QtCore.Qt.WA_DeleteOnClose) #type: ignore
         
         # Main layout
         layout = QtWidgets.QVBoxLayout()
@@ -16,12 +185,22 @@ class AppLauncherDialog(QtWidgets.QDialog):
         self.search_box = QtWidgets.QLineEdit()
         self.search_box.setPlaceholderText(self.strings["placeholder"])
         self.search_box.textChanged.connect(self.filter_apps)
+        self.search_box.returnPressed.connect(self.launch_selected)
         layout.addWidget(self.search_box)
         
-        # Apps list widget
-        self.list_widget = QtWidgets.QListWidget()
-        self.list_widget.itemClicked.connect(self.launch_app)
-        layout.addWidget(self.list_widget)
+        # Apps list, only the visible rows are ever asked for their data
+        self.list_view = QtWidgets.QListView()
+        icon_size = self.list_view.style().pixelMetric(QtWidgets.QStyle.PM_ListViewIconSize) #type: ignore
+        self.app_model = AppListModel(get_icon_service(icon_size), self)
+        self.finished.connect(self.app_model.detach)
+        self.filter_model = AppFilterProxyModel(self)
+        self.filter_model.setSourceModel(self.app_model)
+        self.list_view.setUniformItemSizes(True)
+        # Lays out a long result list a batch at a time between events instead of all at once
+        self.list_view.setLayoutMode(QtWidgets.QListView.Batched) #type: ignore
+        self.list_view.setModel(self.filter_model)
+        self.list_view.clicked.connect(self.launch_app)
+        layout.addWidget(self.list_view)
         
         # Buttons
         button_layout = QtWidgets.QHBoxLayout()
@@ -43,6 +222,8 @@ class AppLauncherDialog(QtWidgets.QDialog):
         self.setLayout(layout)
         
         # Load apps
+        self.apps = []
+        self.search_index = AppSearchIndex(self.apps)
         self.load_apps()
         
         # Focus search box
@@ -51,9 +232,10 @@ class AppLauncherDialog(QtWidgets.QDialog):
     def load_apps(self):
         try:
             QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor) #type: ignore
-            self.apps = list_apps()
-            self.apps.sort(key=lambda x: x.name.lower())
-            self.populate_list(self.apps)
+            self.apps = sorted(list_apps(), key=lambda x: x.name.lower())
+            self.search_index = AppSearchIndex(self.apps, get_frecency_store().scores())
+            self.app_model.set_apps(self.apps)
+            self.filter_apps(self.search_box.text())
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, self.strings["load_error_title"], self.strings["load_error_text"].format(e=e))
         finally:
@@ -62,8 +244,9 @@ class AppLauncherDialog(QtWidgets.QDialog):
     def reload_apps(self):
         try:
             QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor) #type: ignore
-            self.apps = reload_app_cache()
-            self.apps.sort(key=lambda x: x.name.lower())
+            self.apps = sorted(reload_app_cache(), key=lambda x: x.name.lower())
+            self.search_index = AppSearchIndex(self.apps, get_frecency_store().scores())
+            self.app_model.set_apps(self.apps)
             # Reapply current filter
             self.filter_apps(self.search_box.text())
         except Exception as e:
@@ -71,54 +254,19 @@ class AppLauncherDialog(QtWidgets.QDialog):
         finally:
             QtWidgets.QApplication.restoreOverrideCursor()
 
-    def populate_list(self, apps):
-        self.list_widget.clear()
-        for app in apps:
-            item = QtWidgets.QListWidgetItem(app.name)
-            item.setData(QtCore.Qt.UserRole, app) #type: ignore
-            
-            # Set tooltip with GenericName, Comment, and Command
-            tooltip_parts = []
-            if app.generic_name:
-                tooltip_parts.append(app.generic_name)
-            if app.comment:
-                tooltip_parts.append(app.comment)
-            if app.command and app.command.lower() != app.name.lower():
-                tooltip_parts.append(f"Command: {app.command}")
-            if tooltip_parts:
-                item.setToolTip("\n".join(tooltip_parts))
-
-            # Try to load the icon
-            if app.icon:
-                icon = QtGui.QIcon.fromTheme(app.icon)
-                if not icon.isNull():
-                    item.setIcon(icon)
-            
-            self.list_widget.addItem(item)
-    
     def filter_apps(self, text):
-        if not text:
-            self.populate_list(self.apps)
-            return
-        
-        text_lower = text.lower()
-        text_for_command = text_lower.replace(' ', '').replace('-', '').replace('_', '')
-
-        filtered_apps = [
-            app for app in self.apps if 
-            text_lower in app.name.lower() or
-            (app.generic_name and text_lower in app.generic_name.lower()) or
-            (app.comment and text_lower in app.comment.lower()) or
-            (app.command and text_for_command in app.command.lower().replace(' ', '').replace('-', '').replace('_', '')) or
-            (app.keywords and any(text_lower in keyword.lower() for keyword in app.keywords))
-        ]
-        self.populate_list(filtered_apps)
-    
-    def launch_app(self, item: QtWidgets.QListWidgetItem):
-        if not item:
+        self.filter_model.set_rows(self.search_index.rank(text))
+        # Results are ranked, so Enter in the search box launches the best match
+        self.list_view.setCurrentIndex(self.filter_model.index(0, 0))
+
+    def launch_selected(self):
+        self.launch_app(self.list_view.currentIndex())
+
+    def launch_app(self, index: QtCore.QModelIndex):
+        if not index.isValid():
             return
         
-        app = item.data(QtCore.Qt.UserRole) #type: ignore
+        app = index.data(QtCore.Qt.UserRole) #type: ignore
         if app:
             try:
                 launch(app)
@@ -18,6 +18,17 @@ class ConfigWindow(QtWidgets.QDialog):
         self.auto_update_check = QtWidgets.QCheckBox()
         self.http_port_spin = QtWidgets.QSpinBox()
         self.http_port_spin.setRange(1024, 65535)
+        self.http_uploads_check = QtWidgets.QCheckBox()
+        self.http_engine_combo = QtWidgets.QComboBox()
+        self.http_engine_combo.addItems(["threaded", "asyncio"])
+        self.http_rate_spin = QtWidgets.QSpinBox()
+        self.http_rate_spin.setRange(0, 10_000_000)
+        self.http_rate_spin.setSuffix(" KB/s")
+        self.http_client_rate_spin = QtWidgets.QSpinBox()
+        self.http_client_rate_spin.setRange(0, 10_000_000)
+        self.http_client_rate_spin.setSuffix(" KB/s")
+        self.http_max_conn_spin = QtWidgets.QSpinBox()
+        self.http_max_conn_spin.setRange(1, 100)
         self.dukto_udp_port_spin = QtWidgets.QSpinBox()
         self.dukto_udp_port_spin.setRange(1024, 65535)
         self.dukto_tcp_port_spin = QtWidgets.QSpinBox()
@@ -30,6 +41,11 @@ class ConfigWindow(QtWidgets.QDialog):
         self.form_layout.addRow(self.strings.get("discord_presence_label", "Enable Discord Presence:"), self.discord_presence_check)
         self.form_layout.addRow(self.strings.get("auto_update_label", "Enable Auto-Update:"), self.auto_update_check)
         self.form_layout.addRow(self.strings.get("http_share_port_label", "HTTP Share Port:"), self.http_port_spin)
+        self.form_layout.addRow(self.strings.get("http_share_uploads_label", "Allow Browser Uploads:"), self.http_uploads_check)
+        self.form_layout.addRow(self.strings.get("http_share_engine_label", "HTTP Share Engine:"), self.http_engine_combo)
+        self.form_layout.addRow(self.strings.get("http_share_rate_limit_label", "Total Bandwidth Limit (asyncio, 0 = off):"), self.http_rate_spin)
+        self.form_layout.addRow(self.strings.get("http_share_client_rate_limit_label", "Per-Client Bandwidth Limit (asyncio, 0 = off):"), self.http_client_rate_spin)
+        self.form_layout.addRow(self.strings.get("http_share_max_connections_label", "Connections per Client (asyncio):"), self.http_max_conn_spin)
         self.form_layout.addRow(self.strings.get("dukto_udp_port_label", "Dukto UDP Port:"), self.dukto_udp_port_spin)
         self.form_layout.addRow(self.strings.get("dukto_tcp_port_label", "Dukto TCP Port:"), self.dukto_tcp_port_spin)
         self.form_layout.addRow(self.strings.get("search_engine_label", "Web Search Engine:"), self.search_engine_combo)
@@ -61,6 +77,11 @@ class ConfigWindow(QtWidgets.QDialog):
         self.discord_presence_check.setChecked(self.config.get("discord_presence", True))
         self.auto_update_check.setChecked(self.config.get("auto_update", True))
         self.http_port_spin.setValue(self.config.get("http_share_port", 8080))
+        self.http_uploads_check.setChecked(self.config.get("http_share_uploads", False))
+        self.http_engine_combo.setCurrentText(self.config.get("http_share_engine", "threaded"))
+        self.http_rate_spin.setValue(self.config.get("http_share_rate_limit", 0))
+        self.http_client_rate_spin.setValue(self.config.get("http_share_client_rate_limit", 0))
+        self.http_max_conn_spin.setValue(self.config.get("http_share_max_connections_per_ip", 6))
         self.dukto_udp_port_spin.setValue(self.config.get("dukto_udp_port", 4644))
         self.dukto_tcp_port_spin.setValue(self.config.get("dukto_tcp_port", 4644))
         self.search_engine_combo.setCurrentText(self.config.get("search_engine", "brave"))
@@ -70,6 +91,11 @@ class ConfigWindow(QtWidgets.QDialog):
         self.config.set("discord_presence", self.discord_presence_check.isChecked())
         self.config.set("auto_update", self.auto_update_check.isChecked())
         self.config.set("http_share_port", self.http_port_spin.value())
+        self.config.set("http_share_uploads", self.http_uploads_check.isChecked())
+        self.config.set("http_share_engine", self.http_engine_combo.currentText())
+        self.config.set("http_share_rate_limit", self.http_rate_spin.value())
+        self.config.set("http_share_client_rate_limit", self.http_client_rate_spin.value())
+        self.config.set("http_share_max_connections_per_ip", self.http_max_conn_spin.value())
         self.config.set("dukto_udp_port", self.dukto_udp_port_spin.value())
         self.config.set("dukto_tcp_port", self.dukto_tcp_port_spin.value())
         self.config.set("search_engine", self.search_engine_combo.currentText())
@@ -1,10 +1,14 @@
 from PySide6 import QtCore, QtGui, QtWidgets
 import os
 
+from core.app_launcher import apps_for_file, launch
+from windows.icon_service import get_icon_service
+
 class FileSearchResults(QtWidgets.QDialog):
     def __init__(self, results, strings, parent=None):
         super().__init__(parent)
         self.strings = strings["file_search"]
+        self.launcher_strings = strings["app_launcher"]
         self.setWindowTitle(self.strings["results_title"])
         self.setMinimumSize(600, 400)
 
@@ -12,6 +16,8 @@ class FileSearchResults(QtWidgets.QDialog):
         self.list_widget = QtWidgets.QListWidget()
         self.list_widget.addItems(results)
         self.list_widget.itemDoubleClicked.connect(self.open_file_location)
+        self.list_widget.setContextMenuPolicy(QtCore.Qt.CustomContextMenu) #type: ignore
+        self.list_widget.customContextMenuRequested.connect(self.show_context_menu)
 
         # layout
         layout = QtWidgets.QVBoxLayout()
@@ -23,4 +29,38 @@ class FileSearchResults(QtWidgets.QDialog):
         if os.path.exists(file_path):
             directory = os.path.dirname(file_path)
             url = QtCore.QUrl.fromLocalFile(directory)
-            QtGui.QDesktopServices.openUrl(url)
\ No newline at end of file
+            QtGui.QDesktopServices.openUrl(url)
+
+    def show_context_menu(self, pos: QtCore.QPoint):
+        item = self.list_widget.itemAt(pos)
+        if not item:
+            return
+        file_path = item.text()
+
+        menu = QtWidgets.QMenu(self)
+        menu.addAction(self.strings["open"], lambda: self.open_file(file_path))
+
+        # Answered from the MIME index built with the app list, no desktop files are read here
+        apps = apps_for_file(file_path)
+        if apps:
+            open_with_menu = menu.addMenu(self.strings["open_with"])
+            icon_service = get_icon_service(self.style().pixelMetric(QtWidgets.QStyle.PM_SmallIconSize)) #type: ignore
+            for app in apps:
+                action = open_with_menu.addAction(app.name, lambda app=app: self.open_with(app, file_path))
+                icon = icon_service.icon(app.icon) if app.icon else None
+                if icon is not None:
+                    action.setIcon(icon)
+
+        menu.addAction(self.strings["open_location"], lambda: self.open_file_location(item))
+        menu.exec(self.list_widget.viewport().mapToGlobal(pos))
+
+    def open_file(self, file_path: str):
+        if os.path.exists(file_path):
+            QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(file_path))
+
+    def open_with(self, app, file_path: str):
+        try:
+            launch(app, [file_path])
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, self.launcher_strings["launch_error_title"],
+                                           self.launcher_strings["launch_error_text"].format(app_name=app.name, e=e))
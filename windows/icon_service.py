@@ -0,0 +1,204 @@
+import hashlib
+import json
+import math
+import os
+import platform
+import queue
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+from PySide6 import QtCore, QtGui
+
+from core.config import config
+from core.icon_theme import IconResolver
+
+ICON_CACHE_DIR = config.config_dir / "icon_cache"
+# Decoded icons kept in memory at least, set_capacity() raises it to the list size
+ICON_MEMORY_CACHE_SIZE = 256
+PIXMAP_DIRS = ['/usr/share/pixmaps', '/usr/local/share/pixmaps'] if platform.system() == "Linux" else []
+
+class ThumbnailCache:
+    """Scaled icons saved as PNGs, reused across runs while their source file is unchanged.
+
+    A hit costs one stat of the source and reading a small PNG, instead of
+    a theme lookup and decoding a large (often SVG) original. Only used
+    from the icon worker thread.
+    """
+
+    def __init__(self, directory: Path, variant: str):
+        self.directory = directory
+        self.variant = variant
+        self._index_path = directory / "index.json"
+        # variant/name -> [source path, mtime_ns, size]
+        self._entries: Dict[str, list] = {}
+        self._dirty = False
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error loading icon cache: {e}. Starting fresh.")
+
+    def _key(self, name: str) -> str:
+        return f"{self.variant}/{name}"
+
+    def _file(self, key: str) -> Path:
+        return self.directory / (hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest() + ".png")
+
+    def get(self, name: str) -> Optional[QtGui.QImage]:
+        key = self._key(name)
+        entry = self._entries.get(key)
+        if not entry:
+            return None
+        try:
+            st = os.stat(entry[0])
+        except OSError:
+            return None
+        if st.st_mtime_ns != entry[1] or st.st_size != entry[2]:
+            return None
+        image = QtGui.QImage(str(self._file(key)))
+        return None if image.isNull() else image
+
+    def put(self, name: str, source: str, image: QtGui.QImage):
+        key = self._key(name)
+        try:
+            st = os.stat(source)
+            self.directory.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            return
+        if image.save(str(self._file(key)), "PNG"):
+            self._entries[key] = [source, st.st_mtime_ns, st.st_size]
+            self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_path = self._index_path.with_name(self._index_path.name + '.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self._index_path)
+            self._dirty = False
+        except OSError as e:
+            print(f"Error saving icon cache: {e}")
+
+class IconService(QtCore.QObject):
+    """Resolves and decodes icons on a worker thread, so views never wait on the disk.
+
+    icon() answers from an in-memory LRU of decoded icons; a miss queues the
+    name for the worker and returns None, and icon_ready fires with the name
+    once it can be asked again. Theme names and absolute paths are both
+    accepted, and everything decoded also lands in a ThumbnailCache so the
+    next run rarely touches the icon theme at all.
+    """
+
+    icon_ready = QtCore.Signal(str)
+    # From the worker thread, delivered on the GUI thread
+    _loaded = QtCore.Signal(str, object)
+
+    def __init__(self, size: int, cache_dir: Path = ICON_CACHE_DIR, parent=None):
+        super().__init__(parent)
+        self.size = size
+        self.capacity = ICON_MEMORY_CACHE_SIZE
+        screen = QtGui.QGuiApplication.primaryScreen()
+        self.scale = max(1, math.ceil(screen.devicePixelRatio())) if screen else 1
+        self._pixels = size * self.scale
+        self._icons: 'OrderedDict[str, Optional[QtGui.QIcon]]' = OrderedDict()
+        self._pending = set()
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._loaded.connect(self._on_loaded)
+
+        # Read here because QIcon's theme settings belong to the GUI thread
+        theme = QtGui.QIcon.themeName() or QtGui.QIcon.fallbackThemeName()
+        search_paths = [path for path in QtGui.QIcon.themeSearchPaths() if not path.startswith(':')]
+        self._resolver = IconResolver(theme, search_paths, PIXMAP_DIRS)
+        self._cache = ThumbnailCache(cache_dir, f"{theme}@{self._pixels}")
+
+    def set_capacity(self, capacity: int):
+        self.capacity = max(capacity, ICON_MEMORY_CACHE_SIZE)
+        self._evict()
+
+    def icon(self, name: str) -> Optional[QtGui.QIcon]:
+        if name in self._icons:
+            self._icons.move_to_end(name)
+            return self._icons[name]
+        if name not in self._pending:
+            self._pending.add(name)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._queue.put(name)
+        return None
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _evict(self):
+        while len(self._icons) > self.capacity:
+            self._icons.popitem(last=False)
+
+    def _on_loaded(self, name: str, image: Optional[QtGui.QImage]):
+        self._pending.discard(name)
+        icon = None
+        if image is not None:
+            pixmap = QtGui.QPixmap.fromImage(image)
+            pixmap.setDevicePixelRatio(self.scale)
+            icon = QtGui.QIcon(pixmap)
+        # Missing icons are remembered too, so they aren't looked up again on every repaint
+        self._icons[name] = icon
+        self._evict()
+        self.icon_ready.emit(name)
+
+    def _run(self):
+        while True:
+            name = self._queue.get()
+            if name is None:
+                break
+            image = None
+            try:
+                image = self._load(name)
+            except Exception as e:
+                print(f"Failed to load icon '{name}': {e}")
+            self._loaded.emit(name, image)
+            if self._queue.empty():
+                self._cache.save()
+        self._cache.save()
+
+    def _load(self, name: str) -> Optional[QtGui.QImage]:
+        image = self._cache.get(name)
+        if image is not None:
+            return image
+
+        path = self._resolver.find(name, self.size, self.scale)
+        if path is None:
+            return None
+        reader = QtGui.QImageReader(path)
+        source_size = reader.size()
+        if source_size.isValid() and (source_size.width() > self._pixels or source_size.height() > self._pixels):
+            # Lets SVG render, and JPEG decode, straight at the target size
+            reader.setScaledSize(source_size.scaled(self._pixels, self._pixels,
+                                                    QtCore.Qt.KeepAspectRatio)) #type: ignore
+        image = reader.read()
+        if image.isNull():
+            return None
+        if image.width() > self._pixels or image.height() > self._pixels:
+            image = image.scaled(self._pixels, self._pixels, QtCore.Qt.KeepAspectRatio, #type: ignore
+                                 QtCore.Qt.SmoothTransformation) #type: ignore
+        self._cache.put(name, path, image)
+        return image
+
+_services: Dict[int, IconService] = {}
+
+def get_icon_service(size: int) -> IconService:
+    """The shared service for icons of the given logical size, kept for the life of the app."""
+    service = _services.get(size)
+    if service is None:
+        service = _services[size] = IconService(size)
+    return service
@@ -9,7 +9,8 @@ from core.config import Config
 from core.discord_presence import presence
 from core.dukto import Peer
 from core.file_search import find
-from core.http_share import FileShareServer
+from core.http_share import FileShareServer, format_size
+from core.http_share_async import AsyncFileShareServer
 from core.updater import is_update_available, update_repository
 from core.web_search import MullvadLetaWrapper
 from windows.app_launcher import AppLauncherDialog
@@ -24,6 +25,8 @@ ASSET = Path(__file__).parent.parent / "assets" / "2ktan.png"
 
 class MainWindow(QtWidgets.QMainWindow):
     show_menu_signal = QtCore.Signal()
+    # Emitted from the app watcher thread when installed apps change
+    apps_changed_signal = QtCore.Signal()
 
     # Dukto signals
     peer_added_signal = QtCore.Signal(Peer)
@@ -39,6 +42,9 @@ class MainWindow(QtWidgets.QMainWindow):
 
     # HTTP share signals
     http_download_signal = QtCore.Signal(str, str)
+    http_upload_progress_signal = QtCore.Signal(str, str, int, int)
+    http_upload_finished_signal = QtCore.Signal(str)
+    http_upload_complete_signal = QtCore.Signal(list, str)
 
     def __init__(
         self, dukto_handler, strings, config: Config, restart=False, no_quit=False
@@ -79,10 +85,35 @@ class MainWindow(QtWidgets.QMainWindow):
 
         # HTTP file sharing
         http_port = self.config.get("http_share_port", 8080)
-        self.http_share = FileShareServer(port=http_port)
+        if self.config.get("http_share_engine", "threaded") == "asyncio":
+            # Rate limits are configured in KB/s, 0 means unlimited
+            self.http_share = AsyncFileShareServer(
+                port=http_port,
+                rate_limit=self.config.get("http_share_rate_limit", 0) * 1024,
+                client_rate_limit=self.config.get("http_share_client_rate_limit", 0)
+                * 1024,
+                max_connections_per_ip=self.config.get(
+                    "http_share_max_connections_per_ip", 6
+                ),
+            )
+        else:
+            self.http_share = FileShareServer(port=http_port)
         self.http_share.on_download = (
             lambda filename, ip: self.http_download_signal.emit(filename, ip)
         )
+        self.http_share.on_upload_progress = (
+            lambda upload_id, ip, total, received: self.http_upload_progress_signal.emit(
+                upload_id, ip, total, received
+            )
+        )
+        self.http_share.on_upload_finished = (
+            lambda upload_id: self.http_upload_finished_signal.emit(upload_id)
+        )
+        self.http_share.on_upload_complete = (
+            lambda files, ip: self.http_upload_complete_signal.emit(files, ip)
+        )
+        self.http_share.allow_uploads = self.config.get("http_share_uploads", False)
+        self.http_uploads = {}
 
         # Connect Dukto callbacks to emit signals
         self.dukto_handler.on_peer_added = lambda peer: self.peer_added_signal.emit(
@@ -124,6 +155,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.send_complete_signal.connect(self.handle_send_complete)
         self.dukto_error_signal.connect(self.handle_dukto_error)
         self.http_download_signal.connect(self.handle_http_download)
+        self.http_upload_progress_signal.connect(self.handle_http_upload_progress)
+        self.http_upload_finished_signal.connect(self.handle_http_upload_finished)
+        self.http_upload_complete_signal.connect(self.handle_http_upload_complete)
 
         self.tray = QtWidgets.QSystemTrayIcon(self)
         self.tray.setIcon(QtGui.QIcon(str(ASSET)))
@@ -196,6 +230,9 @@ class MainWindow(QtWidgets.QMainWindow):
             s["share_files_submenu"]
         )
         self.share_text_submenu_left = share_menu_left.addMenu(s["share_text_submenu"])
+        self.share_stats_action_left = share_menu_left.addAction(
+            s.get("share_stats", "Share Statistics"), self.show_share_stats
+        )
         self.stop_share_action_left = share_menu_left.addAction(
             "Stop Browser Share", self.stop_browser_share
         )
@@ -215,6 +252,9 @@ class MainWindow(QtWidgets.QMainWindow):
         self.share_text_submenu_right = share_menu_right.addMenu(
             s["share_text_submenu"]
         )
+        self.share_stats_action_right = share_menu_right.addAction(
+            s.get("share_stats", "Share Statistics"), self.show_share_stats
+        )
         self.stop_share_action_right = share_menu_right.addAction(
             "Stop Browser Share", self.stop_browser_share
         )
@@ -246,6 +286,8 @@ class MainWindow(QtWidgets.QMainWindow):
         # Set visibility of stop action
         self.stop_share_action_left.setVisible(is_sharing)
         self.stop_share_action_right.setVisible(is_sharing)
+        self.share_stats_action_left.setVisible(is_sharing)
+        self.share_stats_action_right.setVisible(is_sharing)
 
         # Configure file share menus
         for menu in [self.share_files_submenu_left, self.share_files_submenu_right]:
@@ -260,6 +302,10 @@ class MainWindow(QtWidgets.QMainWindow):
             browser_action.is_browser_action = True
             browser_action.triggered.connect(self.start_file_share_browser)
 
+            folder_action = menu.addAction(s_menu["folder_via_browser"])
+            folder_action.is_browser_action = True
+            folder_action.triggered.connect(self.start_folder_share_browser)
+
             if any(
                 not a.isSeparator() and not hasattr(a, "is_browser_action")
                 for a in menu.actions()
@@ -465,6 +511,34 @@ class MainWindow(QtWidgets.QMainWindow):
                 self, s["share_error_title"], s["share_error_text"].format(error=str(e))
             )
 
+    def start_folder_share_browser(self):
+        s = self.strings["main_window"]
+        is_adding = bool(self.http_share.shared_files)
+
+        folder = QtWidgets.QFileDialog.getExistingDirectory(
+            self, s["share_folder_dialog_title"], str(Path.home())
+        )
+
+        if not folder:
+            return
+
+        try:
+            if is_adding:
+                self.http_share.add_files([folder])
+            else:
+                url = self.http_share.share_files([folder])
+                main_text = s["share_browser_text_files"]
+                info_text = s["share_browser_folder_info"].format(name=Path(folder).name)
+                if not self.http_share.shared_text:
+                    self._show_sharing_dialog(url, main_text, info_text)
+
+            self.update_share_menu_state()
+
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(
+                self, s["share_error_title"], s["share_error_text"].format(error=str(e))
+            )
+
     def start_text_share_browser(self):
         s = self.strings["main_window"]
         is_changing = bool(self.http_share.shared_text)
@@ -505,6 +579,39 @@ class MainWindow(QtWidgets.QMainWindow):
             )  # type: ignore
         self.update_share_menu_state()
 
+    def show_share_stats(self):
+        s = self.strings["main_window"]
+        metrics = self.http_share.get_metrics()
+
+        requests = sum(
+            count
+            for statuses in metrics["requests_total"].values()
+            for count in statuses.values()
+        )
+        ttfb = metrics["time_to_first_byte_seconds"]
+        avg_ttfb_ms = ttfb["sum"] / ttfb["count"] * 1000 if ttfb["count"] else 0.0
+
+        lines = [
+            s["share_stats_text"].format(
+                requests=requests,
+                sent=format_size(metrics["bytes_sent_total"]),
+                active=metrics["active_downloads"],
+                ttfb=f"{avg_ttfb_ms:.1f}",
+            )
+        ]
+        for name, stats in sorted(metrics["downloads"].items()):
+            lines.append(
+                s["share_stats_file"].format(
+                    name=name,
+                    completed=stats["completed"],
+                    started=stats["started"],
+                )
+            )
+
+        QtWidgets.QMessageBox.information(
+            self, s["share_stats_title"], "\n".join(lines)
+        )
+
     def _show_sharing_dialog(self, url: str, main_text: str, info_text: str):
         s = self.strings["main_window"]
         msg = QtWidgets.QMessageBox(self)
@@ -542,6 +649,47 @@ class MainWindow(QtWidgets.QMainWindow):
             3000,
         )
 
+    @QtCore.Slot(str, str, int, int)
+    def handle_http_upload_progress(self, upload_id: str, client_ip: str, total: int, received: int):
+        # Several browsers can upload at once, so progress lives in the tray tooltip
+        # instead of a modal dialog
+        self.http_uploads[upload_id] = (client_ip, total, received)
+        self.update_http_upload_tooltip()
+
+    @QtCore.Slot(str)
+    def handle_http_upload_finished(self, upload_id: str):
+        self.http_uploads.pop(upload_id, None)
+        self.update_http_upload_tooltip()
+
+    def update_http_upload_tooltip(self):
+        uploads = [upload for upload in self.http_uploads.values() if upload[2] < upload[1]]
+        if not uploads:
+            self.tray.setToolTip("")
+            return
+
+        s = self.strings["main_window"]
+        total_size = sum(t for _, t, _ in uploads)
+        total_received = sum(r for _, _, r in uploads)
+        percent = int(total_received * 100 / total_size) if total_size else 0
+        devices = {ip for ip, _, _ in uploads}
+        self.tray.setToolTip(
+            s["upload_progress_tooltip"].format(
+                count=len(devices), percent=percent
+            )
+        )
+
+    @QtCore.Slot(list, str)
+    def handle_http_upload_complete(self, received_files: list, client_ip: str):
+        s = self.strings["main_window"]
+        self.tray.showMessage(
+            s["upload_notification_title"],
+            s["upload_notification_text"].format(
+                count=len(received_files), ip=client_ip
+            ),
+            QtWidgets.QSystemTrayIcon.Information,  # type: ignore
+            3000,
+        )
+
     def show_receive_confirmation(self, sender_ip: str):
         reply = QtWidgets.QMessageBox.question(
             self,
@@ -656,6 +804,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
     def start_app_launcher(self):
         self.app_launcher_dialog = AppLauncherDialog(self.strings, self)
+        # The connection goes away with the dialog, which is deleted on close
+        self.apps_changed_signal.connect(self.app_launcher_dialog.load_apps)
         self.app_launcher_dialog.move(QtGui.QCursor.pos())
         self.app_launcher_dialog.show()
 